@@ -0,0 +1,90 @@
+import argparse
+import json
+import logging
+import sys
+from constants import AGENT_NOT_FOUND_MSG
+from store import AGENT_REGISTRY
+from transport import BoardRing
+from utils import decode_board
+
+logger = logging.getLogger(__name__)
+
+
+def serve(agent, requests, responses, ring=None):
+    """
+    Answer step requests, one JSON object per line, until `requests` is closed.
+
+    Each request holds either the `slot` of `ring` holding the `GameState`, or the
+    `board` (see `encode_board`), `board_size`, `my_pos`, `adv_pos` and `max_step`
+    arguments of `Agent.step`. Each response holds either the `pos` and `dir` of the
+    step or an `error` message.
+
+    Parameters
+    ----------
+    agent : agents.Agent
+        The agent answering the requests.
+    requests : file
+        The text stream to read requests from.
+    responses : file
+        The text stream to write responses to.
+    ring : transport.BoardRing
+        The shared memory the states of `slot` requests are read from.
+    """
+    for line in requests:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+            if "slot" in request:
+                state = ring.get(request["slot"])
+                next_pos, dir = agent.step(
+                    state.chess_board, state.my_pos, state.adv_pos, state.max_step
+                )
+            else:
+                chess_board = decode_board(request["board"], request["board_size"])
+                next_pos, dir = agent.step(
+                    chess_board,
+                    tuple(request["my_pos"]),
+                    tuple(request["adv_pos"]),
+                    request["max_step"],
+                )
+            response = {"pos": [int(x) for x in next_pos], "dir": int(dir)}
+        except Exception as e:
+            logger.exception("Agent step failed")
+            response = {"error": f"{type(e).__name__}: {e}"}
+        responses.write(json.dumps(response) + "\n")
+        responses.flush()
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--agent", type=str, default="random_agent")
+    parser.add_argument(
+        "--shared_memory",
+        type=str,
+        default=None,
+        help="The name of the BoardRing holding the states of slot requests",
+    )
+    args = parser.parse_args()
+    return args
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s:%(message)s", level=logging.WARNING)
+    args = get_args()
+    if args.agent not in AGENT_REGISTRY:
+        raise ValueError(
+            f"Agent '{args.agent}' is not registered. {AGENT_NOT_FOUND_MSG}"
+        )
+    agent = AGENT_REGISTRY[args.agent]()
+    ring = None
+    if args.shared_memory is not None:
+        ring = BoardRing(args.shared_memory)
+    # Keep stdout for the protocol, anything the agent prints goes to stderr
+    protocol = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        serve(agent, sys.stdin, protocol, ring)
+    finally:
+        if ring is not None:
+            ring.close()
@@ -1,4 +1,18 @@
-from .agent import Agent
-from .random_agent import RandomAgent
-from .human_agent import HumanAgent
-from .student_agent import StudentAgent
+# Agents are imported on first use, see store.AgentRegistry
+import importlib
+
+_MODULES = {
+    "Agent": ".agent",
+    "RandomAgent": ".random_agent",
+    "HumanAgent": ".human_agent",
+    "StudentAgent": ".student_agent",
+    "SearchAgent": ".search_agent",
+}
+
+__all__ = list(_MODULES)
+
+
+def __getattr__(name):
+    if name not in _MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_MODULES[name], __name__), name)
@@ -34,3 +34,89 @@ class Agent:
             The direction of the agent, as defined in world.py (DIRECTION_UP/DIRECTION_DOWN/DIRECTION_LEFT/DIRECTION_RIGHT).
         """
         pass
+
+    def on_game_start(self, board_size, max_step, player):
+        """
+        Called by the world before the first step of a game.
+
+        Agents may be reused for many games (see `--reuse_agents` in simulator.py),
+        so state that only holds for one game should be reset here, while caches
+        that hold for any game can be kept.
+
+        Parameters
+        ----------
+        board_size : int
+            The size of the board.
+        max_step : int
+            The maximum number of steps that the agent can take.
+        player : int
+            0 if the agent moves first, 1 otherwise.
+        """
+        pass
+
+    def set_clock(self, remaining, increment, move_number):
+        """
+        Called by the world before each step of the agent, with the time it has left,
+        so that it can spend more time on some steps than on others (see
+        `time_manager.TimeManager`).
+
+        Parameters
+        ----------
+        remaining : float
+            The seconds left on the agent's clock for the rest of the game, None if
+            the game is not timed.
+        increment : float
+            The seconds added to the agent's clock after each of its steps.
+        move_number : int
+            The number of the step the agent is about to take, from 1.
+        """
+        pass
+
+    def start_pondering(self, chess_board, my_pos, adv_pos, max_step):
+        """
+        Called by the world when the adversary starts thinking about its step, so that
+        the agent can search speculatively in the background meanwhile. The call must
+        return at once.
+
+        Parameters
+        ----------
+        chess_board : numpy.ndarray of shape (board_size, board_size, 4)
+            A copy of the chess board, which the agent may keep.
+        my_pos : tuple of int
+            The position of the agent.
+        adv_pos : tuple of int
+            The position of the adversary, which is to move.
+        max_step : int
+            The maximum number of steps that a player can take.
+        """
+        pass
+
+    def stop_pondering(self, adv_move):
+        """
+        Called by the world once the adversary has chosen its step, before it is
+        applied and before the agent is asked for its own step. Background searches
+        should be stopped before returning.
+
+        Parameters
+        ----------
+        adv_move : tuple of ((int, int), int)
+            The end position and barrier direction of the adversary's step.
+        """
+        pass
+
+    def on_game_end(self, result):
+        """
+        Called by the world once a game has ended.
+
+        Parameters
+        ----------
+        result : tuple of int
+            The score of the agent and the score of its adversary.
+        """
+        pass
+
+    def reset(self):
+        """
+        Forget everything learned so far, including the state kept across games.
+        """
+        pass
@@ -0,0 +1,219 @@
+import threading
+from time import time
+from agents.agent import Agent
+from agents.student_agent import StudentAgent
+from gamestate import GameState
+from ordering import MoveOrdering
+from parallel_search import RootParallelSearch
+from search import AlphaBetaSearch, SearchAborted
+from store import register_agent
+from territory import territory_evaluation
+from time_manager import TimeManager
+
+# Assumed ratio of the times of two consecutive depths, until it is measured
+DEPTH_GROWTH = 10.0
+
+
+@register_agent("search_agent")
+class SearchAgent(Agent):
+    """
+    An agent searching with iterative deepening alpha-beta (see
+    `search.AlphaBetaSearch`) within a time limit per step. Each iteration searches
+    the best move of the previous one first, and the killer moves and history of
+    `ordering.MoveOrdering` are kept for the whole game.
+
+    In timed games (see `Agent.set_clock`), the time of each step is allocated
+    from the clock by a `time_manager.TimeManager` instead of `time_limit`, and a
+    step with a single valid move is taken at once.
+
+    With `ponder`, the agent searches while the adversary thinks: it guesses the
+    adversary's most likely steps and searches its replies to them in a background
+    thread. If the adversary plays one of them, the agent starts from the pondered
+    reply and only searches deeper if the deeper search is expected to finish in
+    time. The thread competes for the GIL with the adversary when both agents run in
+    the same process, as in `simulator.py`, slowing down its steps and its clock,
+    so only ponder when the adversary runs in another process.
+
+    Parameters
+    ----------
+    time_limit : float
+        The time allowed for each step, in seconds, when the game is not timed.
+    max_depth : int
+        The deepest search.
+    ponder : bool
+        Whether to search during the adversary's turn, off by default.
+    ponder_moves : int
+        The number of adversary steps whose replies are pondered.
+    workers : int
+        The number of processes sharing the root moves of each step (see
+        `parallel_search.RootParallelSearch`), 0 to search in this process.
+    """
+
+    def __init__(
+        self, time_limit=1.0, max_depth=4, ponder=False, ponder_moves=8, workers=0
+    ):
+        super(SearchAgent, self).__init__()
+        self.name = "SearchAgent"
+        self.autoplay = True
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.ponder = ponder
+        self.ponder_moves = ponder_moves
+        self.ordering = MoveOrdering()
+        self.search = AlphaBetaSearch(ordering=self.ordering)
+        self.workers = workers
+        self.time_manager = TimeManager()
+        # (remaining, increment, move_number) of the clock, see set_clock
+        self.clock = None
+        # Started with the first game, so that starting the processes is not timed
+        self.parallel_search = None
+        # Pondered (move, depth, seconds) for the states after the adversary's guessed steps
+        self.ponder_results = {}
+        self.ponder_thread = None
+        self.ponder_stop = None
+
+    def deepen(
+        self, search, chess_board, my_pos, adv_pos, max_step, deadline, stop, start
+    ):
+        """
+        Search one ply deeper at a time, from the `(move, depth, seconds)` `start`,
+        until the maximum depth or `stop`, or until the next depth is not expected
+        to finish before the deadline.
+
+        Returns
+        -------
+        tuple of (move, depth, seconds)
+            The move of the deepest finished search (None if none finished), its
+            depth and the time it took.
+        """
+        move, depth, elapsed = start
+        growth = DEPTH_GROWTH
+        for next_depth in range(depth + 1, self.max_depth + 1):
+            start_time = time()
+            if deadline is not None and start_time + elapsed * growth > deadline:
+                break
+            try:
+                # Aborted searches leave barriers behind, search a copy
+                next_move, _ = search.search(
+                    chess_board.copy(),
+                    my_pos,
+                    adv_pos,
+                    max_step,
+                    next_depth,
+                    deadline=deadline,
+                    stop=stop,
+                    first=move,
+                )
+            except SearchAborted:
+                break
+            if next_move is None:
+                break
+            if elapsed > 0:
+                growth = max((time() - start_time) / elapsed, 1.0)
+            move, depth, elapsed = next_move, next_depth, time() - start_time
+        return move, depth, elapsed
+
+    def step(self, chess_board, my_pos, adv_pos, max_step):
+        start_time = time()
+        time_limit = self.time_limit
+        if self.clock is not None and self.clock[0] is not None:
+            valid_moves = StudentAgent.get_valid_moves(
+                chess_board, my_pos, adv_pos, max_step
+            )
+            if len(valid_moves) == 1:
+                return valid_moves[0]
+            remaining, increment, move_number = self.clock
+            time_limit = self.time_manager.allocate(
+                remaining, increment, move_number, chess_board, my_pos
+            )
+        deadline = start_time + time_limit
+        self.ordering.age()
+        state = GameState.from_board(chess_board, my_pos, adv_pos, 0, max_step)
+        start = self.ponder_results.get(state, (None, 0, 0.0))
+        self.ponder_results = {}
+        search = self.search
+        if self.workers:
+            if self.parallel_search is None:
+                self.parallel_search = RootParallelSearch(self.workers)
+            search = self.parallel_search
+        move, _, _ = self.deepen(
+            search, chess_board, my_pos, adv_pos, max_step, deadline, None, start
+        )
+        if move is None:
+            # Out of time before the first ply was searched
+            valid_moves = StudentAgent.get_valid_moves(
+                chess_board, my_pos, adv_pos, max_step
+            )
+            move = valid_moves[0]
+        return move
+
+    def set_clock(self, remaining, increment, move_number):
+        self.clock = (remaining, increment, move_number)
+
+    def start_pondering(self, chess_board, my_pos, adv_pos, max_step):
+        if not self.ponder:
+            return
+        self.stop_pondering(None)
+        self.ponder_stop = threading.Event()
+        self.ponder_thread = threading.Thread(
+            target=self.run_pondering,
+            args=(chess_board, my_pos, adv_pos, max_step, self.ponder_stop),
+            daemon=True,
+        )
+        self.ponder_thread.start()
+
+    def run_pondering(self, chess_board, my_pos, adv_pos, max_step, stop):
+        # The ordering tables are not shared with the searches of the main thread
+        search = AlphaBetaSearch(ordering=MoveOrdering())
+        # Guess the adversary's steps by the territory they leave it
+        guesses = []
+        for adv_move in StudentAgent.get_valid_moves(
+            chess_board, adv_pos, my_pos, max_step
+        ):
+            (x, y), direction = adv_move
+            StudentAgent.set_barrier_to_value(chess_board, x, y, direction, True)
+            score = territory_evaluation(chess_board, (x, y), my_pos, max_step)
+            StudentAgent.set_barrier_to_value(chess_board, x, y, direction, False)
+            guesses.append((score, adv_move))
+            if stop.is_set():
+                return
+        guesses.sort(key=lambda guess: -guess[0])
+
+        for _, ((x, y), direction) in guesses[: self.ponder_moves]:
+            StudentAgent.set_barrier_to_value(chess_board, x, y, direction, True)
+            state = GameState.from_board(chess_board, my_pos, (x, y), 0, max_step)
+            result = self.deepen(
+                search,
+                chess_board,
+                my_pos,
+                (x, y),
+                max_step,
+                None,
+                stop,
+                (None, 0, 0.0),
+            )
+            StudentAgent.set_barrier_to_value(chess_board, x, y, direction, False)
+            if result[0] is not None:
+                self.ponder_results[state] = result
+            if stop.is_set():
+                return
+
+    def stop_pondering(self, adv_move):
+        if self.ponder_thread is None:
+            return
+        self.ponder_stop.set()
+        self.ponder_thread.join()
+        self.ponder_thread = None
+
+    def on_game_start(self, board_size, max_step, player):
+        self.ordering.clear(board_size)
+        if self.workers and self.parallel_search is None:
+            self.parallel_search = RootParallelSearch(self.workers)
+
+    def on_game_end(self, result):
+        self.stop_pondering(None)
+        self.ponder_results = {}
+
+    def reset(self):
+        self.on_game_end(None)
+        self.ordering.clear()
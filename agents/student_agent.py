@@ -1,19 +1,14 @@
 # Student agent: Add your own agent here
 import math
+import os
 from enum import Enum
-from typing import Tuple, List, Dict
+from typing import Tuple, List
 
+import numpy as np
 from agents.agent import Agent
+from endgame import EndgameSolver, score_regions, score_walls
 from store import register_agent
-
-
-def get_max_idx(heuristics: List[float]) -> int:
-    result, cur_max = 0, heuristics[0]
-    for i, e in enumerate(heuristics):
-        if e > cur_max:
-            cur_max = e
-            result = i
-    return result
+from topology import get_topology
 
 
 @register_agent("student_agent")
@@ -23,7 +18,16 @@ class StudentAgent(Agent):
     add any helper functionalities needed for your agent.
     """
 
-    def __init__(self):
+    def __init__(self, opening_book: str = None, endgame_cells: int = 8, weights: Tuple[float, ...] = None):
+        """
+
+        Parameters
+        ----------
+        opening_book    path of an opening book built by opening_book.py, consulted before searching.
+        Defaults to the OPENING_BOOK environment variable, if set.
+        endgame_cells   the largest region shared by both players that is solved exactly, 0 to disable
+        weights         the weight of each heuristic, in the order of StudentAgent.HEURISTICS. Defaults to 1 for all
+        """
         super(StudentAgent, self).__init__()
         self.name = "StudentAgent"
         self.dir_map = {
@@ -33,6 +37,23 @@ class StudentAgent(Agent):
             "l": 3,
         }
         self.autoplay = True
+        if opening_book is None:
+            opening_book = os.environ.get("OPENING_BOOK")
+        self.opening_book = None
+        if opening_book is not None:
+            # Imported here so that agents without a book don't need hashlib or the search module
+            from opening_book import OpeningBook
+            self.opening_book = OpeningBook(opening_book)
+        self.endgame_solver = EndgameSolver(endgame_cells) if endgame_cells > 0 else None
+        self.weights = tuple(weights) if weights is not None else (1.0,) * len(StudentAgent.HEURISTICS)
+
+    def reset(self):
+        """
+        Forget the positions solved by the endgame solver, which are otherwise kept across games.
+        """
+        if self.endgame_solver is not None:
+            self.endgame_solver.table.clear()
+            self.endgame_solver.shapes.clear()
 
     MOVES = ((-1, 0), (0, 1), (1, 0), (0, -1))
     OPPOSITES = {0: 2, 1: 3, 2: 0, 3: 1}
@@ -51,43 +72,6 @@ class StudentAgent(Agent):
         AGGRESSIVE = 2
         NOT_AGGRESSIVE = 0
 
-    @staticmethod
-    def is_visited(valid_moves: Dict[Tuple[Tuple[int, int], int], int], x: int, y: int, cur_step: int) -> bool:
-        """
-
-        Parameters
-        ----------
-        valid_moves a dictionary of valid moves, mapping valid moves to their step count
-        x           the current x position
-        y           the current y position
-        cur_step    an integer denoting the current step
-
-        Returns
-        -------
-        bool        True if the position is in the dictionary and the corresponding value is less than the current step.
-        False otherwise
-        """
-        for i in range(4):
-            if t := valid_moves.get(((x, y), i)):
-                if t <= cur_step:
-                    return True
-        return False
-
-    @staticmethod
-    def is_within_board_boundaries(board_size: int, x: int, y: int) -> bool:
-        """
-
-        Parameters
-        ----------
-        board_size      the board size as an integer
-        cur_pos         a tuple of (x, y) being the current position
-
-        Returns
-        -------
-        bool            True if the position is within the board bounds, False otherwise
-        """
-        return 0 <= x < board_size and 0 <= y < board_size
-
     @staticmethod
     def get_valid_moves(chess_board: any, my_pos: Tuple[int, int], adv_pos: Tuple[int, int], max_step: int) -> \
             List[Tuple[Tuple[int, int], int]]:
@@ -104,35 +88,32 @@ class StudentAgent(Agent):
         -------
         list[((int, int), int)]  a list of valid moves
         """
+        topology = get_topology(chess_board.shape[0])
+        neighbours, positions = topology.neighbour_list, topology.positions
+        walls = chess_board.reshape(-1, 4).tolist()
+        adv_cell = topology.index(adv_pos)
+        # the step count at which each cell was last expanded, 0 if never (or only from the start)
+        steps = [0] * topology.num_cells
         valid_moves_dict = {}
-        board_size = chess_board.shape[0]
 
-        def update_valid_moves(cur_pos: Tuple[int, int], cur_step: int):
-            x, y = cur_pos
-            if cur_pos == adv_pos or not StudentAgent.is_within_board_boundaries(board_size, x, y) \
-                    or StudentAgent.is_visited(valid_moves_dict, x, y, cur_step):
+        def update_valid_moves(cell: int, cur_step: int):
+            if cell == adv_cell or 0 < steps[cell] <= cur_step:
                 return
 
+            cell_walls = walls[cell]
             for i in range(4):
-                if not chess_board[x, y, i]:
-                    valid_moves_dict[((x, y), i)] = cur_step
+                if not cell_walls[i]:
+                    valid_moves_dict[(positions[cell], i)] = cur_step
+                    steps[cell] = cur_step
 
             cur_step += 1
             if cur_step <= max_step:
-                if not chess_board[x, y, 0]:
-                    update_valid_moves((x - 1, y), cur_step)
-
-                if not chess_board[x, y, 1]:
-                    update_valid_moves((x, y + 1), cur_step)
-
-                if not chess_board[x, y, 2]:
-                    update_valid_moves((x + 1, y), cur_step)
-
-                if not chess_board[x, y, 3]:
-                    update_valid_moves((x, y - 1), cur_step)
+                for i in range(4):
+                    if not cell_walls[i]:
+                        update_valid_moves(neighbours[cell][i], cur_step)
 
         # call the backtracking algorithm to get all the valid moves
-        update_valid_moves(my_pos, 0)
+        update_valid_moves(topology.index(my_pos), 0)
 
         return list(valid_moves_dict.keys())
 
@@ -147,38 +128,23 @@ class StudentAgent(Agent):
         -------
         A winning heuristic value.
         """
-        # Union-Find
-        father = dict()
-        for r in range(board_size):
-            for c in range(board_size):
-                father[(r, c)] = (r, c)
-
-        def find(pos):
-            if father[pos] != pos:
-                father[pos] = find(father[pos])
-            return father[pos]
-
-        def union(pos1, pos2):
-            father[pos1] = pos2
-
-        for r in range(board_size):
-            for c in range(board_size):
-                for direction, move in enumerate(StudentAgent.MOVES[1:3]):  # Only check down and right
-                    if chess_board[r, c, direction + 1]:
-                        continue
-                    pos_a = find((r, c))
-                    pos_b = find((r + move[0], c + move[1]))
-                    if pos_a != pos_b:
-                        union(pos_a, pos_b)
-
-        for r in range(board_size):
-            for c in range(board_size):
-                find((r, c))
-        p0_r = find(p0_pos)
-        p1_r = find(p1_pos)
-        p0_score = list(father.values()).count(p0_r)
-        p1_score = list(father.values()).count(p1_r)
-        if p0_r == p1_r:
+        return StudentAgent.get_winning_heuristic(*score_regions(chess_board, p0_pos, p1_pos))
+
+    @staticmethod
+    def get_winning_heuristic(is_endgame: bool, p0_score: int, p1_score: int) -> float:
+        """
+
+        Parameters
+        ----------
+        is_endgame      whether the players are in separate regions
+        p0_score        the number of cells of the region of the player the heuristic is computed for
+        p1_score        the number of cells of the region of the other player
+
+        Returns
+        -------
+        A winning heuristic value.
+        """
+        if not is_endgame:
             return StudentAgent.WinningHeuristic.NOT_END_GAME.value
         if p0_score > p1_score:
             return StudentAgent.WinningHeuristic.WIN.value
@@ -280,6 +246,87 @@ class StudentAgent(Agent):
             return StudentAgent.AggressionHeuristic.AGGRESSIVE.value
         return StudentAgent.AggressionHeuristic.NOT_AGGRESSIVE.value
 
+    # Names of the terms returned by get_heuristics, in order
+    HEURISTICS = ("anti_box", "center", "end_game", "chasing", "aggression")
+
+    @staticmethod
+    def get_heuristics(board_size: int, chess_board: any, x: int, y: int, direction: int, adv_pos: Tuple[int, int]) \
+            -> Tuple[float, float, float, float, float]:
+        """
+
+        Parameters
+        ----------
+        board_size      the board size as an integer
+        chess_board     a numpy array of shape (x_max, y_max, 4), left unchanged
+        x               The x coordinate the move ends on
+        y               The y coordinate the move ends on
+        direction       The direction to put the barrier
+        adv_pos         The adversary's position
+
+        Returns
+        -------
+        The value of each heuristic of the move, in the order of StudentAgent.HEURISTICS
+        """
+        StudentAgent.set_barrier_to_value(chess_board, x, y, direction, True)
+        end_game_heuristic = StudentAgent.get_endgame_heuristic(board_size, chess_board, (x, y), adv_pos)
+        anti_box_heuristic = StudentAgent.anti_box_heuristic(chess_board, x, y)
+        StudentAgent.set_barrier_to_value(chess_board, x, y, direction, False)
+
+        # Get the center coordinate of the board
+        center = (board_size - 1) / 2
+        fx = float(x)
+        fy = float(y)
+        center_heuristic = StudentAgent.center_heuristic(center, fx, fy)
+        chasing_heuristic = StudentAgent.chasing_heuristic(fx, fy, (float(adv_pos[0]), float(adv_pos[1])))
+        aggression_heuristic = StudentAgent.aggression_heuristic(x, y, direction, adv_pos)
+        return anti_box_heuristic, center_heuristic, end_game_heuristic, chasing_heuristic, aggression_heuristic
+
+    @staticmethod
+    def get_heuristics_array(board_size: int, chess_board: any, valid_moves: List[Tuple[Tuple[int, int], int]],
+                             adv_pos: Tuple[int, int], end_game: List[float]) -> np.ndarray:
+        """
+        Vectorized version of get_heuristics over all the valid moves at once.
+
+        Parameters
+        ----------
+        board_size      the board size as an integer
+        chess_board     a numpy array of shape (x_max, y_max, 4)
+        valid_moves     a list of valid moves, as returned by get_valid_moves
+        adv_pos         The adversary's position
+        end_game        the end game heuristic of each move, which needs a union-find per move
+
+        Returns
+        -------
+        An array of shape (len(valid_moves), len(StudentAgent.HEURISTICS))
+        """
+        moves = np.array([(x, y, direction) for (x, y), direction in valid_moves], dtype=np.intp).reshape(-1, 3)
+        x, y, direction = moves[:, 0], moves[:, 1], moves[:, 2]
+        heuristics = np.empty((len(moves), len(StudentAgent.HEURISTICS)))
+
+        # The barrier of the move is not on the board yet, hence the + 1
+        barriers = chess_board[x, y].sum(axis=1) + 1
+        heuristics[:, 0] = np.where(barriers >= 3, StudentAgent.AntiBoxHeuristic.NOT_SAFE.value,
+                                    StudentAgent.AntiBoxHeuristic.SAFE.value)
+
+        center = (board_size - 1) / 2
+        center_distance = np.sqrt((x - center) ** 2 + (y - center) ** 2)
+        at_center = center_distance == 0
+        heuristics[:, 1] = np.where(at_center, 1.5, 1 / np.where(at_center, 1, center_distance))
+
+        heuristics[:, 2] = end_game
+
+        op_x, op_y = adv_pos
+        heuristics[:, 3] = 1 / np.sqrt((x - op_x) ** 2 + (y - op_y) ** 2)
+
+        # we are above, to the right, below or to the left of the opponent respectively
+        aggressive = ((op_x - 1 == x) & (op_y == y) & (direction == 2)) \
+            | ((op_x == x) & (op_y + 1 == y) & (direction == 3)) \
+            | ((op_x + 1 == x) & (op_y == y) & (direction == 0)) \
+            | ((op_x == x) & (op_y - 1 == y) & (direction == 1))
+        heuristics[:, 4] = np.where(aggressive, StudentAgent.AggressionHeuristic.AGGRESSIVE.value,
+                                    StudentAgent.AggressionHeuristic.NOT_AGGRESSIVE.value)
+        return heuristics
+
     def step(self, chess_board: any, my_pos, adv_pos, max_step):
         """
         Implement the step function of your agent here.
@@ -296,28 +343,36 @@ class StudentAgent(Agent):
         Please check the sample implementation in agents/random_agent.py or agents/human_agent.py for more details.
         """
         board_size = chess_board.shape[0]
-        # Get the center coordinate of the board
-        center = (board_size - 1) / 2
-        f_adv_pos = (float(adv_pos[0]), float(adv_pos[1]))
-        heuristic_list = []
+        end_game = []
         valid_moves = StudentAgent.get_valid_moves(chess_board, my_pos, adv_pos, max_step)
 
-        for (x, y), direction in valid_moves:
-            StudentAgent.set_barrier_to_value(chess_board, x, y, direction, True)
+        if self.opening_book is not None:
+            book_move = self.opening_book.lookup(chess_board, my_pos, adv_pos, max_step)
+            if book_move in valid_moves:
+                return book_move
+
+        if self.endgame_solver is not None:
+            solved_move, _ = self.endgame_solver.solve(chess_board, my_pos, adv_pos, max_step)
+            if solved_move is not None:
+                return solved_move
 
-            end_game_heuristic = StudentAgent.get_endgame_heuristic(board_size, chess_board, (x, y), adv_pos)
+        # symmetric moves score the same on every heuristic, score the first of each group
+        valid_moves = [group[0] for group in get_topology(board_size).equivalent_moves(chess_board, my_pos, adv_pos,
+                                                                                       valid_moves)]
+
+        # the regions after each wall, from the bridges of the board instead of a union-find per wall
+        wall_scores = score_walls(chess_board, my_pos, adv_pos)
+        for (x, y), direction in valid_moves:
+            end_game_heuristic = StudentAgent.get_winning_heuristic(*wall_scores[((x, y), direction)])
             if end_game_heuristic == StudentAgent.WinningHeuristic.WIN.value:
                 return (x, y), direction
+            end_game.append(end_game_heuristic)
 
-            anti_box_heuristic = StudentAgent.anti_box_heuristic(chess_board, x, y)
-            fx = float(x)
-            fy = float(y)
-            center_heuristic = StudentAgent.center_heuristic(center, fx, fy)
-            chasing_heuristic = StudentAgent.chasing_heuristic(fx, fy, f_adv_pos)
-            aggression_heuristic = StudentAgent.aggression_heuristic(x, y, direction, adv_pos)
-            StudentAgent.set_barrier_to_value(chess_board, x, y, direction, False)
-            heuristic_list.append(
-                anti_box_heuristic + center_heuristic + end_game_heuristic + chasing_heuristic + aggression_heuristic)
+        heuristics = StudentAgent.get_heuristics_array(board_size, chess_board, valid_moves, adv_pos, end_game)
+        # Add the weighted terms one at a time, in the same order as get_heuristics
+        scores = 0.0
+        for i, weight in enumerate(self.weights):
+            scores = scores + weight * heuristics[:, i]
 
         # choose the move with the highest heuristic
-        return valid_moves[get_max_idx(heuristic_list)]
+        return valid_moves[int(np.argmax(scores))]
@@ -0,0 +1,344 @@
+import numpy as np
+from topology import get_topology
+from utils import LRUCache
+
+# Moves (Up, Right, Down, Left)
+MOVES = ((-1, 0), (0, 1), (1, 0), (0, -1))
+
+# Region scores of the positions seen by the world and the agents of this process
+SCORE_CACHE = LRUCache(200000)
+
+
+def score_regions(chess_board, p0_pos, p1_pos):
+    """
+    Check whether the players are in separate regions and count the cells of the
+    region of each player.
+
+    Results are cached in `SCORE_CACHE`, keyed by the packed board and the pair of
+    positions in either order, so a position scored by an agent while searching is
+    not labelled again when the world checks it, nor in later games.
+
+    Parameters
+    ----------
+    chess_board : numpy.ndarray of shape (board_size, board_size, 4)
+        The chess board.
+    p0_pos : tuple of int
+        The position of the first player.
+    p1_pos : tuple of int
+        The position of the second player.
+
+    Returns
+    -------
+    is_endgame : bool
+        Whether the players are in separate regions.
+    p0_score : int
+        The number of cells of the region of the first player.
+    p1_score : int
+        The number of cells of the region of the second player.
+    """
+    topology = get_topology(chess_board.shape[0])
+    p0, p1 = topology.index(p0_pos), topology.index(p1_pos)
+    swapped = p1 < p0
+    if swapped:
+        p0, p1 = p1, p0
+    key = (np.packbits(chess_board).tobytes(), p0, p1)
+    result = SCORE_CACHE.get(key)
+    if result is None:
+        roots = topology.components(chess_board)
+        p0_r, p1_r = roots[p0], roots[p1]
+        result = (p0_r != p1_r, roots.count(p0_r), roots.count(p1_r))
+        SCORE_CACHE.put(key, result)
+    if swapped:
+        return result[0], result[2], result[1]
+    return result
+
+
+def score_walls(chess_board, my_pos, adv_pos):
+    """
+    Score placing each open wall around the region of `my_pos`, as `score_regions`
+    would score the board with the wall, the player at `my_pos` standing next to it
+    and the adversary at `adv_pos`.
+
+    Rather than labelling the regions once per wall, the bridges of the regions
+    are found in a single pass (see `Topology.bridges`). Only a bridge splits a
+    region, into the cells below it in the search and the rest.
+
+    Parameters
+    ----------
+    chess_board : numpy.ndarray of shape (board_size, board_size, 4)
+        The chess board.
+    my_pos : tuple of int
+        The position of the player placing the wall.
+    adv_pos : tuple of int
+        The position of the adversary.
+
+    Returns
+    -------
+    dict of ((int, int), int) to (bool, int, int)
+        For each move `((x, y), dir)` placing an open wall of the region of
+        `my_pos`, whether the players end in separate regions and the number of
+        cells of the region of each player.
+    """
+    topology = get_topology(chess_board.shape[0])
+    roots, order, sizes, bridges = topology.bridges(chess_board)
+    walls = chess_board.reshape(-1, 4).tolist()
+    my_root, adv = roots[topology.index(my_pos)], topology.index(adv_pos)
+    region, adv_region = sizes[my_root], sizes[roots[adv]]
+    connected = roots[adv] == my_root
+    unsplit = (not connected, region, adv_region)
+    scores = {}
+    for cell, position in enumerate(topology.positions):
+        if roots[cell] != my_root:
+            continue
+        for dir in range(4):
+            if walls[cell][dir]:
+                continue
+            child = bridges.get(cell * 4 + dir)
+            if child is None:
+                scores[(position, dir)] = unsplit
+                continue
+            below, child_order = sizes[child], order[child]
+            my_below = child_order <= order[cell] < child_order + below
+            my_score = below if my_below else region - below
+            if not connected:
+                scores[(position, dir)] = (True, my_score, adv_region)
+            elif my_below == (child_order <= order[adv] < child_order + below):
+                scores[(position, dir)] = (False, my_score, my_score)
+            else:
+                scores[(position, dir)] = (True, my_score, region - my_score)
+    return scores
+
+
+class SearchBudgetExceeded(Exception):
+    """
+    Raised when solving a region would visit more positions than allowed.
+    """
+
+
+class EndgameSolver:
+    """
+    Exact solver for positions where both players share a small region.
+
+    Once both players are enclosed in a region of at most `max_cells` cells, cells
+    outside of it can never be claimed by anyone, so the region is solved as a game
+    of its own. Solved subpositions are cached in a bounded table keyed by the shape
+    of the region, the barriers inside it and the player positions, so they are
+    reused by later moves and later games.
+
+    Parameters
+    ----------
+    max_cells : int
+        The largest shared region that is solved.
+    max_entries : int
+        The maximum number of solved subpositions kept in the table.
+    max_nodes : int
+        The maximum number of positions visited by one call to `solve`. Solving
+        gives up once this budget is exhausted.
+    """
+
+    def __init__(self, max_cells=8, max_entries=500000, max_nodes=200000):
+        self.max_cells = max_cells
+        self.max_nodes = max_nodes
+        self.table = LRUCache(max_entries)
+        self.shapes = LRUCache(1024)
+        self.nodes = 0
+
+    def shared_region(self, chess_board, my_pos, adv_pos):
+        """
+        Get the cells reachable from `my_pos`, if there are at most `max_cells`.
+
+        Returns
+        -------
+        cells : list of tuple of int
+            The sorted cells of the region, or None if the region is too large or
+            does not contain the adversary.
+        """
+        visited = {my_pos}
+        queue = [my_pos]
+        while queue:
+            r, c = queue.pop()
+            for dir, (m_r, m_c) in enumerate(MOVES):
+                if chess_board[r, c, dir]:
+                    continue
+                next_pos = (r + m_r, c + m_c)
+                if next_pos in visited:
+                    continue
+                visited.add(next_pos)
+                if len(visited) > self.max_cells:
+                    return None
+                queue.append(next_pos)
+        if adv_pos not in visited:
+            return None
+        return sorted(visited)
+
+    def get_shape(self, cells):
+        """
+        Get the edges between adjacent cells of a region.
+
+        Parameters
+        ----------
+        cells : list of tuple of int
+            The sorted cells of the region.
+
+        Returns
+        -------
+        shape : tuple
+            The cells translated to the origin, used as the table key.
+        adjacency : list of list of tuple of int
+            For each cell index, the `(dir, neighbour_index, edge_index)` of its
+            neighbours inside the region.
+        edges : list of tuple of int
+            For each edge index, the `(cell_index, dir)` of one of its sides.
+        """
+        r0 = min(r for r, _ in cells)
+        c0 = min(c for _, c in cells)
+        shape = tuple((r - r0, c - c0) for r, c in cells)
+        cached = self.shapes.get(shape)
+        if cached is not None:
+            return cached
+
+        index = {cell: i for i, cell in enumerate(shape)}
+        adjacency = [[] for _ in shape]
+        edges = []
+        for i, (r, c) in enumerate(shape):
+            # Only look right and down so each edge is numbered once
+            for dir in (1, 2):
+                j = index.get((r + MOVES[dir][0], c + MOVES[dir][1]))
+                if j is None:
+                    continue
+                adjacency[i].append((dir, j, len(edges)))
+                adjacency[j].append(((dir + 2) % 4, i, len(edges)))
+                edges.append((i, dir))
+        result = (shape, adjacency, edges)
+        self.shapes.put(shape, result)
+        return result
+
+    def solve(self, chess_board, my_pos, adv_pos, max_step):
+        """
+        Solve the position if both players share a small enough region.
+
+        Parameters
+        ----------
+        chess_board : numpy.ndarray of shape (board_size, board_size, 4)
+            The chess board.
+        my_pos : tuple of int
+            The position of the player to move.
+        adv_pos : tuple of int
+            The position of the adversary.
+        max_step : int
+            The maximum number of steps that a player can take.
+
+        Returns
+        -------
+        move : tuple of ((int, int), int)
+            An optimal move, or None if the position was not solved.
+        value : int
+            The final score difference (own blocks minus adversary blocks) reached
+            with optimal play from both players.
+        """
+        my_pos, adv_pos = tuple(my_pos), tuple(adv_pos)
+        cells = self.shared_region(chess_board, my_pos, adv_pos)
+        if cells is None:
+            return None, None
+        shape, adjacency, edges = self.get_shape(cells)
+
+        # Barriers already placed inside the region
+        mask = 0
+        for e, (i, dir) in enumerate(edges):
+            r, c = cells[i]
+            if chess_board[r, c, dir]:
+                mask |= 1 << e
+
+        index = {cell: i for i, cell in enumerate(cells)}
+        self.nodes = 0
+        try:
+            value, best = self._solve(
+                (shape, max_step),
+                adjacency,
+                max_step,
+                mask,
+                index[my_pos],
+                index[adv_pos],
+            )
+        except SearchBudgetExceeded:
+            return None, None
+        i, edge = best
+        for dir, _, e in adjacency[i]:
+            if e == edge:
+                return (cells[i], dir), value
+
+    def _solve(self, shape_key, adjacency, max_step, mask, me, adv):
+        key = (shape_key, mask, me, adv)
+        cached = self.table.get(key)
+        if cached is not None:
+            return cached
+
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise SearchBudgetExceeded()
+
+        best_value, best_move = None, None
+        for i in self._reachable(adjacency, max_step, mask, me, adv):
+            for _, _, e in adjacency[i]:
+                if mask & (1 << e):
+                    continue
+                next_mask = mask | (1 << e)
+                my_blocks, adv_blocks = self._scores(adjacency, next_mask, i, adv)
+                if adv_blocks is None:
+                    value = -self._solve(
+                        shape_key, adjacency, max_step, next_mask, adv, i
+                    )[0]
+                else:
+                    value = my_blocks - adv_blocks
+                if best_value is None or value > best_value:
+                    best_value, best_move = value, (i, e)
+
+        result = (best_value, best_move)
+        self.table.put(key, result)
+        return result
+
+    @staticmethod
+    def _reachable(adjacency, max_step, mask, me, adv):
+        """
+        Get the cells the player at `me` can end its move on.
+        """
+        visited = {me}
+        frontier = [me]
+        for _ in range(max_step):
+            next_frontier = []
+            for i in frontier:
+                for _, j, e in adjacency[i]:
+                    if mask & (1 << e) or j == adv or j in visited:
+                        continue
+                    visited.add(j)
+                    next_frontier.append(j)
+            frontier = next_frontier
+        return visited
+
+    @staticmethod
+    def _scores(adjacency, mask, me, adv):
+        """
+        Get the size of the component of `me` and, if separated, of `adv`.
+
+        Returns
+        -------
+        my_blocks : int
+        adv_blocks : int
+            None if both players are still in the same component.
+        """
+
+        def component(start):
+            visited = {start}
+            queue = [start]
+            while queue:
+                i = queue.pop()
+                for _, j, e in adjacency[i]:
+                    if not mask & (1 << e) and j not in visited:
+                        visited.add(j)
+                        queue.append(j)
+            return visited
+
+        mine = component(me)
+        if adv in mine:
+            return len(mine), None
+        return len(mine), len(component(adv))
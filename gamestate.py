@@ -0,0 +1,176 @@
+import struct
+import numpy as np
+from topology import get_topology
+
+# Board size, max steps, player 1 cell, player 2 cell and turn, before the walls
+HEADER = struct.Struct("<BBHHB")
+
+
+def packed_size(board_size):
+    """
+    Get the number of bytes of the packed walls of a board size.
+    """
+    return (board_size * board_size * 4 + 7) // 8
+
+
+class GameState:
+    """
+    An immutable snapshot of a game: the walls packed in bytes, the positions of
+    both players as flat cell indices (see `topology.Topology`) and whose turn it is.
+
+    Snapshots are hashable and compare by value, so they can key caches, and are
+    copied by reference. Stepping returns a new snapshot.
+
+    Parameters
+    ----------
+    board_size : int
+        The size of the board.
+    max_step : int
+        The maximum number of steps that a player can take.
+    walls : bytes
+        The bits of the chess board, packed as by `utils.encode_board`.
+    p0 : int
+        The cell of player 1.
+    p1 : int
+        The cell of player 2.
+    turn : int
+        0 if player 1 is to move, 1 otherwise.
+    """
+
+    __slots__ = ("board_size", "max_step", "walls", "p0", "p1", "turn", "_hash")
+
+    def __init__(self, board_size, max_step, walls, p0, p1, turn):
+        set_slot = object.__setattr__
+        set_slot(self, "board_size", board_size)
+        set_slot(self, "max_step", max_step)
+        set_slot(self, "walls", bytes(walls))
+        set_slot(self, "p0", p0)
+        set_slot(self, "p1", p1)
+        set_slot(self, "turn", turn)
+        set_slot(self, "_hash", hash((board_size, max_step, self.walls, p0, p1, turn)))
+
+    @classmethod
+    def from_board(cls, chess_board, p0_pos, p1_pos, turn, max_step):
+        """
+        Snapshot a chess board of shape (board_size, board_size, 4) and positions.
+        """
+        topology = get_topology(chess_board.shape[0])
+        return cls(
+            chess_board.shape[0],
+            int(max_step),
+            np.packbits(chess_board).tobytes(),
+            topology.index(p0_pos),
+            topology.index(p1_pos),
+            int(turn),
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GameState is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("GameState is immutable")
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if not isinstance(other, GameState):
+            return NotImplemented
+        return (
+            self._hash == other._hash
+            and self.walls == other.walls
+            and (self.board_size, self.max_step, self.p0, self.p1, self.turn)
+            == (other.board_size, other.max_step, other.p0, other.p1, other.turn)
+        )
+
+    def __repr__(self):
+        return (
+            f"GameState(board_size={self.board_size}, max_step={self.max_step}, "
+            f"p0_pos={self.p0_pos}, p1_pos={self.p1_pos}, turn={self.turn})"
+        )
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return GameState.from_bytes, (self.to_bytes(),)
+
+    def to_bytes(self):
+        """
+        Serialise the snapshot, see `from_bytes`.
+        """
+        return (
+            HEADER.pack(self.board_size, self.max_step, self.p0, self.p1, self.turn)
+            + self.walls
+        )
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Load a snapshot serialised by `to_bytes`. Bytes past the walls are ignored.
+        """
+        board_size, max_step, p0, p1, turn = HEADER.unpack_from(data)
+        end = HEADER.size + packed_size(board_size)
+        return cls(board_size, max_step, data[HEADER.size : end], p0, p1, turn)
+
+    @property
+    def chess_board(self):
+        """
+        A new, writable chess board of shape (board_size, board_size, 4).
+        """
+        size = self.board_size
+        bits = np.unpackbits(
+            np.frombuffer(self.walls, dtype=np.uint8), count=size * size * 4
+        )
+        return bits.reshape(size, size, 4).astype(bool)
+
+    @property
+    def p0_pos(self):
+        return get_topology(self.board_size).positions[self.p0]
+
+    @property
+    def p1_pos(self):
+        return get_topology(self.board_size).positions[self.p1]
+
+    @property
+    def my_pos(self):
+        """
+        The position of the player to move.
+        """
+        return self.p1_pos if self.turn else self.p0_pos
+
+    @property
+    def adv_pos(self):
+        """
+        The position of the adversary of the player to move.
+        """
+        return self.p0_pos if self.turn else self.p1_pos
+
+    def has_wall(self, pos, dir):
+        """
+        Check whether the cell at `pos` has a barrier or border in direction `dir`.
+        """
+        wall = get_topology(self.board_size).index(pos) * 4 + dir
+        return bool(self.walls[wall >> 3] & (0x80 >> (wall & 7)))
+
+    def step(self, next_pos, dir):
+        """
+        Move the player to move to `next_pos`, put its barrier in direction `dir` and
+        hand the turn to the adversary. The step is not checked.
+
+        Returns
+        -------
+        GameState
+            The new snapshot.
+        """
+        topology = get_topology(self.board_size)
+        cell = topology.index(next_pos)
+        walls = bytearray(self.walls)
+        for wall in (cell * 4 + dir, int(topology.opposite_walls[cell, dir])):
+            if wall >= 0:
+                walls[wall >> 3] |= 0x80 >> (wall & 7)
+        p0, p1 = (self.p0, cell) if self.turn else (cell, self.p1)
+        return GameState(self.board_size, self.max_step, walls, p0, p1, 1 - self.turn)
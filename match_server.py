@@ -0,0 +1,407 @@
+import argparse
+import asyncio
+from contextlib import asynccontextmanager
+import json
+import logging
+import os
+import sys
+from time import time
+import numpy as np
+from agents.agent import Agent
+from gamestate import GameState
+from transport import MAX_BOARD_SIZE, BoardRing
+from utils import all_logging_disabled, encode_board
+from world import World, PLAYER_1_NAME, PLAYER_2_NAME
+
+logging.basicConfig(format="%(levelname)s:%(message)s", level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+AGENT_PROCESS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "agent_process.py"
+)
+
+
+class AgentProcess:
+    """
+    A registered agent running in its own process, answering step requests over pipes.
+
+    Parameters
+    ----------
+    agent_name : str
+        The registered name of the agent.
+    transport : str
+        "shared_memory" to pass the boards in a `transport.BoardRing` and only their
+        slot over the pipe, "json" to pass the encoded boards over the pipe.
+    max_board_size : int
+        The largest board passed with the "shared_memory" transport.
+    """
+
+    def __init__(
+        self, agent_name, transport="shared_memory", max_board_size=MAX_BOARD_SIZE
+    ):
+        self.agent_name = agent_name
+        self.transport = transport
+        self.max_board_size = max_board_size
+        self.ring = None
+        self.process = None
+
+    async def start(self):
+        args = ["--agent", self.agent_name]
+        if self.transport == "shared_memory":
+            if self.ring is None:
+                self.ring = BoardRing(max_board_size=self.max_board_size)
+            args += ["--shared_memory", self.ring.name]
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            AGENT_PROCESS_PATH,
+            *args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            cwd=os.path.dirname(AGENT_PROCESS_PATH),
+        )
+
+    async def step(self, chess_board, my_pos, adv_pos, max_step, timeout=None):
+        """
+        Ask the agent for its step.
+
+        Parameters
+        ----------
+        chess_board : numpy.ndarray of shape (board_size, board_size, 4)
+            The chess board.
+        my_pos : tuple of int
+            The position of the agent.
+        adv_pos : tuple of int
+            The position of the adversary.
+        max_step : int
+            The maximum number of steps that the agent can take.
+        timeout : float
+            The time allowed for the step in seconds, None to wait forever.
+
+        Returns
+        -------
+        next_pos : tuple of int
+        dir : int
+
+        Raises
+        ------
+        asyncio.TimeoutError
+            If the agent did not answer in time. The process is restarted.
+        OSError
+            If the pipes to the process are broken. The process is restarted.
+        RuntimeError
+            If the agent failed to compute its step or the process died.
+        """
+        if self.ring is not None:
+            state = GameState.from_board(chess_board, my_pos, adv_pos, 0, max_step)
+            request = {"slot": self.ring.put(state)}
+        else:
+            request = {
+                "board": encode_board(chess_board),
+                "board_size": chess_board.shape[0],
+                "my_pos": [int(x) for x in my_pos],
+                "adv_pos": [int(x) for x in adv_pos],
+                "max_step": int(max_step),
+            }
+        try:
+            self.process.stdin.write((json.dumps(request) + "\n").encode())
+            await self.process.stdin.drain()
+            line = await asyncio.wait_for(self.process.stdout.readline(), timeout)
+        except asyncio.TimeoutError:
+            # The agent is still busy with this request, start from a fresh process
+            await self.restart()
+            raise
+        except OSError:
+            # The process died and its pipes are closed
+            await self.restart()
+            raise
+        if not line:
+            await self.restart()
+            raise RuntimeError(f"Agent process {self.agent_name} exited")
+        response = json.loads(line)
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return tuple(response["pos"]), response["dir"]
+
+    async def restart(self):
+        await self.stop()
+        await self.start()
+
+    async def stop(self):
+        if self.process is None or self.process.returncode is not None:
+            return
+        if self.process.stdin.can_write_eof():
+            self.process.stdin.close()
+        try:
+            await asyncio.wait_for(self.process.wait(), 1)
+        except asyncio.TimeoutError:
+            self.process.kill()
+            await self.process.wait()
+
+    async def close(self):
+        await self.stop()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring.unlink()
+            self.ring = None
+
+
+class RemoteAgent(Agent):
+    """
+    Stands for an agent running in an `AgentProcess` in the world of a game, so that
+    the match server neither imports nor creates the agents it plays.
+
+    Parameters
+    ----------
+    agent_name : str
+        The registered name of the agent.
+    """
+
+    def __init__(self, agent_name):
+        super(RemoteAgent, self).__init__()
+        self.name = agent_name
+        self.autoplay = True
+
+    def step(self, chess_board, my_pos, adv_pos, max_step):
+        raise RuntimeError(f"Steps of {self.name} are taken by its agent process")
+
+
+class AgentPool:
+    """
+    A fixed set of processes running the same agent, lent to one game at a time.
+
+    Parameters
+    ----------
+    agent_name : str
+        The registered name of the agent.
+    processes : int
+        The number of agent processes.
+    transport : str
+        How the boards are passed to the processes, see `AgentProcess`.
+    max_board_size : int
+        The largest board passed to the processes.
+    """
+
+    def __init__(
+        self,
+        agent_name,
+        processes,
+        transport="shared_memory",
+        max_board_size=MAX_BOARD_SIZE,
+    ):
+        self.agent_name = agent_name
+        self.processes = [
+            AgentProcess(agent_name, transport, max_board_size)
+            for _ in range(processes)
+        ]
+        self.idle = asyncio.Queue()
+
+    async def start(self):
+        await asyncio.gather(*(process.start() for process in self.processes))
+        for process in self.processes:
+            self.idle.put_nowait(process)
+
+    @asynccontextmanager
+    async def acquire(self):
+        """
+        Wait for an idle process of the pool and lend it for the duration of the block.
+        """
+        process = await self.idle.get()
+        try:
+            yield process
+        finally:
+            self.idle.put_nowait(process)
+
+    async def close(self):
+        await asyncio.gather(*(process.close() for process in self.processes))
+
+
+class MatchServer:
+    """
+    Play many games concurrently between two agents running in separate processes.
+
+    Each game is a `World` between `RemoteAgent`s, and the agents are asked for their
+    steps over pipes, so a slow agent only holds up the games waiting on it.
+
+    Parameters
+    ----------
+    player_1 : str
+        The registered name of the first agent.
+    player_2 : str
+        The registered name of the second agent.
+    processes : int
+        The number of processes started for each agent.
+    concurrency : int
+        The maximum number of games in progress at the same time.
+    move_timeout : float
+        The time allowed for each step in seconds, None to wait forever. A step
+        that times out or fails is replaced by a Random Walk.
+    transport : str
+        How the boards are passed to the agent processes, see `AgentProcess`.
+    """
+
+    def __init__(
+        self,
+        player_1,
+        player_2,
+        processes=4,
+        concurrency=64,
+        move_timeout=None,
+        transport="shared_memory",
+    ):
+        self.player_1 = player_1
+        self.player_2 = player_2
+        self.processes = processes
+        self.concurrency = concurrency
+        self.move_timeout = move_timeout
+        self.transport = transport
+
+    async def play_game(self, pools, swap_players, board_size):
+        """
+        Play one game to the end.
+
+        Parameters
+        ----------
+        pools : dict
+            The `AgentPool` of each registered agent name.
+        swap_players : bool
+            if True, player_2 moves first
+        board_size : int
+            The size of the board.
+
+        Returns
+        -------
+        p0_score, p1_score, p0_time, p1_time
+            The scores and thinking times of player_1 and player_2.
+        """
+        player_1, player_2 = self.player_1, self.player_2
+        if swap_players:
+            player_1, player_2 = player_2, player_1
+        agents = (RemoteAgent(player_1), RemoteAgent(player_2))
+        world = World(player_1=agents[0], player_2=agents[1], board_size=board_size)
+        while world.initial_end:
+            world = World(player_1=agents[0], player_2=agents[1], board_size=board_size)
+        players = (pools[player_1], pools[player_2])
+
+        is_end = False
+        while not is_end:
+            _, cur_pos, adv_pos = world.get_current_player()
+            try:
+                async with players[world.turn].acquire() as process:
+                    start_time = time()
+                    try:
+                        next_pos, dir = await process.step(
+                            world.chess_board,
+                            cur_pos,
+                            adv_pos,
+                            world.max_step,
+                            timeout=self.move_timeout,
+                        )
+                    finally:
+                        # Failed steps and timeouts are charged too
+                        world.update_player_time(time() - start_time)
+                next_pos = world.check_step(next_pos, dir)
+            except (asyncio.TimeoutError, OSError, RuntimeError, ValueError) as e:
+                logger.warning(
+                    f"Step of {world.player_names[world.turn]} failed ({type(e).__name__}: {e}). Execute Random Walk!"
+                )
+                world.random_walks[world.turn] += 1
+                next_pos, dir = world.random_walk(tuple(cur_pos), tuple(adv_pos))
+                next_pos = np.asarray(next_pos, dtype=cur_pos.dtype)
+            is_end, p0_score, p1_score = world.apply_step(next_pos, dir)
+
+        if swap_players:
+            return p1_score, p0_score, world.p1_time, world.p0_time
+        return p0_score, p1_score, world.p0_time, world.p1_time
+
+    async def run(self, games, board_size_min=6, board_size_max=12):
+        """
+        Play `games` games, alternating which agent moves first.
+
+        Parameters
+        ----------
+        games : int
+            The number of games to play.
+        board_size_min : int
+            The minimum board size.
+        board_size_max : int
+            The maximum board size, exclusive as in `Simulator.autoplay`.
+
+        Returns
+        -------
+        list of tuple
+            The `(p0_score, p1_score, p0_time, p1_time)` of each game, in order.
+        """
+        pools = {
+            name: AgentPool(
+                name, self.processes, self.transport, max(board_size_max - 1, 1)
+            )
+            for name in {self.player_1, self.player_2}
+        }
+        await asyncio.gather(*(pool.start() for pool in pools.values()))
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded_game(i):
+            async with semaphore:
+                board_size = np.random.randint(board_size_min, board_size_max)
+                return await self.play_game(pools, i % 2 == 0, board_size)
+
+        try:
+            return await asyncio.gather(*(bounded_game(i) for i in range(games)))
+        finally:
+            await asyncio.gather(*(pool.close() for pool in pools.values()))
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--player_1", type=str, default="random_agent")
+    parser.add_argument("--player_2", type=str, default="random_agent")
+    parser.add_argument("--board_size_min", type=int, default=6)
+    parser.add_argument("--board_size_max", type=int, default=12)
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=4,
+        help="The number of processes started for each agent",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=64,
+        help="The maximum number of games in progress at the same time",
+    )
+    parser.add_argument("--move_timeout", type=float, default=None)
+    parser.add_argument(
+        "--transport",
+        type=str,
+        default="shared_memory",
+        choices=["shared_memory", "json"],
+        help="How the boards are passed to the agent processes",
+    )
+    args = parser.parse_args()
+    return args
+
+
+if __name__ == "__main__":
+    args = get_args()
+    server = MatchServer(
+        args.player_1,
+        args.player_2,
+        processes=args.processes,
+        concurrency=args.concurrency,
+        move_timeout=args.move_timeout,
+        transport=args.transport,
+    )
+    with all_logging_disabled(logging.INFO):
+        results = asyncio.run(
+            server.run(args.games, args.board_size_min, args.board_size_max)
+        )
+    p1_win_count = sum(p0_score >= p1_score for p0_score, p1_score, _, _ in results)
+    p2_win_count = sum(p0_score <= p1_score for p0_score, p1_score, _, _ in results)
+    logger.info(
+        f"Player {PLAYER_1_NAME} win percentage: {p1_win_count / args.games} ({np.round(np.mean([r[2] for r in results]), 5)} seconds/game)"
+    )
+    logger.info(
+        f"Player {PLAYER_2_NAME} win percentage: {p2_win_count / args.games}, ({np.round(np.mean([r[3] for r in results]), 5)} seconds/game)"
+    )
@@ -0,0 +1,178 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import threading
+from time import time
+
+# Upper bounds of the step time buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0)
+
+
+class Histogram:
+    """
+    Counts of observations in cumulative buckets, as a Prometheus histogram.
+
+    Parameters
+    ----------
+    buckets : tuple of float
+        The increasing upper bounds of the buckets, +Inf is added.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, x):
+        for i, bound in enumerate(self.buckets):
+            if x <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += x
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f"{name}_sum{{{labels}}} {self.sum}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+class MetricsExporter:
+    """
+    Live metrics of an autoplay run in the Prometheus text format: games played and
+    their rate, wins, and for each agent its steps, step time histogram and steps
+    replaced by a Random Walk.
+
+    The metrics are served over HTTP with `serve` and/or written to a file with
+    `dump`. Updates and reads are guarded by a lock, so the server thread can read
+    while the games are played.
+
+    Parameters
+    ----------
+    player_1 : str
+        The name of the first agent.
+    player_2 : str
+        The name of the second agent.
+    """
+
+    def __init__(self, player_1, player_2):
+        self.player_names = (player_1, player_2)
+        self.lock = threading.Lock()
+        self.start_time = time()
+        self.games = 0
+        self.wins = [0, 0]
+        self.ties = 0
+        self.moves = [0, 0]
+        self.random_walks = [0, 0]
+        self.latencies = (Histogram(), Histogram())
+        self.server = None
+
+    def observe_move(self, player, seconds):
+        """
+        Record the time taken by player 0 (player 1) or 1 (player 2) for a step.
+        """
+        with self.lock:
+            self.moves[player] += 1
+            self.latencies[player].observe(seconds)
+
+    def observe_game(self, score_1, score_2, random_walks_1, random_walks_2):
+        """
+        Record the scores of a finished game and the number of steps of each player
+        that were replaced by a Random Walk.
+        """
+        with self.lock:
+            self.games += 1
+            if score_1 == score_2:
+                self.ties += 1
+            else:
+                self.wins[0 if score_1 > score_2 else 1] += 1
+            self.random_walks[0] += random_walks_1
+            self.random_walks[1] += random_walks_2
+
+    def render(self):
+        """
+        Get the metrics in the Prometheus text exposition format.
+        """
+        with self.lock:
+            elapsed = time() - self.start_time
+            lines = [
+                "# HELP autoplay_games_total Games played.",
+                "# TYPE autoplay_games_total counter",
+                f"autoplay_games_total {self.games}",
+                "# HELP autoplay_games_per_second Games played per second since the start.",
+                "# TYPE autoplay_games_per_second gauge",
+                f"autoplay_games_per_second {self.games / elapsed if elapsed else 0.0}",
+                "# HELP autoplay_ties_total Games tied.",
+                "# TYPE autoplay_ties_total counter",
+                f"autoplay_ties_total {self.ties}",
+            ]
+            per_agent = (
+                ("autoplay_wins_total", "counter", "Games won.", self.wins),
+                ("autoplay_moves_total", "counter", "Steps taken.", self.moves),
+                (
+                    "autoplay_random_walks_total",
+                    "counter",
+                    "Steps replaced by a Random Walk after a failed or invalid step.",
+                    self.random_walks,
+                ),
+            )
+            for name, kind, help, values in per_agent:
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                for player, value in enumerate(values):
+                    lines.append(f"{name}{{{self._labels(player)}}} {value}")
+            name = "autoplay_move_seconds"
+            lines += [
+                f"# HELP {name} Time taken by the agent for each step.",
+                f"# TYPE {name} histogram",
+            ]
+            for player, histogram in enumerate(self.latencies):
+                lines += histogram.lines(name, self._labels(player))
+        return "\n".join(lines) + "\n"
+
+    def _labels(self, player):
+        return f'player="{player + 1}",agent="{self.player_names[player]}"'
+
+    def dump(self, path):
+        """
+        Write the metrics to `path`, replacing it atomically so that readers never
+        see a partial file.
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """
+        Serve the metrics at http://host:port/metrics from a background thread.
+        """
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
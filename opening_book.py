@@ -0,0 +1,283 @@
+import argparse
+import hashlib
+import logging
+from multiprocessing import Pool
+import numpy as np
+from tqdm import tqdm
+from search import AlphaBetaSearch
+from utils import all_logging_disabled
+
+logging.basicConfig(format="%(levelname)s:%(message)s", level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+# One row per book position, sorted by key so lookups are a binary search
+BOOK_DTYPE = np.dtype(
+    [("key", "<u8"), ("row", "u1"), ("col", "u1"), ("dir", "u1"), ("depth", "u1")]
+)
+
+# Wall channel permutations for a left-right flip and a counter-clockwise rotation
+FLIP_DIRS = (0, 3, 2, 1)
+ROT_DIRS = (3, 0, 1, 2)
+ROT_CHANNELS = [1, 2, 3, 0]
+
+
+def transform_board(chess_board, t):
+    """
+    Apply one of the 8 symmetries of the square to a chess board.
+
+    Parameters
+    ----------
+    chess_board : numpy.ndarray of shape (board_size, board_size, 4)
+        The chess board.
+    t : int
+        The symmetry in [0, 7]: an optional left-right flip (t >= 4) followed by
+        t % 4 counter-clockwise quarter turns.
+
+    Returns
+    -------
+    numpy.ndarray of shape (board_size, board_size, 4)
+    """
+    if t >= 4:
+        chess_board = chess_board[:, ::-1, :][..., list(FLIP_DIRS)]
+    for _ in range(t % 4):
+        chess_board = np.rot90(chess_board, 1, axes=(0, 1))[..., ROT_CHANNELS]
+    return chess_board
+
+
+def transform_move(board_size, pos, dir, t):
+    """
+    Apply the symmetry `t` (see `transform_board`) to a position and a direction.
+    """
+    r, c = pos
+    if t >= 4:
+        c = board_size - 1 - c
+        dir = FLIP_DIRS[dir]
+    for _ in range(t % 4):
+        r, c = board_size - 1 - c, r
+        dir = ROT_DIRS[dir]
+    return (r, c), dir
+
+
+def inverse_transform_move(board_size, pos, dir, t):
+    """
+    Undo the symmetry `t` (see `transform_board`) on a position and a direction.
+    """
+    r, c = pos
+    for _ in range(t % 4):
+        r, c = c, board_size - 1 - r
+        dir = ROT_DIRS.index(dir)
+    if t >= 4:
+        c = board_size - 1 - c
+        dir = FLIP_DIRS[dir]
+    return (r, c), dir
+
+
+def canonical_key(chess_board, my_pos, adv_pos, max_step):
+    """
+    Hash a position so that all its symmetric variants share the same key.
+
+    Parameters
+    ----------
+    chess_board : numpy.ndarray of shape (board_size, board_size, 4)
+        The chess board.
+    my_pos : tuple of int
+        The position of the player to move.
+    adv_pos : tuple of int
+        The position of the adversary.
+    max_step : int
+        The maximum number of steps that a player can take.
+
+    Returns
+    -------
+    key : int
+        A 64-bit hash of the canonical variant of the position.
+    t : int
+        The symmetry mapping the given position onto its canonical variant.
+    """
+    board_size = chess_board.shape[0]
+    best, best_t = None, 0
+    for t in range(8):
+        my_t, _ = transform_move(board_size, my_pos, 0, t)
+        adv_t, _ = transform_move(board_size, adv_pos, 0, t)
+        data = (
+            np.packbits(transform_board(chess_board, t)).tobytes()
+            + bytes((board_size, max_step))
+            + bytes(my_t)
+            + bytes(adv_t)
+        )
+        if best is None or data < best:
+            best, best_t = data, t
+    key = int.from_bytes(hashlib.blake2b(best, digest_size=8).digest(), "little")
+    return key, best_t
+
+
+class OpeningBook:
+    """
+    Read-only table of precomputed moves, memory-mapped from a `.npy` file.
+
+    Parameters
+    ----------
+    path : str
+        The path of a book written by `build_book`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.table = np.load(path, mmap_mode="r")
+
+    def __len__(self):
+        return len(self.table)
+
+    def lookup(self, chess_board, my_pos, adv_pos, max_step):
+        """
+        Look up the book move of a position.
+
+        Returns
+        -------
+        move : tuple of ((int, int), int)
+            The book move in the frame of the given board, or None if the position
+            is not in the book.
+        """
+        key, t = canonical_key(chess_board, my_pos, adv_pos, max_step)
+        keys = self.table["key"]
+        idx = int(np.searchsorted(keys, key))
+        if idx >= len(keys) or keys[idx] != key:
+            return None
+        entry = self.table[idx]
+        return inverse_transform_move(
+            chess_board.shape[0],
+            (int(entry["row"]), int(entry["col"])),
+            int(entry["dir"]),
+            t,
+        )
+
+
+def book_entries(seed, board_size, depth, plies):
+    """
+    Generate a starting position and search its first moves.
+
+    Parameters
+    ----------
+    seed : int
+        The seed used to generate the starting position.
+    board_size : int
+        The size of the board.
+    depth : int
+        The search depth, in plies.
+    plies : int
+        The number of opening moves to store, both players included.
+
+    Returns
+    -------
+    list of tuple
+        The book rows `(key, row, col, dir, depth)`.
+    """
+    # Imported here so that the world (and its agents) is only loaded by workers
+    from world import World
+
+    np.random.seed(seed)
+    with all_logging_disabled():
+        world = World(board_size=board_size)
+        if world.initial_end:
+            return []
+        searcher = AlphaBetaSearch()
+        entries = []
+        for _ in range(plies):
+            _, my_pos, adv_pos = world.get_current_player()
+            my_pos, adv_pos = tuple(int(x) for x in my_pos), tuple(
+                int(x) for x in adv_pos
+            )
+            move, _ = searcher.search(
+                world.chess_board, my_pos, adv_pos, world.max_step, depth
+            )
+            if move is None:
+                break
+            key, t = canonical_key(world.chess_board, my_pos, adv_pos, world.max_step)
+            (r, c), dir = transform_move(board_size, move[0], move[1], t)
+            entries.append((key, r, c, dir, depth))
+
+            # Play the move to reach the next book position
+            next_pos = np.asarray(move[0])
+            if not world.turn:
+                world.p0_pos = next_pos
+            else:
+                world.p1_pos = next_pos
+            world.set_barrier(move[0][0], move[0][1], move[1])
+            world.turn = 1 - world.turn
+            if world.check_endgame()[0]:
+                break
+    return entries
+
+
+def _book_entries(job):
+    return book_entries(*job)
+
+
+def build_book(path, positions, board_size_min, board_size_max, depth, plies, workers):
+    """
+    Build an opening book and write it to `path`.
+
+    Parameters
+    ----------
+    path : str
+        The path of the `.npy` file to write.
+    positions : int
+        The number of starting positions to generate.
+    board_size_min : int
+        The minimum board size, inclusive.
+    board_size_max : int
+        The maximum board size, inclusive.
+    depth : int
+        The search depth, in plies.
+    plies : int
+        The number of opening moves to store per starting position.
+    workers : int
+        The number of worker processes.
+    """
+    rng = np.random.default_rng()
+    jobs = [
+        (
+            int(rng.integers(2**31)),
+            int(rng.integers(board_size_min, board_size_max + 1)),
+            depth,
+            plies,
+        )
+        for _ in range(positions)
+    ]
+    rows = {}
+    with Pool(workers) as pool:
+        for entries in tqdm(pool.imap_unordered(_book_entries, jobs), total=len(jobs)):
+            for entry in entries:
+                # Keep the deepest search of a position found several times
+                if entry[0] not in rows or rows[entry[0]][4] < entry[4]:
+                    rows[entry[0]] = entry
+    table = np.array(sorted(rows.values()), dtype=BOOK_DTYPE)
+    np.save(path, table)
+    logger.info(f"Wrote {len(table)} book positions to {path}")
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output", type=str, default="opening_book.npy")
+    parser.add_argument("--positions", type=int, default=1000)
+    parser.add_argument("--board_size_min", type=int, default=5)
+    parser.add_argument("--board_size_max", type=int, default=12)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--plies", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    return args
+
+
+if __name__ == "__main__":
+    args = get_args()
+    build_book(
+        args.output,
+        args.positions,
+        args.board_size_min,
+        args.board_size_max,
+        args.depth,
+        args.plies,
+        args.workers,
+    )
@@ -0,0 +1,126 @@
+import numpy as np
+from agents.student_agent import StudentAgent
+from endgame import score_walls
+
+
+class MoveOrdering:
+    """
+    Move ordering for `search.AlphaBetaSearch`, so that the moves most likely to
+    cause a cutoff are searched first.
+
+    Moves are ordered by:
+
+    1. the move to search first, such as the best move of the previous iteration
+       of iterative deepening,
+    2. the killer moves of the ply, the last moves that caused a cutoff at the
+       same depth in the tree, most recent first,
+    3. the history table, the sum of depth * depth over the cutoffs caused by a
+       move, indexed by its cell and direction,
+    4. the weighted sum of the `StudentAgent` heuristics of the move.
+
+    The tables are kept across searches, so that they carry over between the
+    iterations of iterative deepening and between the steps of a game. Call
+    `age` between steps, and `clear` between games.
+
+    Parameters
+    ----------
+    killers : int
+        The number of killer moves kept per ply.
+    weights : tuple of float
+        The weight of each heuristic, in the order of `StudentAgent.HEURISTICS`.
+        Defaults to 1 for all, as in `StudentAgent`.
+    """
+
+    def __init__(self, killers=2, weights=None):
+        self.num_killers = killers
+        self.weights = np.asarray(
+            weights if weights is not None else (1.0,) * len(StudentAgent.HEURISTICS)
+        )
+        self.board_size = None
+        self.killers = []
+        self.history = []
+
+    def clear(self, board_size=None):
+        """
+        Forget the killer moves and the history, for a board of `board_size`.
+        """
+        self.board_size = board_size
+        self.killers = []
+        self.history = [0] * (board_size * board_size * 4 if board_size else 0)
+
+    def age(self):
+        """
+        Halve the history, so that recent cutoffs weigh more than old ones.
+        """
+        self.history = [value // 2 for value in self.history]
+
+    def order(self, chess_board, moves, my_pos, adv_pos, ply, first=None, static=True):
+        """
+        Sort the moves of the player at `my_pos`, best first.
+
+        Parameters
+        ----------
+        chess_board : numpy.ndarray of shape (board_size, board_size, 4)
+            The chess board.
+        moves : list of ((int, int), int)
+            The moves to sort.
+        my_pos : tuple of int
+            The position of the player to move.
+        adv_pos : tuple of int
+            The position of the adversary.
+        ply : int
+            The distance from the root of the search.
+        first : ((int, int), int)
+            If not None, a move to search before all others.
+        static : bool
+            Whether to break ties with the heuristics, which costs a pass over the
+            board.
+
+        Returns
+        -------
+        list of ((int, int), int)
+        """
+        board_size = chess_board.shape[0]
+        if board_size != self.board_size:
+            self.clear(board_size)
+        if static and moves:
+            wall_scores = score_walls(chess_board, my_pos, adv_pos)
+            end_game = [
+                StudentAgent.get_winning_heuristic(*wall_scores[move]) for move in moves
+            ]
+            heuristics = StudentAgent.get_heuristics_array(
+                board_size, chess_board, moves, adv_pos, end_game
+            )
+            scores = (heuristics @ self.weights).tolist()
+        else:
+            scores = [0.0] * len(moves)
+        killers = self.killers[ply] if ply < len(self.killers) else []
+        history = self.history
+
+        def key(i):
+            move = moves[i]
+            (x, y), direction = move
+            killer = killers.index(move) if move in killers else len(killers)
+            return (
+                move != first,
+                killer,
+                -history[(x * board_size + y) * 4 + direction],
+                -scores[i],
+            )
+
+        return [moves[i] for i in sorted(range(len(moves)), key=key)]
+
+    def cutoff(self, move, ply, depth):
+        """
+        Record that `move` caused a cutoff at `ply`, with `depth` plies left to
+        search.
+        """
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if move in killers:
+            killers.remove(move)
+        killers.insert(0, move)
+        del killers[self.num_killers :]
+        (x, y), direction = move
+        self.history[(x * self.board_size + y) * 4 + direction] += depth * depth
@@ -0,0 +1,174 @@
+import math
+import multiprocessing
+import os
+import weakref
+from time import time
+from agents.student_agent import StudentAgent
+from gamestate import GameState
+from ordering import MoveOrdering
+from search import AlphaBetaSearch, SearchAborted
+from topology import get_topology
+from transport import MAX_BOARD_SIZE, BoardRing
+
+# Seconds between checks of the stop event while waiting for the workers
+STOP_POLL_INTERVAL = 0.01
+
+# State of each worker process, set by _init_worker
+_ring = None
+_search = None
+
+
+def _init_worker(ring_name, ready):
+    global _ring, _search
+    # Started by the creator of the ring, with which the resource tracker is shared
+    _ring = BoardRing(ring_name, untrack=False)
+    _search = AlphaBetaSearch(ordering=MoveOrdering())
+    ready.put(os.getpid())
+
+
+def _search_moves(slot, moves, depth, deadline):
+    """
+    Search some of the root moves of the state in a slot of the ring.
+
+    Returns
+    -------
+    tuple of (move, score, nodes)
+        The best of the moves, its score and the number of nodes searched, or None
+        if the deadline passed first.
+    """
+    if deadline is not None and time() >= deadline:
+        return None
+    state = _ring.get(slot)
+    try:
+        move, score = _search.search(
+            state.chess_board,
+            state.my_pos,
+            state.adv_pos,
+            state.max_step,
+            depth,
+            deadline=deadline,
+            moves=moves,
+        )
+    except SearchAborted:
+        return None
+    return move, score, _search.nodes
+
+
+def _shutdown(pool, ring):
+    pool.terminate()
+    pool.join()
+    ring.close()
+    ring.unlink()
+
+
+class RootParallelSearch:
+    """
+    Alpha-beta search with the root moves split between a persistent pool of
+    worker processes, so that a single search uses several cores despite the GIL.
+
+    The position is written once to a shared memory ring (`transport.BoardRing`)
+    and the workers only receive its slot and their share of the root moves. The
+    root moves are ordered as in `ordering.MoveOrdering` and dealt out in turn, so
+    each worker gets a share of the promising ones. Each worker searches its share
+    with `search.AlphaBetaSearch`, keeping its own ordering tables between searches,
+    and the best of the workers' results is taken.
+
+    Has the `search` interface of `search.AlphaBetaSearch`, so it can replace it in
+    iterative deepening. The pool and the ring are released by `close`, or when the
+    search is garbage collected. Creating the search waits until every worker has
+    started, so that the first searches are not spent starting processes.
+
+    Parameters
+    ----------
+    workers : int
+        The number of worker processes, defaults to the number of CPUs.
+    max_board_size : int
+        The largest board size that can be searched.
+    """
+
+    def __init__(self, workers=None, max_board_size=MAX_BOARD_SIZE):
+        self.workers = workers or os.cpu_count()
+        self.ring = BoardRing(slots=4, max_board_size=max_board_size)
+        # Spawned rather than forked, as the parent may have other threads running
+        context = multiprocessing.get_context("spawn")
+        ready = context.Queue()
+        self.pool = context.Pool(
+            self.workers, initializer=_init_worker, initargs=(self.ring.name, ready)
+        )
+        for _ in range(self.workers):
+            ready.get()
+        self.ordering = MoveOrdering()
+        self.nodes = 0
+        self._finalizer = weakref.finalize(self, _shutdown, self.pool, self.ring)
+
+    def search(
+        self,
+        chess_board,
+        my_pos,
+        adv_pos,
+        max_step,
+        depth,
+        deadline=None,
+        stop=None,
+        first=None,
+    ):
+        """
+        Search the best move for the player at `my_pos`, see
+        `search.AlphaBetaSearch.search`.
+
+        Raises
+        ------
+        SearchAborted
+            If the deadline passed or `stop` was set before all the workers finished.
+        """
+        my_pos, adv_pos = tuple(my_pos), tuple(adv_pos)
+        valid_moves = StudentAgent.get_valid_moves(
+            chess_board, my_pos, adv_pos, max_step
+        )
+        moves = [
+            group[0]
+            for group in get_topology(chess_board.shape[0]).equivalent_moves(
+                chess_board, my_pos, adv_pos, valid_moves
+            )
+        ]
+        if not moves:
+            return None, -AlphaBetaSearch.WIN_SCORE
+        moves = self.ordering.order(chess_board, moves, my_pos, adv_pos, 0, first=first)
+        slot = self.ring.put(
+            GameState.from_board(chess_board, my_pos, adv_pos, 0, max_step)
+        )
+        results = [
+            self.pool.apply_async(
+                _search_moves, (slot, moves[i :: self.workers], depth, deadline)
+            )
+            for i in range(min(self.workers, len(moves)))
+        ]
+
+        self.nodes = 0
+        best_move, best_score = None, -math.inf
+        for result in results:
+            while not result.ready():
+                if stop is not None and stop.is_set():
+                    raise SearchAborted
+                timeout = STOP_POLL_INTERVAL if stop is not None else None
+                if deadline is not None:
+                    remaining = deadline - time()
+                    if remaining <= 0:
+                        raise SearchAborted
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+                result.wait(timeout)
+            found = result.get()
+            if found is None:
+                raise SearchAborted
+            move, score, nodes = found
+            self.nodes += nodes
+            # Ties go to the earlier share, which holds the first moves of the order
+            if score > best_score:
+                best_move, best_score = move, score
+        return best_move, best_score
+
+    def close(self):
+        """
+        Stop the worker processes and release the ring.
+        """
+        self._finalizer()
@@ -0,0 +1,168 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import json
+import logging
+import os
+from pathlib import Path
+from tqdm import tqdm
+from utils import decode_board
+
+logging.basicConfig(format="%(levelname)s:%(message)s", level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+# Moves (Up, Right, Down, Left)
+MOVES = ((-1, 0), (0, 1), (1, 0), (0, -1))
+
+
+def load_records(paths):
+    """
+    Read the game records of JSON lines files written with `--record_path`.
+
+    Parameters
+    ----------
+    paths : list of str
+        The files to read.
+
+    Returns
+    -------
+    generator of dict
+        The records, see `World.get_record`.
+    """
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class ReplayWorld:
+    """
+    The state of a recorded game, with the attributes of `World` used by `UIEngine`.
+
+    Parameters
+    ----------
+    record : dict
+        A record written by `World.get_record`.
+    display_save_path : str
+        The directory to save the GIF to.
+    frame_duration : float
+        The duration of each frame, in seconds.
+    """
+
+    def __init__(self, record, display_save_path, frame_duration=0.4):
+        self.record = record
+        self.board_size = record["board_size"]
+        self.max_step = record["max_step"]
+        self.player_1_name = record["player_1"]
+        self.player_2_name = record["player_2"]
+        self.p0 = record["agent_1"]
+        self.p1 = record["agent_2"]
+        self.chess_board = decode_board(record["chess_board"], self.board_size)
+        self.p0_pos = tuple(record["p0_pos"])
+        self.p1_pos = tuple(record["p1_pos"])
+        self.turn = 0
+        self.results_cache = ()
+        self.display_save = True
+        self.display_save_path = display_save_path
+        self.display_save_format = "gif"
+        self.display_delay = frame_duration
+
+    def replay(self):
+        """
+        Play the recorded steps, yielding after the start and after each step.
+        """
+        yield
+        moves = self.record["moves"]
+        for i, (r, c, dir) in enumerate(moves):
+            if not self.turn:
+                self.p0_pos = (r, c)
+            else:
+                self.p1_pos = (r, c)
+            self.chess_board[r, c, dir] = True
+            m_r, m_c = MOVES[dir]
+            self.chess_board[r + m_r, c + m_c, (dir + 2) % 4] = True
+            self.turn = 1 - self.turn
+            if i == len(moves) - 1 and self.record["results"]:
+                self.results_cache = tuple(self.record["results"])
+            yield
+
+
+def render_game(index, record, output_dir, frame_duration=0.4):
+    """
+    Render a recorded game headlessly to `<output_dir>/game_<index>.gif`.
+
+    Returns
+    -------
+    path : str
+        The path of the GIF.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from ui import UIEngine
+
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    world = ReplayWorld(record, output_dir, frame_duration)
+    engine = UIEngine(
+        world.board_size, world, figure=figure, save_prefix=f"game_{index}"
+    )
+    for _ in world.replay():
+        engine.render(world.chess_board, world.p0_pos, world.p1_pos)
+    engine.close()
+    return os.path.join(output_dir, f"game_{index}.gif")
+
+
+def _init_worker():
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+def render_games(records, output_dir, frame_duration=0.4, workers=None):
+    """
+    Render recorded games to GIFs in a process pool.
+
+    Parameters
+    ----------
+    records : iterable of dict
+        The records to render, see `World.get_record`.
+    output_dir : str
+        The directory to write `game_<index>.gif` files to.
+    frame_duration : float
+        The duration of each frame, in seconds.
+    workers : int
+        The number of worker processes, defaults to the number of CPUs.
+
+    Returns
+    -------
+    list of str
+        The paths of the GIFs, in the order of the records.
+    """
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    with ProcessPoolExecutor(workers, initializer=_init_worker) as executor:
+        futures = [
+            executor.submit(render_game, i, record, output_dir, frame_duration)
+            for i, record in enumerate(records)
+        ]
+        return [future.result() for future in tqdm(futures)]
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "records", type=str, nargs="+", help="JSON lines files of game records"
+    )
+    parser.add_argument("--output", type=str, default="renders/")
+    parser.add_argument("--frame_duration", type=float, default=0.4)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    return args
+
+
+if __name__ == "__main__":
+    args = get_args()
+    paths = render_games(
+        load_records(args.records), args.output, args.frame_duration, args.workers
+    )
+    logger.info(f"Rendered {len(paths)} games to {args.output}")
@@ -0,0 +1,216 @@
+import math
+from time import time
+from agents.student_agent import StudentAgent
+from territory import territory_evaluation
+from topology import LatticeUnionFind, get_topology
+
+
+def mobility_evaluation(chess_board, my_pos, adv_pos, max_step):
+    """
+    Evaluate a position by the difference in the number of legal moves.
+
+    The difference is divided by the most moves a player can have, four per cell,
+    so that no position scores as much as a won or lost game.
+
+    Parameters
+    ----------
+    chess_board : numpy.ndarray of shape (board_size, board_size, 4)
+        The chess board.
+    my_pos : tuple of int
+        The position of the player the evaluation is computed for.
+    adv_pos : tuple of int
+        The position of the adversary.
+    max_step : int
+        The maximum number of steps that a player can take.
+
+    Returns
+    -------
+    score : float
+        Between -1 and 1, positive if the player has more moves available than the
+        adversary.
+    """
+    my_moves = StudentAgent.get_valid_moves(chess_board, my_pos, adv_pos, max_step)
+    adv_moves = StudentAgent.get_valid_moves(chess_board, adv_pos, my_pos, max_step)
+    return (len(my_moves) - len(adv_moves)) / (4 * chess_board.shape[0] ** 2)
+
+
+class SearchAborted(Exception):
+    """
+    Raised when a search passes its deadline or is stopped.
+    """
+
+
+class AlphaBetaSearch:
+    """
+    Depth-limited negamax search with alpha-beta pruning.
+
+    The board is mutated in place while searching and restored before returning,
+    in the same way StudentAgent.step tries candidate barriers. A search that is
+    aborted (see `search`) leaves barriers on the board, so search a copy if it
+    may be aborted.
+
+    Parameters
+    ----------
+    evaluate : callable
+        Leaf evaluation `evaluate(chess_board, my_pos, adv_pos, max_step)`, from the
+        perspective of the player at `my_pos` (the player that just moved),
+        strictly between -`WIN_SCORE` and `WIN_SCORE` so that won and lost games
+        outrank every other position. Defaults to the territory difference.
+    ordering : ordering.MoveOrdering
+        If not None, orders the moves of each node and learns from the cutoffs.
+        Otherwise moves are searched in the order of
+        `StudentAgent.get_valid_moves`.
+    """
+
+    WIN_SCORE = StudentAgent.WinningHeuristic.WIN.value
+
+    def __init__(self, evaluate=territory_evaluation, ordering=None):
+        self.evaluate = evaluate
+        self.ordering = ordering
+        self.nodes = 0
+        self.deadline = None
+        self.stop = None
+        self.first = None
+        self.root_moves = None
+
+    def search(
+        self,
+        chess_board,
+        my_pos,
+        adv_pos,
+        max_step,
+        depth,
+        deadline=None,
+        stop=None,
+        first=None,
+        moves=None,
+    ):
+        """
+        Search the best move for the player at `my_pos`.
+
+        Parameters
+        ----------
+        chess_board : numpy.ndarray of shape (board_size, board_size, 4)
+            The chess board.
+        my_pos : tuple of int
+            The position of the player to move.
+        adv_pos : tuple of int
+            The position of the adversary.
+        max_step : int
+            The maximum number of steps that a player can take.
+        depth : int
+            The number of plies to search, at least 1.
+        deadline : float
+            If not None, the `time.time()` after which the search is aborted.
+        stop : threading.Event
+            If not None, the search is aborted once the event is set.
+        first : tuple of ((int, int), int)
+            If not None and the search has a move ordering, the move searched first
+            at the root, such as the best move of a shallower search.
+        moves : list of ((int, int), int)
+            If not None, the valid moves searched at the root instead of all of
+            them, such as a share of the root moves of a parallel search.
+
+        Returns
+        -------
+        move : tuple of ((int, int), int)
+            The best move found, or None if the player has no move.
+        score : float
+            The negamax score of the best move.
+
+        Raises
+        ------
+        SearchAborted
+            If the deadline passed or `stop` was set before the search finished.
+        """
+        self.nodes = 0
+        self.deadline = deadline
+        self.stop = stop
+        self.first = first
+        self.root_moves = moves
+        return self._negamax(
+            chess_board,
+            tuple(my_pos),
+            tuple(adv_pos),
+            max_step,
+            max(depth, 1),
+            -math.inf,
+            math.inf,
+            0,
+        )
+
+    def _negamax(self, chess_board, my_pos, adv_pos, max_step, depth, alpha, beta, ply):
+        board_size = chess_board.shape[0]
+        best_move, best_score = None, -math.inf
+        lattice = LatticeUnionFind(chess_board)
+        # Score of the walls that split no region, as the position is scored now
+        unsplit_result = None
+        if ply == 0 and self.root_moves is not None:
+            valid_moves = self.root_moves
+        else:
+            valid_moves = StudentAgent.get_valid_moves(
+                chess_board, my_pos, adv_pos, max_step
+            )
+        # Symmetric moves score the same, search the first of each group
+        moves = [
+            group[0]
+            for group in get_topology(board_size).equivalent_moves(
+                chess_board, my_pos, adv_pos, valid_moves
+            )
+        ]
+        if self.ordering is not None:
+            moves = self.ordering.order(
+                chess_board,
+                moves,
+                my_pos,
+                adv_pos,
+                ply,
+                first=self.first if ply == 0 else None,
+            )
+        for move in moves:
+            (x, y), direction = move
+            self.nodes += 1
+            if (self.deadline is not None and time() >= self.deadline) or (
+                self.stop is not None and self.stop.is_set()
+            ):
+                raise SearchAborted
+            StudentAgent.set_barrier_to_value(chess_board, x, y, direction, True)
+            if lattice.can_split(x, y, direction):
+                result = StudentAgent.get_endgame_heuristic(
+                    board_size, chess_board, (x, y), adv_pos
+                )
+            else:
+                if unsplit_result is None:
+                    unsplit_result = StudentAgent.get_endgame_heuristic(
+                        board_size, chess_board, my_pos, adv_pos
+                    )
+                result = unsplit_result
+            if result != StudentAgent.WinningHeuristic.NOT_END_GAME.value:
+                score = result
+            elif depth == 1:
+                score = self.evaluate(chess_board, (x, y), adv_pos, max_step)
+            else:
+                _, score = self._negamax(
+                    chess_board,
+                    adv_pos,
+                    (x, y),
+                    max_step,
+                    depth - 1,
+                    -beta,
+                    -alpha,
+                    ply + 1,
+                )
+                score = -score
+            StudentAgent.set_barrier_to_value(chess_board, x, y, direction, False)
+
+            if score > best_score:
+                best_move, best_score = move, score
+            alpha = max(alpha, score)
+            if alpha >= beta or best_score >= self.WIN_SCORE:
+                if self.ordering is not None:
+                    self.ordering.cutoff(move, ply, depth)
+                break
+        if best_move is None:
+            # No legal move: treat as a loss for the player to move
+            return None, -self.WIN_SCORE
+        return best_move, best_score
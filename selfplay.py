@@ -0,0 +1,277 @@
+import argparse
+import logging
+from multiprocessing import Pool
+from pathlib import Path
+import numpy as np
+from tqdm import tqdm
+from agents.student_agent import StudentAgent
+from utils import all_logging_disabled
+
+logging.basicConfig(format="%(levelname)s:%(message)s", level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+# Boards are stored packed in a fixed number of bytes, enough for this size
+MAX_BOARD_SIZE = 12
+
+# One row per step: the position before the step, the step and the game outcome
+SAMPLE_DTYPE = np.dtype(
+    [
+        ("board_size", "u1"),
+        ("max_step", "u1"),
+        ("move_number", "u2"),
+        ("player", "u1"),
+        ("board", "u1", ((MAX_BOARD_SIZE * MAX_BOARD_SIZE * 4 + 7) // 8,)),
+        ("my_pos", "u1", (2,)),
+        ("adv_pos", "u1", (2,)),
+        ("move", "u1", (3,)),
+        ("features", "f4", (len(StudentAgent.HEURISTICS),)),
+        ("outcome", "i1"),
+        ("margin", "i2"),
+    ]
+)
+
+
+def unpack_board(sample):
+    """
+    Get the chess board of a sample.
+
+    Returns
+    -------
+    numpy.ndarray of shape (board_size, board_size, 4)
+    """
+    board_size = int(sample["board_size"])
+    bits = np.unpackbits(sample["board"])[: board_size * board_size * 4]
+    return bits.reshape(board_size, board_size, 4) != 0
+
+
+def play_game(seed, player_1, player_2, board_size, epsilon):
+    """
+    Play one game and record a sample for every step.
+
+    Parameters
+    ----------
+    seed : int
+        The seed of the board and of the agents.
+    player_1 : str
+        The registered name of the first agent.
+    player_2 : str
+        The registered name of the second agent.
+    board_size : int
+        The size of the board.
+    epsilon : float
+        The probability of replacing a step by a uniformly random valid step.
+
+    Returns
+    -------
+    numpy.ndarray of SAMPLE_DTYPE
+    """
+    # Imported here so that the world (and its UI) is only loaded by workers
+    from world import World
+
+    np.random.seed(seed)
+    with all_logging_disabled():
+        world = World(player_1=player_1, player_2=player_2, board_size=board_size)
+        while world.initial_end:
+            world = World(player_1=player_1, player_2=player_2, board_size=board_size)
+
+        samples = []
+        is_end = False
+        while not is_end:
+            state = world.state
+            my_pos, adv_pos = state.my_pos, state.adv_pos
+            sample = np.zeros((), dtype=SAMPLE_DTYPE)
+            sample["board_size"] = board_size
+            sample["max_step"] = state.max_step
+            sample["move_number"] = len(world.history)
+            sample["player"] = state.turn
+            sample["board"][: len(state.walls)] = np.frombuffer(
+                state.walls, dtype=np.uint8
+            )
+            sample["my_pos"] = my_pos
+            sample["adv_pos"] = adv_pos
+            chess_board = state.chess_board
+
+            if np.random.random() < epsilon:
+                valid_moves = StudentAgent.get_valid_moves(
+                    chess_board, my_pos, adv_pos, state.max_step
+                )
+                next_pos, dir = valid_moves[np.random.randint(len(valid_moves))]
+                is_end, p0_score, p1_score = world.apply_step(
+                    np.asarray(next_pos, dtype=world.p0_pos.dtype), dir
+                )
+            else:
+                is_end, p0_score, p1_score = world.step()
+
+            r, c, dir = world.history[-1]
+            sample["move"] = (r, c, dir)
+            sample["features"] = StudentAgent.get_heuristics(
+                board_size, chess_board, r, c, dir, adv_pos
+            )
+            samples.append(sample)
+
+    samples = np.array(samples, dtype=SAMPLE_DTYPE)
+    margin = np.where(samples["player"] == 0, 1, -1) * (p0_score - p1_score)
+    samples["margin"] = margin
+    samples["outcome"] = np.sign(margin)
+    return samples
+
+
+def _play_game(job):
+    return play_game(*job)
+
+
+class ShardWriter:
+    """
+    Buffer samples and write them to numbered `.npy` shards of a fixed size.
+
+    Memory use is bounded by one shard, whatever the number of samples written.
+
+    Parameters
+    ----------
+    directory : str
+        The directory of the shards.
+    shard_size : int
+        The number of samples per shard. The last shard may be smaller.
+    """
+
+    def __init__(self, directory, shard_size=1_000_000):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.buffer = np.zeros(shard_size, dtype=SAMPLE_DTYPE)
+        self.size = 0
+        self.shard_index = len(list(self.directory.glob("shard_*.npy")))
+        self.total = 0
+
+    def write(self, samples):
+        while len(samples) > 0:
+            count = min(len(samples), len(self.buffer) - self.size)
+            self.buffer[self.size : self.size + count] = samples[:count]
+            self.size += count
+            self.total += count
+            samples = samples[count:]
+            if self.size == len(self.buffer):
+                self.flush()
+
+    def flush(self):
+        if self.size == 0:
+            return
+        np.save(
+            self.directory / f"shard_{self.shard_index:05d}.npy",
+            self.buffer[: self.size],
+        )
+        self.shard_index += 1
+        self.size = 0
+
+    def close(self):
+        self.flush()
+
+
+def load_shards(directory):
+    """
+    Memory-map the shards of a directory.
+
+    Returns
+    -------
+    generator of numpy.ndarray of SAMPLE_DTYPE
+    """
+    for path in sorted(Path(directory).glob("shard_*.npy")):
+        yield np.load(path, mmap_mode="r")
+
+
+def generate(
+    directory,
+    games,
+    player_1="student_agent",
+    player_2="student_agent",
+    board_size_min=6,
+    board_size_max=12,
+    epsilon=0.1,
+    shard_size=1_000_000,
+    workers=None,
+):
+    """
+    Play games in parallel and stream their samples to shards.
+
+    Parameters
+    ----------
+    directory : str
+        The directory of the shards. New shards are added after existing ones.
+    games : int
+        The number of games to play.
+    player_1 : str
+        The registered name of the first agent.
+    player_2 : str
+        The registered name of the second agent.
+    board_size_min : int
+        The minimum board size.
+    board_size_max : int
+        The maximum board size, exclusive as in `Simulator.autoplay`.
+    epsilon : float
+        The probability of replacing a step by a uniformly random valid step.
+    shard_size : int
+        The number of samples per shard.
+    workers : int
+        The number of worker processes, defaults to the number of CPUs.
+
+    Returns
+    -------
+    int
+        The number of samples written.
+    """
+    if board_size_max - 1 > MAX_BOARD_SIZE:
+        raise ValueError(f"Boards larger than {MAX_BOARD_SIZE} cannot be stored")
+    seeds = np.random.SeedSequence().generate_state(games)
+    jobs = (
+        (
+            int(seed),
+            # Swap who moves first every other game
+            player_1 if i % 2 == 0 else player_2,
+            player_2 if i % 2 == 0 else player_1,
+            int(board_size_min + seed % (board_size_max - board_size_min)),
+            epsilon,
+        )
+        for i, seed in enumerate(seeds)
+    )
+    writer = ShardWriter(directory, shard_size)
+    with Pool(workers) as pool:
+        for samples in tqdm(pool.imap_unordered(_play_game, jobs), total=games):
+            writer.write(samples)
+    writer.close()
+    return writer.total
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output", type=str, default="selfplay/")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--player_1", type=str, default="student_agent")
+    parser.add_argument("--player_2", type=str, default="student_agent")
+    parser.add_argument("--board_size_min", type=int, default=6)
+    parser.add_argument("--board_size_max", type=int, default=12)
+    parser.add_argument(
+        "--epsilon",
+        type=float,
+        default=0.1,
+        help="Probability of playing a random valid step instead of the agent's",
+    )
+    parser.add_argument("--shard_size", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    return args
+
+
+if __name__ == "__main__":
+    args = get_args()
+    total = generate(
+        args.output,
+        args.games,
+        player_1=args.player_1,
+        player_2=args.player_2,
+        board_size_min=args.board_size_min,
+        board_size_max=args.board_size_max,
+        epsilon=args.epsilon,
+        shard_size=args.shard_size,
+        workers=args.workers,
+    )
+    logger.info(f"Wrote {total} samples to {args.output}")
@@ -1,6 +1,14 @@
 from world import World, PLAYER_1_NAME, PLAYER_2_NAME
 import argparse
+import json
+import os
+import pickle
+import random
+from metrics import MetricsExporter
+from stats import AutoplayStats
+from time import time
 from utils import all_logging_disabled
+from endgame import SCORE_CACHE
 import logging
 from tqdm import tqdm
 import numpy as np
@@ -31,8 +39,93 @@ def get_args():
     parser.add_argument("--display_delay", type=float, default=0.4)
     parser.add_argument("--display_save", action="store_true", default=False)
     parser.add_argument("--display_save_path", type=str, default="plots/")
+    parser.add_argument(
+        "--display_save_format",
+        type=str,
+        default="pdf",
+        choices=["png", "gif", "pdf"],
+        help="png or pdf saves an image per step, gif saves an animation per game",
+    )
+    parser.add_argument(
+        "--record_path",
+        type=str,
+        default=None,
+        help="Append a record of each game to this JSON lines file, see render_games.py",
+    )
+    parser.add_argument(
+        "--time_control",
+        type=float,
+        default=None,
+        help="Seconds on each player's clock for a whole game, told to the agents before each step",
+    )
+    parser.add_argument(
+        "--increment",
+        type=float,
+        default=0.0,
+        help="Seconds added to a player's clock after each of its steps",
+    )
     parser.add_argument("--autoplay", action="store_true", default=False)
     parser.add_argument("--autoplay_runs", type=int, default=1000)
+    parser.add_argument(
+        "--reuse_agents",
+        action="store_true",
+        default=False,
+        help="Play every game with the same agent instances, keeping their caches",
+    )
+    parser.add_argument(
+        "--reset_agents",
+        action="store_true",
+        default=False,
+        help="With --reuse_agents, call Agent.reset on the agents before each game after the first",
+    )
+    parser.add_argument(
+        "--stats_path",
+        type=str,
+        default=None,
+        help="In autoplay mode, write the running statistics to this JSON or CSV file",
+    )
+    parser.add_argument(
+        "--stats_interval",
+        type=int,
+        default=100,
+        help="In autoplay mode, the number of games between writes of the statistics",
+    )
+    parser.add_argument(
+        "--metrics_port",
+        type=int,
+        default=None,
+        help="In autoplay mode, serve live metrics at http://127.0.0.1:PORT/metrics",
+    )
+    parser.add_argument(
+        "--metrics_path",
+        type=str,
+        default=None,
+        help="In autoplay mode, write live metrics in the Prometheus text format to this file",
+    )
+    parser.add_argument(
+        "--metrics_interval",
+        type=float,
+        default=15,
+        help="In autoplay mode, the number of seconds between writes of the metrics",
+    )
+    parser.add_argument(
+        "--checkpoint_path",
+        type=str,
+        default=None,
+        help="In autoplay mode, save the progress of the run to this file",
+    )
+    parser.add_argument(
+        "--checkpoint_interval",
+        type=int,
+        default=100,
+        help="In autoplay mode, the number of games between checkpoints",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        default=False,
+        help="In autoplay mode, continue the run saved in --checkpoint_path if it exists",
+    )
     args = parser.parse_args()
     return args
 
@@ -48,6 +141,8 @@ class Simulator:
 
     def __init__(self, args):
         self.args = args
+        # Agent instances of player_1 and player_2, with --reuse_agents
+        self.agents = None
 
     def reset(self, swap_players=False, board_size=None):
         """
@@ -62,74 +157,234 @@ class Simulator:
         """
         if board_size is None:
             board_size = self.args.board_size
+        player_1, player_2 = self.args.player_1, self.args.player_2
+        if self.args.reuse_agents:
+            if self.agents is None:
+                self.agents = [
+                    World.load_agent(player_1)[1],
+                    World.load_agent(player_2)[1],
+                ]
+            elif self.args.reset_agents:
+                for agent in self.agents:
+                    agent.reset()
+            player_1, player_2 = self.agents
         if swap_players:
-            player_1, player_2 = self.args.player_2, self.args.player_1
-        else:
-            player_1, player_2 = self.args.player_1, self.args.player_2
-        self.world = World(
-            player_1=player_1,
-            player_2=player_2,
-            board_size=board_size,
-            display_ui=self.args.display,
-            display_delay=self.args.display_delay,
-            display_save=self.args.display_save,
-            display_save_path=self.args.display_save_path,
-            autoplay=self.args.autoplay,
-        )
-        if self.world.initial_end:
+            player_1, player_2 = player_2, player_1
+        while True:
+            self.world = World(
+                player_1=player_1,
+                player_2=player_2,
+                board_size=board_size,
+                display_ui=self.args.display,
+                display_delay=self.args.display_delay,
+                display_save=self.args.display_save,
+                display_save_path=self.args.display_save_path,
+                display_save_format=self.args.display_save_format,
+                autoplay=self.args.autoplay,
+                time_control=self.args.time_control,
+                increment=self.args.increment,
+            )
+            if not self.world.initial_end:
+                break
             logger.warning("Initialization failed! Reset the world again!")
-            self.reset()
 
-    def run(self, swap_players=False, board_size=None):
+    def run(self, swap_players=False, board_size=None, stats=None, metrics=None):
+        """
+        Play a game to the end.
+
+        Parameters
+        ----------
+        swap_players : bool
+            if True, swap the players
+        board_size : int
+            if not None, set the board size
+        stats : stats.AutoplayStats
+            if not None, record the time of each step, failed steps included
+        metrics : metrics.MetricsExporter
+            if not None, record the time of each step, failed steps included
+        """
         self.reset(swap_players=swap_players, board_size=board_size)
-        is_end, p0_score, p1_score = self.world.step()
+        is_end = False
         while not is_end:
+            turn = self.world.turn
+            times = (self.world.p0_time, self.world.p1_time)
             is_end, p0_score, p1_score = self.world.step()
+            # The world charges steps that failed too, with the time they ran
+            move_time = (self.world.p0_time, self.world.p1_time)[turn] - times[turn]
+            if stats is not None:
+                stats.add_move(turn ^ swap_players, move_time)
+            if metrics is not None:
+                metrics.observe_move(turn ^ swap_players, move_time)
         logger.info(
             f"Run finished. Player {PLAYER_1_NAME}: {p0_score}, Player {PLAYER_2_NAME}: {p1_score}"
         )
+        if self.args.record_path is not None:
+            with open(self.args.record_path, "a") as f:
+                f.write(json.dumps(self.world.get_record()) + "\n")
         return p0_score, p1_score, self.world.p0_time, self.world.p1_time
 
+    def output_paths(self):
+        """
+        The files that autoplay appends to as games finish.
+        """
+        paths = [self.args.record_path]
+        if self.args.stats_path is not None and self.args.stats_path.endswith(".csv"):
+            paths.append(self.args.stats_path)
+        return [path for path in paths if path is not None]
+
+    def save_checkpoint(self, path, games, stats):
+        """
+        Save the progress of an autoplay run: the number of games finished, the
+        statistics, the random number generator states and the sizes of the files
+        appended to, replacing `path` atomically.
+        """
+        checkpoint = {
+            "player_1": self.args.player_1,
+            "player_2": self.args.player_2,
+            "games": games,
+            "stats": stats,
+            "numpy_random_state": np.random.get_state(),
+            "random_state": random.getstate(),
+            "output_sizes": {
+                output: os.path.getsize(output) if os.path.exists(output) else 0
+                for output in self.output_paths()
+            },
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(checkpoint, f)
+        os.replace(tmp_path, path)
+
+    def load_checkpoint(self, path):
+        """
+        Restore the progress saved by `save_checkpoint`. Games appended to the files
+        after the checkpoint was saved are cut off, as they are played again.
+
+        Returns
+        -------
+        games : int
+            The number of games finished.
+        stats : stats.AutoplayStats
+            The statistics of the finished games.
+
+        Raises
+        ------
+        ValueError
+            If the checkpoint is of a run between other agents.
+        """
+        with open(path, "rb") as f:
+            checkpoint = pickle.load(f)
+        players = (checkpoint["player_1"], checkpoint["player_2"])
+        if players != (self.args.player_1, self.args.player_2):
+            raise ValueError(
+                f"Checkpoint {path} is of a run between {players[0]} and {players[1]}"
+            )
+        np.random.set_state(checkpoint["numpy_random_state"])
+        random.setstate(checkpoint["random_state"])
+        for output, size in checkpoint["output_sizes"].items():
+            if os.path.exists(output) and os.path.getsize(output) > size:
+                with open(output, "r+b") as f:
+                    f.truncate(size)
+        return checkpoint["games"], checkpoint["stats"]
+
     def autoplay(self):
         """
         Run multiple simulations of the gameplay and aggregate win %
         """
-        p1_win_count = 0
-        p2_win_count = 0
-        p1_times = []
-        p2_times = []
+        stats = AutoplayStats(self.args.player_1, self.args.player_2)
+        checkpoint_path = self.args.checkpoint_path
+        start = 0
+        if (
+            self.args.resume
+            and checkpoint_path is not None
+            and os.path.exists(checkpoint_path)
+        ):
+            start, stats = self.load_checkpoint(checkpoint_path)
+            logger.info(f"Resuming from {checkpoint_path} after {start} games")
+        metrics = None
+        if self.args.metrics_port is not None or self.args.metrics_path is not None:
+            metrics = MetricsExporter(self.args.player_1, self.args.player_2)
+        if self.args.metrics_port is not None:
+            metrics.serve(self.args.metrics_port)
+            logger.info(
+                f"Serving metrics at http://127.0.0.1:{self.args.metrics_port}/metrics"
+            )
+        last_dump = time()
         if self.args.display:
             logger.warning("Since running autoplay mode, display will be disabled")
         self.args.display = False
-        with all_logging_disabled():
-            for i in tqdm(range(self.args.autoplay_runs)):
-                swap_players = i % 2 == 0
-                board_size = np.random.randint(args.board_size_min, args.board_size_max)
-                p0_score, p1_score, p0_time, p1_time = self.run(
-                    swap_players=swap_players, board_size=board_size
-                )
-                if swap_players:
-                    p0_score, p1_score, p0_time, p1_time = (
-                        p1_score,
-                        p0_score,
-                        p1_time,
-                        p0_time,
+        try:
+            with all_logging_disabled():
+                for i in tqdm(
+                    range(start, self.args.autoplay_runs),
+                    initial=start,
+                    total=self.args.autoplay_runs,
+                ):
+                    swap_players = i % 2 == 0
+                    board_size = np.random.randint(
+                        self.args.board_size_min, self.args.board_size_max
+                    )
+                    p0_score, p1_score, p0_time, p1_time = self.run(
+                        swap_players=swap_players,
+                        board_size=board_size,
+                        stats=stats,
+                        metrics=metrics,
                     )
-                if p0_score > p1_score:
-                    p1_win_count += 1
-                elif p0_score < p1_score:
-                    p2_win_count += 1
-                else:  # Tie
-                    p1_win_count += 1
-                    p2_win_count += 1
-                p1_times.append(p0_time)
-                p2_times.append(p1_time)
+                    random_walks = self.world.random_walks
+                    if swap_players:
+                        random_walks = random_walks[::-1]
+                        p0_score, p1_score, p0_time, p1_time = (
+                            p1_score,
+                            p0_score,
+                            p1_time,
+                            p0_time,
+                        )
+                    stats.add_game(
+                        self.world.board_size, p0_score, p1_score, p0_time, p1_time
+                    )
+                    if (
+                        self.args.stats_path is not None
+                        and (i + 1) % self.args.stats_interval == 0
+                    ):
+                        stats.flush(self.args.stats_path)
+                    if metrics is not None:
+                        metrics.observe_game(p0_score, p1_score, *random_walks)
+                        if (
+                            self.args.metrics_path is not None
+                            and time() - last_dump >= self.args.metrics_interval
+                        ):
+                            metrics.dump(self.args.metrics_path)
+                            last_dump = time()
+                    if (
+                        checkpoint_path is not None
+                        and (i + 1) % self.args.checkpoint_interval == 0
+                    ):
+                        self.save_checkpoint(checkpoint_path, i + 1, stats)
+        finally:
+            # Also on errors and interrupts, so that the server thread is stopped
+            if metrics is not None:
+                if self.args.metrics_path is not None:
+                    metrics.dump(self.args.metrics_path)
+                metrics.close()
+        if (
+            self.args.stats_path is not None
+            and self.args.autoplay_runs % self.args.stats_interval != 0
+            and start < self.args.autoplay_runs
+        ):
+            stats.flush(self.args.stats_path)
+        if checkpoint_path is not None:
+            self.save_checkpoint(
+                checkpoint_path, max(start, self.args.autoplay_runs), stats
+            )
 
         logger.info(
-            f"Player {PLAYER_1_NAME} win percentage: {p1_win_count / self.args.autoplay_runs} ({np.round(np.mean(p1_times), 5)} seconds/game)"
+            f"Player {PLAYER_1_NAME} win percentage: {stats.win_rate(0)} ({np.round(stats.game_times[0].mean, 5)} seconds/game, {np.round(stats.move_time_quantiles[0].quantile(0.95), 5)} seconds/move at p95)"
+        )
+        logger.info(
+            f"Player {PLAYER_2_NAME} win percentage: {stats.win_rate(1)}, ({np.round(stats.game_times[1].mean, 5)} seconds/game, {np.round(stats.move_time_quantiles[1].quantile(0.95), 5)} seconds/move at p95)"
         )
         logger.info(
-            f"Player {PLAYER_2_NAME} win percentage: {p2_win_count / self.args.autoplay_runs}, ({np.round(np.mean(p2_times), 5)} seconds/game)"
+            f"Endgame score cache: {SCORE_CACHE.hits} hits, {SCORE_CACHE.misses} misses ({SCORE_CACHE.hit_rate:.1%} hit rate)"
         )
 
 
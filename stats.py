@@ -0,0 +1,257 @@
+import csv
+import json
+import math
+import os
+
+
+class RunningStats:
+    """
+    Count, mean, variance, minimum and maximum of a stream of values, updated in
+    constant memory with Welford's algorithm.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+
+    @property
+    def variance(self):
+        """
+        The sample variance, 0 for fewer than two values.
+        """
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def to_dict(self):
+        if not self.count:
+            return {"count": 0, "mean": None, "std": None, "min": None, "max": None}
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "std": self.std,
+            "min": self.min,
+            "max": self.max,
+        }
+
+
+class QuantileSketch:
+    """
+    Approximate quantiles of a stream of values, in the manner of a merging t-digest.
+
+    Values are buffered and merged into at most about `compression` weighted
+    centroids. Centroids near the tails are kept small, so extreme quantiles such as
+    the 95th or 99th percentile stay accurate.
+
+    Parameters
+    ----------
+    compression : int
+        Bounds the number of centroids, and so the memory and the accuracy.
+    """
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.means = []
+        self.weights = []
+        self.buffer = []
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, x):
+        self.buffer.append(x)
+        self.count += 1
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        if len(self.buffer) >= 5 * self.compression:
+            self._merge()
+
+    def _merge(self):
+        if not self.buffer:
+            return
+        points = sorted(
+            list(zip(self.means, self.weights)) + [(x, 1) for x in self.buffer]
+        )
+        self.buffer = []
+        means, weights = [points[0][0]], [points[0][1]]
+        cumulative = 0
+        for mean, weight in points[1:]:
+            merged = weights[-1] + weight
+            q = (cumulative + merged / 2) / self.count
+            # Largest centroid allowed at this quantile
+            if merged <= max(1.0, 4 * self.count * q * (1 - q) / self.compression):
+                means[-1] += (mean - means[-1]) * weight / merged
+                weights[-1] = merged
+            else:
+                cumulative += weights[-1]
+                means.append(mean)
+                weights.append(weight)
+        self.means, self.weights = means, weights
+
+    def quantile(self, q):
+        """
+        Estimate the `q` quantile, for q in [0, 1]. NaN before any value.
+        """
+        self._merge()
+        if not self.count:
+            return math.nan
+        target = q * self.count
+        # Each centroid sits at the middle of the weight it covers
+        previous_center, previous_mean = 0.0, self.min
+        cumulative = 0
+        for mean, weight in zip(self.means, self.weights):
+            center = cumulative + weight / 2
+            if target < center:
+                fraction = (target - previous_center) / (center - previous_center)
+                return previous_mean + fraction * (mean - previous_mean)
+            previous_center, previous_mean = center, mean
+            cumulative += weight
+        if cumulative == previous_center:
+            return self.max
+        fraction = (target - previous_center) / (cumulative - previous_center)
+        return previous_mean + fraction * (self.max - previous_mean)
+
+    def to_dict(self, quantiles=(0.5, 0.95, 0.99)):
+        return {
+            f"p{round(q * 100)}": self.quantile(q) if self.count else None
+            for q in quantiles
+        }
+
+
+class AutoplayStats:
+    """
+    Streaming statistics of many games between two agents, in memory independent
+    of the number of games.
+
+    Tracks the wins, losses and ties and the score margin of player 1, the move and
+    game times of each player, and the same results broken down by board size.
+
+    Parameters
+    ----------
+    player_1 : str
+        The name of the first agent.
+    player_2 : str
+        The name of the second agent.
+    """
+
+    def __init__(self, player_1, player_2):
+        self.player_names = (player_1, player_2)
+        self.games = 0
+        self.wins = [0, 0]
+        self.ties = 0
+        self.margins = RunningStats()
+        self.move_times = (RunningStats(), RunningStats())
+        self.move_time_quantiles = (QuantileSketch(), QuantileSketch())
+        self.game_times = (RunningStats(), RunningStats())
+        self.board_sizes = {}
+
+    def add_move(self, player, seconds):
+        """
+        Record the time taken by player 0 (player 1) or 1 (player 2) for a step.
+        """
+        self.move_times[player].update(seconds)
+        self.move_time_quantiles[player].update(seconds)
+
+    def add_game(self, board_size, score_1, score_2, time_1, time_2):
+        """
+        Record the scores and the total step times of a finished game.
+        """
+        self.games += 1
+        if board_size not in self.board_sizes:
+            self.board_sizes[board_size] = {
+                "games": 0,
+                "wins": [0, 0],
+                "ties": 0,
+                "margins": RunningStats(),
+            }
+        by_size = self.board_sizes[board_size]
+        by_size["games"] += 1
+        if score_1 == score_2:
+            self.ties += 1
+            by_size["ties"] += 1
+        else:
+            winner = 0 if score_1 > score_2 else 1
+            self.wins[winner] += 1
+            by_size["wins"][winner] += 1
+        self.margins.update(score_1 - score_2)
+        by_size["margins"].update(score_1 - score_2)
+        self.game_times[0].update(time_1)
+        self.game_times[1].update(time_2)
+
+    def win_rate(self, player):
+        """
+        The fraction of games won or tied by player 0 (player 1) or 1 (player 2).
+        """
+        return (self.wins[player] + self.ties) / self.games if self.games else 0.0
+
+    def summary(self):
+        """
+        Get the current statistics as a JSON serialisable dict.
+        """
+        players = {}
+        for player, name in enumerate(self.player_names):
+            players[f"player_{player + 1}"] = {
+                "agent": name,
+                "wins": self.wins[player],
+                "losses": self.wins[1 - player],
+                "ties": self.ties,
+                "move_time": {
+                    **self.move_times[player].to_dict(),
+                    **self.move_time_quantiles[player].to_dict(),
+                },
+                "game_time": self.game_times[player].to_dict(),
+            }
+        return {
+            "games": self.games,
+            **players,
+            "margin": self.margins.to_dict(),
+            "board_sizes": {
+                str(size): {
+                    "games": by_size["games"],
+                    "player_1_wins": by_size["wins"][0],
+                    "player_2_wins": by_size["wins"][1],
+                    "ties": by_size["ties"],
+                    "margin": by_size["margins"].to_dict(),
+                }
+                for size, by_size in sorted(self.board_sizes.items())
+            },
+        }
+
+    def flush(self, path):
+        """
+        Write the current statistics to `path`.
+
+        A `.csv` path gets one row appended per flush with the overall statistics,
+        any other path is overwritten with the full summary as JSON.
+        """
+        summary = self.summary()
+        if not str(path).endswith(".csv"):
+            with open(path, "w") as f:
+                json.dump(summary, f, indent=2)
+            return
+        row = {"games": summary["games"], "ties": self.ties}
+        for player in ("player_1", "player_2"):
+            row[f"{player}_wins"] = summary[player]["wins"]
+            for key, value in summary[player]["move_time"].items():
+                row[f"{player}_move_time_{key}"] = value
+        for key, value in summary["margin"].items():
+            row[f"margin_{key}"] = value
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        with open(path, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(row))
+            if new_file:
+                writer.writeheader()
+            writer.writerow(row)
@@ -1,14 +1,100 @@
-AGENT_REGISTRY = {}
+import importlib
+import os
+import re
+import sys
+
+AGENTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "agents")
+
+# Matches @register_agent("name") in the source of an agent module
+REGISTER_PATTERN = re.compile(r"""@register_agent\(\s*["']([^"']*)["']\s*\)""")
+
+
+def _source_file(cls):
+    module = sys.modules.get(cls.__module__)
+    path = getattr(module, "__file__", None)
+    return os.path.realpath(path) if path else None
+
+
+class AgentRegistry:
+    """
+    The registered agent classes by name, imported on first use.
+
+    The modules of `directory` are scanned for `@register_agent("name")` without
+    being imported, so that a process only imports the agents it plays (and their
+    dependencies). Agents registered from elsewhere are added when their module is
+    imported. The scan only reads files, so it gives the same names in any process,
+    however it was started.
+
+    Parameters
+    ----------
+    directory : str
+        The directory of the agent modules.
+    package : str
+        The package of the agent modules.
+    """
+
+    def __init__(self, directory=AGENTS_DIR, package="agents"):
+        self.directory = directory
+        self.package = package
+        # Imported agent classes by name
+        self.loaded = {}
+        self._modules = None
+
+    @property
+    def modules(self):
+        """
+        The module of each agent found by the scan, scanned on first use.
+        """
+        if self._modules is None:
+            self._modules = self.scan()
+        return self._modules
+
+    def scan(self):
+        modules = {}
+        for file_name in sorted(os.listdir(self.directory)):
+            if not file_name.endswith(".py") or file_name.startswith("_"):
+                continue
+            with open(os.path.join(self.directory, file_name)) as f:
+                source = f.read()
+            for agent_name in REGISTER_PATTERN.findall(source):
+                modules.setdefault(agent_name, f"{self.package}.{file_name[:-3]}")
+        return modules
+
+    def register(self, agent_name, cls):
+        existing = self.loaded.get(agent_name)
+        if existing is None:
+            self.loaded[agent_name] = cls
+        elif existing.__qualname__ != cls.__qualname__ or _source_file(
+            existing
+        ) != _source_file(cls):
+            # The same module imported under another name registers the same class
+            raise AssertionError(f"Agent {existing} is already registered.")
+
+    def __contains__(self, agent_name):
+        return agent_name in self.loaded or agent_name in self.modules
+
+    def __getitem__(self, agent_name):
+        if agent_name not in self.loaded and agent_name in self.modules:
+            importlib.import_module(self.modules[agent_name])
+        return self.loaded[agent_name]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def keys(self):
+        return sorted(set(self.loaded) | set(self.modules))
+
+
+AGENT_REGISTRY = AgentRegistry()
+
 
 # define decorator for registering game agents
 def register_agent(agent_name=""):
     def decorator(func):
-        if agent_name not in AGENT_REGISTRY:
-            AGENT_REGISTRY[agent_name] = func
-        else:
-            raise AssertionError(
-                f"Agent {AGENT_REGISTRY[agent_name]} is already registered."
-            )
+        AGENT_REGISTRY.register(agent_name, func)
         return func
 
     return decorator
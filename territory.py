@@ -0,0 +1,83 @@
+from topology import get_topology
+
+# Owners of the cells, NEUTRAL == MINE | ADVERSARY
+UNCLAIMED = 0
+MINE = 1
+ADVERSARY = 2
+NEUTRAL = 3
+
+
+def territory(chess_board, my_pos, adv_pos):
+    """
+    Count the cells each player reaches strictly before the other.
+
+    Both players are expanded by a simultaneous breadth-first search that respects
+    the barriers. Cells reached by both players at the same distance are neutral and
+    are not expanded further.
+
+    Parameters
+    ----------
+    chess_board : numpy.ndarray of shape (board_size, board_size, 4)
+        The chess board.
+    my_pos : tuple of int
+        The position of the player the territory is computed for.
+    adv_pos : tuple of int
+        The position of the adversary.
+
+    Returns
+    -------
+    my_cells : int
+        The number of cells reached first by the player, its own included.
+    adv_cells : int
+        The number of cells reached first by the adversary, its own included.
+    """
+    topology = get_topology(chess_board.shape[0])
+    neighbours = topology.neighbour_list
+    walls = chess_board.reshape(-1, 4).tolist()
+    owner = [UNCLAIMED] * topology.num_cells
+    mine = [topology.index(my_pos)]
+    theirs = [topology.index(adv_pos)]
+    owner[mine[0]] = MINE
+    owner[theirs[0]] = ADVERSARY
+    counts = [0, 1, 1, 0]
+
+    while mine or theirs:
+        # Owners of the cells reached at the next distance, NEUTRAL if both
+        claimed = {}
+        for player, frontier in ((MINE, mine), (ADVERSARY, theirs)):
+            for cell in frontier:
+                cell_walls, cell_neighbours = walls[cell], neighbours[cell]
+                for dir in range(4):
+                    if cell_walls[dir]:
+                        continue
+                    next_cell = cell_neighbours[dir]
+                    if owner[next_cell] == UNCLAIMED:
+                        claimed[next_cell] = claimed.get(next_cell, 0) | player
+        mine, theirs = [], []
+        for cell, player in claimed.items():
+            owner[cell] = player
+            counts[player] += 1
+            if player == MINE:
+                mine.append(cell)
+            elif player == ADVERSARY:
+                theirs.append(cell)
+
+    return counts[MINE], counts[ADVERSARY]
+
+
+def territory_evaluation(chess_board, my_pos, adv_pos, max_step):
+    """
+    Evaluate a position by the difference in territory, see `territory`.
+
+    Has the signature of the leaf evaluations of `search.AlphaBetaSearch`. The
+    difference is divided by the number of cells, so that no position scores as
+    much as a won or lost game.
+
+    Returns
+    -------
+    score : float
+        Between -1 and 1, positive if the player reaches more cells first than the
+        adversary.
+    """
+    my_cells, adv_cells = territory(chess_board, my_pos, adv_pos)
+    return (my_cells - adv_cells) / get_topology(chess_board.shape[0]).num_cells
@@ -34,3 +34,80 @@ def test_step(board_size, agent):
     assert dir in [0, 1, 2, 3]
     next_pos = np.asarray(next_pos, dtype=cur_pos.dtype)
     assert world.check_boundary(next_pos)
+
+
+@pytest.mark.parametrize("board_size", [5, 8, 11])
+def test_heuristics_array_matches_scalar(board_size):
+    np.random.seed(board_size)
+    world = World(board_size=board_size)
+    while world.initial_end:
+        world = World(board_size=board_size)
+    my_pos, adv_pos = tuple(world.p0_pos), tuple(world.p1_pos)
+    board = world.chess_board
+    valid_moves = StudentAgent.get_valid_moves(board, my_pos, adv_pos, world.max_step)
+    expected = np.array(
+        [
+            StudentAgent.get_heuristics(board_size, board, x, y, dir, adv_pos)
+            for (x, y), dir in valid_moves
+        ]
+    )
+    heuristics = StudentAgent.get_heuristics_array(
+        board_size, board, valid_moves, adv_pos, expected[:, 2]
+    )
+    assert np.array_equal(heuristics, expected)
+
+    # The step is the first move with the highest sum of heuristics
+    agent = StudentAgent(endgame_cells=0)
+    assert agent.step(deepcopy(board), my_pos, adv_pos, world.max_step) == (
+        valid_moves[int(np.argmax([sum(h) for h in expected]))]
+    )
+
+
+def test_step_scores_one_move_per_symmetric_group(world_init, monkeypatch):
+    # Open board with the players on the diagonal, symmetric about it
+    board, my_pos, adv_pos = world_init.chess_board, (1, 1), (3, 3)
+    valid_moves = StudentAgent.get_valid_moves(board, my_pos, adv_pos, 3)
+    end_game = [StudentAgent.WinningHeuristic.NOT_END_GAME.value] * len(valid_moves)
+    heuristics = StudentAgent.get_heuristics_array(
+        5, board, valid_moves, adv_pos, end_game
+    )
+    expected = valid_moves[int(np.argmax(heuristics.sum(axis=1)))]
+
+    scored = []
+    get_heuristics_array = StudentAgent.get_heuristics_array
+
+    def spy(board_size, chess_board, moves, adv_pos, end_game):
+        scored.append(len(moves))
+        return get_heuristics_array(board_size, chess_board, moves, adv_pos, end_game)
+
+    monkeypatch.setattr(StudentAgent, "get_heuristics_array", staticmethod(spy))
+    agent = StudentAgent(endgame_cells=0)
+    assert agent.step(deepcopy(board), my_pos, adv_pos, 3) == expected
+    assert scored[0] < len(valid_moves)
+
+
+def test_search_agent_ponders():
+    np.random.seed(3)
+    world = World(player_1="search_agent", player_2="random_agent", board_size=6)
+    while world.initial_end:
+        world = World(player_1="search_agent", player_2="random_agent", board_size=6)
+    agent = world.p0
+    agent.time_limit = 0.05
+    agent.max_depth = 1
+    agent.ponder = True
+    board, my_pos, adv_pos = world.chess_board, tuple(world.p0_pos), tuple(world.p1_pos)
+    agent.start_pondering(board.copy(), my_pos, adv_pos, world.max_step)
+    agent.ponder_thread.join()
+    agent.stop_pondering(None)
+    assert agent.ponder_results
+
+    # A pondered position is answered with its pondered move
+    state, (move, depth, _) = next(iter(agent.ponder_results.items()))
+    assert depth == 1
+    assert agent.step(state.chess_board, my_pos, state.adv_pos, world.max_step) == move
+
+    is_end = world.initial_end
+    while not is_end:
+        is_end, _, _ = world.step()
+    agent.on_game_end(None)
+    assert agent.ponder_thread is None and not agent.ponder_results
@@ -0,0 +1,107 @@
+import pytest
+from endgame import SCORE_CACHE, EndgameSolver, score_regions, score_walls
+from agents.student_agent import StudentAgent
+
+
+def enclose(world, cells):
+    # Wall off the given cells from the rest of the board
+    for r, c in cells:
+        for dir, (m_r, m_c) in enumerate(StudentAgent.MOVES):
+            if (r + m_r, c + m_c) not in cells and not world.chess_board[r, c, dir]:
+                world.set_barrier(r, c, dir)
+
+
+def component(chess_board, start):
+    visited = {start}
+    queue = [start]
+    while queue:
+        r, c = queue.pop()
+        for dir, (m_r, m_c) in enumerate(StudentAgent.MOVES):
+            next_pos = (r + m_r, c + m_c)
+            if not chess_board[r, c, dir] and next_pos not in visited:
+                visited.add(next_pos)
+                queue.append(next_pos)
+    return visited
+
+
+def brute_force(chess_board, my_pos, adv_pos, max_step):
+    best = None
+    for (x, y), dir in StudentAgent.get_valid_moves(
+        chess_board, my_pos, adv_pos, max_step
+    ):
+        StudentAgent.set_barrier_to_value(chess_board, x, y, dir, True)
+        mine = component(chess_board, (x, y))
+        if adv_pos in mine:
+            value = -brute_force(chess_board, adv_pos, (x, y), max_step)
+        else:
+            value = len(mine) - len(component(chess_board, adv_pos))
+        StudentAgent.set_barrier_to_value(chess_board, x, y, dir, False)
+        best = value if best is None else max(best, value)
+    return best
+
+
+@pytest.mark.parametrize(
+    "cells, my_pos, adv_pos",
+    [
+        ({(0, 0), (0, 1)}, (0, 0), (0, 1)),
+        ({(0, 0), (0, 1), (0, 2), (0, 3)}, (0, 0), (0, 3)),
+        ({(1, 1), (1, 2), (2, 1), (2, 2)}, (1, 1), (2, 2)),
+        ({(2, 2), (2, 3), (3, 2), (3, 3), (4, 3)}, (2, 2), (4, 3)),
+    ],
+)
+def test_solve_matches_brute_force(world_init, cells, my_pos, adv_pos):
+    enclose(world_init, cells)
+    board = world_init.chess_board
+    solver = EndgameSolver(max_cells=6)
+    move, value = solver.solve(board, my_pos, adv_pos, world_init.max_step)
+    assert value == brute_force(board.copy(), my_pos, adv_pos, world_init.max_step)
+    assert move in StudentAgent.get_valid_moves(
+        board, my_pos, adv_pos, world_init.max_step
+    )
+    # Solved subpositions are reused
+    assert len(solver.table) > 0
+    assert solver.solve(board, my_pos, adv_pos, world_init.max_step) == (move, value)
+    assert solver.nodes == 0
+
+
+def test_region_too_large(world_1):
+    solver = EndgameSolver(max_cells=8)
+    move, value = solver.solve(
+        world_1.chess_board,
+        tuple(world_1.p0_pos),
+        tuple(world_1.p1_pos),
+        world_1.max_step,
+    )
+    assert move is None and value is None
+
+
+def test_score_regions_cache(world_2):
+    SCORE_CACHE.clear()
+    expected = world_2.check_endgame()
+    assert SCORE_CACHE.misses == 1
+    # Either player order hits the same entry
+    assert (
+        score_regions(world_2.chess_board, world_2.p0_pos, world_2.p1_pos) == expected
+    )
+    assert score_regions(world_2.chess_board, world_2.p1_pos, world_2.p0_pos) == (
+        expected[0],
+        expected[2],
+        expected[1],
+    )
+    assert (SCORE_CACHE.hits, SCORE_CACHE.misses) == (2, 1)
+
+
+@pytest.mark.parametrize("world", ["world_init", "world_1", "world_2"])
+def test_score_walls_matches_score_regions(world, request):
+    fixture, world = world, request.getfixturevalue(world)
+    if fixture == "world_init":
+        world.p0_pos, world.p1_pos = (1, 1), (3, 2)
+    board, my_pos, adv_pos = world.chess_board, tuple(world.p0_pos), tuple(world.p1_pos)
+    scores = score_walls(board, my_pos, adv_pos)
+    valid_moves = StudentAgent.get_valid_moves(board, my_pos, adv_pos, world.max_step)
+    assert valid_moves and set(valid_moves) <= set(scores)
+    for (x, y), dir in scores:
+        StudentAgent.set_barrier_to_value(board, x, y, dir, True)
+        expected = score_regions(board, (x, y), adv_pos)
+        StudentAgent.set_barrier_to_value(board, x, y, dir, False)
+        assert scores[((x, y), dir)] == expected
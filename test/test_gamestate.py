@@ -0,0 +1,30 @@
+import copy
+import pickle
+import numpy as np
+import pytest
+from gamestate import GameState
+
+
+def test_round_trip(world_1):
+    state = world_1.state
+    assert np.array_equal(state.chess_board, world_1.chess_board)
+    assert state.my_pos == tuple(world_1.p0_pos)
+    assert state.adv_pos == tuple(world_1.p1_pos)
+    assert GameState.from_bytes(state.to_bytes()) == state
+    assert pickle.loads(pickle.dumps(state)) == state
+    assert copy.deepcopy(state) is state
+    with pytest.raises(AttributeError):
+        state.turn = 1
+
+
+def test_step_matches_world(world_1):
+    state = world_1.state
+    next_pos, dir = (2, 2), 0
+    assert not state.has_wall(next_pos, dir)
+    next_state = state.step(next_pos, dir)
+    world_1.apply_step(np.asarray(next_pos), dir)
+    assert next_state == world_1.state
+    assert hash(next_state) == hash(world_1.state)
+    assert next_state.has_wall((1, 2), 2)
+    # The snapshot taken before the step is unchanged
+    assert state != next_state and not state.has_wall(next_pos, dir)
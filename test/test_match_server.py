@@ -0,0 +1,91 @@
+import asyncio
+import io
+import json
+import numpy as np
+import pytest
+from agent_process import serve
+from agents import *
+from match_server import AgentProcess, MatchServer
+from transport import BoardRing
+from utils import encode_board
+
+
+def test_serve(world_1):
+    request = {
+        "board": encode_board(world_1.chess_board),
+        "board_size": world_1.board_size,
+        "my_pos": [int(x) for x in world_1.p0_pos],
+        "adv_pos": [int(x) for x in world_1.p1_pos],
+        "max_step": world_1.max_step,
+    }
+    requests = io.StringIO(json.dumps(request) + "\n" + json.dumps({}) + "\n")
+    responses = io.StringIO()
+    serve(StudentAgent(), requests, responses)
+    step, error = [json.loads(line) for line in responses.getvalue().splitlines()]
+    assert world_1.check_valid_step(
+        world_1.p0_pos, np.asarray(step["pos"]), step["dir"]
+    )
+    assert "error" in error
+
+
+def test_serve_shared_memory(world_1):
+    ring = BoardRing(max_board_size=world_1.board_size)
+    try:
+        request = {"slot": ring.put(world_1.state)}
+        requests = io.StringIO(json.dumps(request) + "\n")
+        responses = io.StringIO()
+        serve(StudentAgent(), requests, responses, ring)
+    finally:
+        ring.close()
+        ring.unlink()
+    step = json.loads(responses.getvalue())
+    assert world_1.check_valid_step(
+        world_1.p0_pos, np.asarray(step["pos"]), step["dir"]
+    )
+
+
+@pytest.mark.parametrize("transport", ["shared_memory", "json"])
+def test_match_server(transport):
+    server = MatchServer(
+        "random_agent",
+        "student_agent",
+        processes=2,
+        concurrency=3,
+        move_timeout=30,
+        transport=transport,
+    )
+    results = asyncio.run(server.run(4, board_size_min=5, board_size_max=7))
+    assert len(results) == 4
+    for p0_score, p1_score, p0_time, p1_time in results:
+        assert p0_score >= 1 and p1_score >= 1
+        assert p0_time >= 0 and p1_time >= 0
+
+
+def test_match_server_does_not_create_agents(monkeypatch):
+    # The agents only run in their processes, which this patch does not reach
+    def fail(self):
+        raise AssertionError("StudentAgent created in the server process")
+
+    monkeypatch.setattr(StudentAgent, "__init__", fail)
+    server = MatchServer("student_agent", "student_agent", processes=1)
+    results = asyncio.run(server.run(2, board_size_min=5, board_size_max=6))
+    assert len(results) == 2
+
+
+def test_step_after_process_died(world_1):
+    async def run():
+        process = AgentProcess("random_agent", transport="json")
+        await process.start()
+        try:
+            process.process.kill()
+            await process.process.wait()
+            args = (world_1.chess_board, world_1.p0_pos, world_1.p1_pos, 3)
+            with pytest.raises((OSError, RuntimeError)):
+                await process.step(*args, timeout=30)
+            # The process was restarted
+            return await process.step(*args, timeout=30)
+        finally:
+            await process.close()
+
+    next_pos, dir = asyncio.run(run())
+    assert world_1.check_valid_step(world_1.p0_pos, np.asarray(next_pos), dir)
@@ -0,0 +1,45 @@
+from urllib.request import urlopen
+from metrics import Histogram, MetricsExporter
+
+
+class FailingAgent:
+    def step(self, chess_board, my_pos, adv_pos, max_step):
+        raise RuntimeError("No step")
+
+
+def test_histogram():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for x in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(x)
+    lines = list(histogram.lines("t", 'a="b"'))
+    assert lines[:3] == [
+        't_bucket{a="b",le="0.1"} 1',
+        't_bucket{a="b",le="1.0"} 3',
+        't_bucket{a="b",le="+Inf"} 4',
+    ]
+    assert lines[-1] == 't_count{a="b"} 4'
+
+
+def test_exporter(world_1, tmp_path):
+    # Steps that raise are replaced by a Random Walk and counted
+    world_1.p0 = FailingAgent()
+    world_1.step()
+    assert world_1.random_walks == [1, 0]
+
+    metrics = MetricsExporter("student_agent", "random_agent")
+    metrics.observe_move(0, 0.02)
+    metrics.observe_game(30, 20, *world_1.random_walks)
+    metrics.dump(tmp_path / "metrics.prom")
+    text = (tmp_path / "metrics.prom").read_text()
+    assert "autoplay_games_total 1\n" in text
+    assert 'autoplay_wins_total{player="1",agent="student_agent"} 1\n' in text
+    assert 'autoplay_random_walks_total{player="1",agent="student_agent"} 1\n' in text
+
+    metrics.serve(0)
+    try:
+        port = metrics.server.server_address[1]
+        with urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            served = response.read().decode()
+    finally:
+        metrics.close()
+    assert 'autoplay_move_seconds_count{player="1",agent="student_agent"} 1' in served
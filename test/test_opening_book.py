@@ -0,0 +1,57 @@
+import pytest
+import numpy as np
+from opening_book import (
+    BOOK_DTYPE,
+    OpeningBook,
+    canonical_key,
+    inverse_transform_move,
+    transform_board,
+    transform_move,
+)
+
+
+@pytest.mark.parametrize("t", range(8))
+def test_transform_move_matches_board(world_1, t):
+    board = world_1.chess_board
+    size = world_1.board_size
+    transformed = transform_board(board, t)
+    for r in range(size):
+        for c in range(size):
+            for dir in range(4):
+                (tr, tc), tdir = transform_move(size, (r, c), dir, t)
+                assert transformed[tr, tc, tdir] == board[r, c, dir]
+                assert inverse_transform_move(size, (tr, tc), tdir, t) == ((r, c), dir)
+
+
+def test_canonical_key_is_symmetric(world_1):
+    board = world_1.chess_board
+    size = world_1.board_size
+    my_pos, adv_pos = tuple(world_1.p0_pos), tuple(world_1.p1_pos)
+    key, _ = canonical_key(board, my_pos, adv_pos, world_1.max_step)
+    for t in range(8):
+        my_t, _ = transform_move(size, my_pos, 0, t)
+        adv_t, _ = transform_move(size, adv_pos, 0, t)
+        assert canonical_key(transform_board(board, t), my_t, adv_t, 3)[0] == key
+    assert canonical_key(board, adv_pos, my_pos, world_1.max_step)[0] != key
+
+
+def test_book_lookup(world_1, tmp_path):
+    board = world_1.chess_board
+    size = world_1.board_size
+    my_pos, adv_pos = tuple(world_1.p0_pos), tuple(world_1.p1_pos)
+    key, t = canonical_key(board, my_pos, adv_pos, world_1.max_step)
+    (r, c), dir = transform_move(size, (1, 3), 0, t)
+    path = tmp_path / "book.npy"
+    np.save(path, np.array([(key, r, c, dir, 2)], dtype=BOOK_DTYPE))
+
+    book = OpeningBook(path)
+    assert len(book) == 1
+    assert book.lookup(board, my_pos, adv_pos, world_1.max_step) == ((1, 3), 0)
+    # Symmetric variants of the position map the move back to their own frame
+    rotated = transform_board(board, 1)
+    my_t, _ = transform_move(size, my_pos, 0, 1)
+    adv_t, _ = transform_move(size, adv_pos, 0, 1)
+    assert book.lookup(rotated, my_t, adv_t, world_1.max_step) == transform_move(
+        size, (1, 3), 0, 1
+    )
+    assert book.lookup(board, adv_pos, my_pos, world_1.max_step) is None
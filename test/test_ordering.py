@@ -0,0 +1,36 @@
+import pytest
+from ordering import MoveOrdering
+from search import AlphaBetaSearch
+from agents.student_agent import StudentAgent
+
+
+def test_order(world_2):
+    world = world_2
+    board, my_pos, adv_pos = world.chess_board, tuple(world.p0_pos), tuple(world.p1_pos)
+    moves = StudentAgent.get_valid_moves(board, my_pos, adv_pos, world.max_step)
+    ordering = MoveOrdering()
+    ordering.clear(world.board_size)
+    ordering.cutoff(moves[1], 0, 1)
+    ordering.cutoff(moves[3], 1, 3)
+    ordering.cutoff(moves[2], 0, 2)
+    # The move to search first, then the killers of the ply, most recent first
+    ordered = ordering.order(board, moves, my_pos, adv_pos, 0, first=moves[0])
+    assert ordered[:3] == [moves[0], moves[2], moves[1]]
+    # Then the history, at another ply
+    ordered = ordering.order(board, moves, my_pos, adv_pos, 2, static=False)
+    assert ordered[:4] == [moves[3], moves[2], moves[1], moves[0]]
+    ordering.age()
+    assert sum(ordering.history) == 9 // 2 + 4 // 2 + 1 // 2
+    ordering.clear()
+    assert ordering.order(board, moves, my_pos, adv_pos, 0, static=False) == moves
+
+
+@pytest.mark.parametrize("world", ["world_1", "world_2"])
+def test_search_with_ordering(world, request):
+    world = request.getfixturevalue(world)
+    args = (world.chess_board, world.p0_pos, world.p1_pos, world.max_step, 3)
+    plain = AlphaBetaSearch()
+    _, score = plain.search(*args)
+    ordered = AlphaBetaSearch(ordering=MoveOrdering())
+    assert ordered.search(*args)[1] == score
+    assert ordered.nodes <= plain.nodes
@@ -0,0 +1,35 @@
+import pytest
+from time import time
+from ordering import MoveOrdering
+from parallel_search import RootParallelSearch
+from search import AlphaBetaSearch, SearchAborted
+
+
+@pytest.fixture(scope="module")
+def parallel_search():
+    search = RootParallelSearch(workers=2)
+    yield search
+    search.close()
+
+
+@pytest.mark.parametrize("world", ["world_1", "world_2"])
+def test_matches_serial_search(parallel_search, world, request):
+    world = request.getfixturevalue(world)
+    args = (world.chess_board, world.p0_pos, world.p1_pos, world.max_step, 2)
+    _, score = AlphaBetaSearch(ordering=MoveOrdering()).search(*args)
+    move, parallel_score = parallel_search.search(*args)
+    assert parallel_score == score
+    assert parallel_search.nodes > 0
+
+
+def test_deadline(parallel_search, world_1):
+    world = world_1
+    with pytest.raises(SearchAborted):
+        parallel_search.search(
+            world.chess_board,
+            world.p0_pos,
+            world.p1_pos,
+            world.max_step,
+            3,
+            deadline=time(),
+        )
@@ -0,0 +1,36 @@
+import json
+import numpy as np
+from PIL import Image
+from render_games import ReplayWorld, load_records, render_game
+from world import World
+
+
+def play_game():
+    np.random.seed(0)
+    world = World(board_size=6)
+    is_end = False
+    while not is_end:
+        is_end, _, _ = world.step()
+    return world
+
+
+def test_replay_matches_world(tmp_path):
+    world = play_game()
+    path = tmp_path / "games.jsonl"
+    path.write_text(json.dumps(world.get_record()) + "\n")
+    (record,) = load_records([path])
+
+    replay = ReplayWorld(record, tmp_path)
+    frames = sum(1 for _ in replay.replay())
+    assert frames == len(world.history) + 1
+    assert np.array_equal(replay.chess_board, world.chess_board)
+    assert replay.p0_pos == tuple(world.p0_pos)
+    assert replay.p1_pos == tuple(world.p1_pos)
+    assert replay.results_cache == tuple(world.results_cache)
+
+
+def test_render_game(tmp_path):
+    world = play_game()
+    path = render_game(3, world.get_record(), str(tmp_path))
+    assert path.endswith("game_3.gif")
+    assert Image.open(path).n_frames == len(world.history) + 1
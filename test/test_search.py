@@ -0,0 +1,35 @@
+import pytest
+import numpy as np
+from search import AlphaBetaSearch, mobility_evaluation
+from territory import territory_evaluation
+
+
+@pytest.fixture
+def open_board():
+    # A 12x12 board where the adversary, in a corner, can only leave downwards
+    board_size = 12
+    chess_board = np.zeros((board_size, board_size, 4), dtype=bool)
+    chess_board[0, :, 0] = True
+    chess_board[:, 0, 3] = True
+    chess_board[-1, :, 2] = True
+    chess_board[:, -1, 1] = True
+    chess_board[0, 0, 1] = True
+    chess_board[0, 1, 3] = True
+    return chess_board
+
+
+@pytest.mark.parametrize("evaluate", [territory_evaluation, mobility_evaluation])
+@pytest.mark.parametrize("depth", [1, 2])
+def test_win_over_evaluation_lead(open_board, evaluate, depth):
+    # Walling the adversary in wins, quiet moves lead by over 100 cells or moves
+    search = AlphaBetaSearch(evaluate=evaluate)
+    move, score = search.search(open_board, (3, 2), (0, 0), 6, depth)
+    assert move == ((1, 0), 0)
+    assert score == AlphaBetaSearch.WIN_SCORE
+
+
+@pytest.mark.parametrize("evaluate", [territory_evaluation, mobility_evaluation])
+def test_evaluation_below_win_score(open_board, evaluate):
+    for my_pos, adv_pos in (((5, 5), (0, 0)), ((0, 0), (11, 11))):
+        score = evaluate(open_board, my_pos, adv_pos, 6)
+        assert 0 < abs(score) < 1 < AlphaBetaSearch.WIN_SCORE
@@ -0,0 +1,30 @@
+import numpy as np
+from selfplay import SAMPLE_DTYPE, ShardWriter, load_shards, play_game, unpack_board
+
+
+def test_play_game():
+    samples = play_game(0, "student_agent", "random_agent", 6, epsilon=0.2)
+    assert samples.dtype == SAMPLE_DTYPE
+    assert list(samples["move_number"]) == list(range(len(samples)))
+    assert list(samples["player"]) == [i % 2 for i in range(len(samples))]
+    # Outcomes are opposite for both players
+    assert np.all(samples["outcome"][::2] == samples["outcome"][0])
+    assert np.all(samples["outcome"][1::2] == -samples["outcome"][0])
+    for before, after in zip(samples[:-1], samples[1:]):
+        r, c, dir = before["move"]
+        assert not unpack_board(before)[r, c, dir]
+        assert unpack_board(after)[r, c, dir]
+        assert tuple(after["adv_pos"]) == (r, c)
+
+
+def test_shard_writer(tmp_path):
+    writer = ShardWriter(tmp_path, shard_size=4)
+    samples = np.zeros(10, dtype=SAMPLE_DTYPE)
+    samples["move_number"] = np.arange(10)
+    writer.write(samples[:3])
+    writer.write(samples[3:])
+    writer.close()
+    shards = list(load_shards(tmp_path))
+    assert [len(shard) for shard in shards] == [4, 4, 2]
+    assert list(np.concatenate(shards)["move_number"]) == list(range(10))
+    assert writer.total == 10
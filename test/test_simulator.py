@@ -0,0 +1,117 @@
+import json
+import sys
+import numpy as np
+import pytest
+from time import sleep
+from agents.random_agent import RandomAgent
+from agents.student_agent import StudentAgent
+from metrics import MetricsExporter
+from simulator import Simulator, get_args
+from stats import AutoplayStats
+
+
+def autoplay(monkeypatch, tmp_path, name, runs, *extra):
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "simulator.py",
+            "--autoplay",
+            "--autoplay_runs",
+            str(runs),
+            "--board_size_min",
+            "5",
+            "--board_size_max",
+            "7",
+            "--record_path",
+            str(tmp_path / f"{name}.jsonl"),
+            "--stats_path",
+            str(tmp_path / f"{name}.json"),
+            *extra,
+        ],
+    )
+    simulator = Simulator(get_args())
+    simulator.autoplay()
+    records = (tmp_path / f"{name}.jsonl").read_text().splitlines()
+    stats = json.loads((tmp_path / f"{name}.json").read_text())
+    return records, stats
+
+
+def test_resume(monkeypatch, tmp_path):
+    np.random.seed(0)
+    records, stats = autoplay(monkeypatch, tmp_path, "full", 6)
+
+    np.random.seed(0)
+    checkpoint = ["--checkpoint_path", str(tmp_path / "run.ckpt")]
+    autoplay(
+        monkeypatch, tmp_path, "resumed", 4, *checkpoint, "--checkpoint_interval", "2"
+    )
+    # Games played after the last checkpoint are played again
+    with open(tmp_path / "resumed.jsonl", "a") as f:
+        f.write(records[4] + "\n")
+    np.random.seed(1)
+    resumed_records, resumed_stats = autoplay(
+        monkeypatch, tmp_path, "resumed", 6, *checkpoint, "--resume"
+    )
+    assert resumed_records == records
+    assert resumed_stats["games"] == 6
+    assert resumed_stats["margin"] == stats["margin"]
+
+
+def test_reused_agents_are_reset(monkeypatch, tmp_path):
+    resets = []
+    monkeypatch.setattr(StudentAgent, "reset", lambda self: resets.append(self))
+    players = ["--player_1", "student_agent", "--reuse_agents"]
+    autoplay(monkeypatch, tmp_path, "kept", 3, *players)
+    assert not resets
+
+    autoplay(monkeypatch, tmp_path, "reset", 3, *players, "--reset_agents")
+    # Once before each game after the first, always on the same instance
+    assert len(resets) == 2 and len(set(map(id, resets))) == 1
+
+
+def test_display_save_format_defaults_to_pdf(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["simulator.py", "--display_save"])
+    assert get_args().display_save_format == "pdf"
+
+
+def test_failed_steps_are_timed(monkeypatch):
+    def step(self, chess_board, my_pos, adv_pos, max_step):
+        sleep(0.01)
+        raise RuntimeError("step failed")
+
+    monkeypatch.setattr(RandomAgent, "step", step)
+    monkeypatch.setattr(sys, "argv", ["simulator.py", "--board_size", "5"])
+    stats = AutoplayStats("random_agent", "random_agent")
+    metrics = MetricsExporter("random_agent", "random_agent")
+    np.random.seed(0)
+    Simulator(get_args()).run(stats=stats, metrics=metrics)
+    # Every step was replaced by a Random Walk, but recorded with the time it ran
+    for player in range(2):
+        assert stats.move_time_quantiles[player].quantile(0) >= 0.01
+    assert metrics.latencies[0].sum >= 0.01 * metrics.moves[0]
+
+
+def test_metrics_dumped_on_interrupt(monkeypatch, tmp_path):
+    run = Simulator.run
+    games = []
+
+    def interrupted_run(self, *args, **kwargs):
+        if games:
+            raise KeyboardInterrupt
+        games.append(None)
+        return run(self, *args, **kwargs)
+
+    closed = []
+    close = MetricsExporter.close
+    monkeypatch.setattr(Simulator, "run", interrupted_run)
+    monkeypatch.setattr(
+        MetricsExporter, "close", lambda self: closed.append(close(self))
+    )
+    metrics_path = tmp_path / "metrics.prom"
+    with pytest.raises(KeyboardInterrupt):
+        autoplay(
+            monkeypatch, tmp_path, "interrupted", 3, "--metrics_path", str(metrics_path)
+        )
+    assert "autoplay_games_total 1" in metrics_path.read_text()
+    assert closed
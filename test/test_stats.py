@@ -0,0 +1,47 @@
+import csv
+import json
+import numpy as np
+import pytest
+from stats import AutoplayStats, QuantileSketch, RunningStats
+
+
+def test_running_stats():
+    values = np.random.default_rng(0).normal(size=1000)
+    stats = RunningStats()
+    for x in values:
+        stats.update(x)
+    assert stats.mean == pytest.approx(values.mean())
+    assert stats.std == pytest.approx(values.std(ddof=1))
+    assert (stats.min, stats.max) == (values.min(), values.max())
+
+
+def test_quantile_sketch():
+    values = np.random.default_rng(0).lognormal(size=20000)
+    sketch = QuantileSketch()
+    for x in values:
+        sketch.update(x)
+    # Memory stays bounded by the compression
+    assert len(sketch.means) + len(sketch.buffer) < 10 * sketch.compression
+    for q in (0.05, 0.5, 0.95, 0.99):
+        assert sketch.quantile(q) == pytest.approx(np.quantile(values, q), rel=0.02)
+
+
+def test_autoplay_stats_flush(tmp_path):
+    stats = AutoplayStats("student_agent", "random_agent")
+    for board_size, scores in ((6, (20, 16)), (6, (18, 18)), (7, (10, 39))):
+        stats.add_move(0, 0.1)
+        stats.add_move(1, 0.2)
+        stats.add_game(board_size, *scores, 0.1, 0.2)
+    summary = json.loads(json.dumps(stats.summary()))
+    assert summary["player_1"]["wins"] == 1 and summary["player_2"]["wins"] == 1
+    assert summary["board_sizes"]["6"]["ties"] == 1
+    assert summary["margin"]["mean"] == pytest.approx(-25 / 3)
+    assert stats.win_rate(0) == pytest.approx(2 / 3)
+
+    stats.flush(tmp_path / "stats.json")
+    assert json.loads((tmp_path / "stats.json").read_text()) == summary
+    for _ in range(2):
+        stats.flush(tmp_path / "stats.csv")
+    with open(tmp_path / "stats.csv") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 2 and rows[0]["games"] == "3"
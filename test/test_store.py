@@ -0,0 +1,36 @@
+import pytest
+from store import AGENT_REGISTRY, AgentRegistry
+
+
+def test_scan_finds_agents():
+    assert AGENT_REGISTRY.modules["student_agent"] == "agents.student_agent"
+    assert {"random_agent", "human_agent", "student_agent"} <= set(AGENT_REGISTRY)
+    assert AGENT_REGISTRY["random_agent"].__name__ == "RandomAgent"
+
+
+def test_register_twice(tmp_path):
+    (tmp_path / "my_agent.py").write_text('@register_agent("my_agent")\nclass A:\n')
+    registry = AgentRegistry(str(tmp_path), "my_agents")
+    assert "my_agent" in registry and "my_agent" not in registry.loaded
+
+    class MyAgent:
+        pass
+
+    registry.register("my_agent", MyAgent)
+    assert registry["my_agent"] is MyAgent
+    # Registering the same class again, e.g. imported under another name, is allowed
+    registry.register(
+        "my_agent",
+        type(
+            "MyAgent",
+            (),
+            {"__qualname__": MyAgent.__qualname__, "__module__": __name__},
+        ),
+    )
+    assert registry["my_agent"] is MyAgent
+
+    class OtherAgent:
+        pass
+
+    with pytest.raises(AssertionError):
+        registry.register("my_agent", OtherAgent)
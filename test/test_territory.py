@@ -0,0 +1,31 @@
+import pytest
+from territory import territory, territory_evaluation
+
+
+@pytest.mark.parametrize(
+    "my_pos, adv_pos, expected",
+    [
+        # Opposite corners split the board along the anti-diagonal
+        ((0, 0), (4, 4), (10, 10)),
+        # The middle column is neutral
+        ((0, 0), (0, 4), (10, 10)),
+        ((2, 0), (2, 1), (5, 20)),
+    ],
+)
+def test_territory_open_board(world_init, my_pos, adv_pos, expected):
+    assert territory(world_init.chess_board, my_pos, adv_pos) == expected
+
+
+def test_territory_respects_barriers(world_2):
+    # The players are separated, each owns its whole region
+    my_pos, adv_pos = tuple(world_2.p0_pos), tuple(world_2.p1_pos)
+    assert territory(world_2.chess_board, my_pos, adv_pos) == (15, 10)
+    assert territory_evaluation(world_2.chess_board, adv_pos, my_pos, 3) == -5 / 25
+
+
+def test_territory_not_through_adversary(world_init):
+    # Wall off row 0 except through (0, 1), which the adversary stands on
+    for c in range(5):
+        if c != 1:
+            world_init.set_barrier(0, c, 2)
+    assert territory(world_init.chess_board, (0, 0), (0, 1)) == (1, 24)
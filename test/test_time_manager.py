@@ -0,0 +1,23 @@
+import pytest
+from time_manager import TimeManager
+
+
+def test_allocate(world_init):
+    world = world_init
+    manager = TimeManager()
+    board, my_pos = world.chess_board, (2, 2)
+    assert manager.open_cells(board, my_pos) == 25
+    assert manager.wall_fill(board) == 0
+    # 25 open cells leave at least min_moves steps, the opening gets half its share
+    opening = manager.allocate(10.0, 0.0, 1, board, my_pos)
+    assert opening == pytest.approx(9.5 / 6.25 * 0.5)
+    later = manager.allocate(10.0, 0.0, 5, board, my_pos)
+    assert later == pytest.approx(9.5 / 6.25)
+    assert manager.allocate(10.0, 0.5, 5, board, my_pos) == pytest.approx(later + 0.5)
+
+    # Walling off the corner cell leaves a single open cell, capped by max_fraction
+    world.set_barrier(0, 0, 1)
+    world.set_barrier(0, 0, 2)
+    assert manager.open_cells(board, (0, 0)) == 1
+    assert manager.allocate(10.0, 0.0, 5, board, (0, 0)) == pytest.approx(9.5 * 0.3)
+    assert manager.allocate(-1.0, 0.0, 5, board, my_pos) == 0.0
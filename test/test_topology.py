@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from topology import LatticeUnionFind, get_topology
+
+
+@pytest.mark.parametrize("board_size", [5, 12])
+def test_neighbours(board_size):
+    topology = get_topology(board_size)
+    assert get_topology(board_size) is topology
+    for r in range(board_size):
+        for c in range(board_size):
+            index = topology.index((r, c))
+            assert topology.position(index) == (r, c)
+            for dir, (m_r, m_c) in enumerate(((-1, 0), (0, 1), (1, 0), (0, -1))):
+                n_r, n_c = r + m_r, c + m_c
+                if 0 <= n_r < board_size and 0 <= n_c < board_size:
+                    assert topology.neighbours[index, dir] == topology.index((n_r, n_c))
+                else:
+                    assert topology.neighbours[index, dir] == -1
+
+
+def test_wall_tables():
+    topology = get_topology(5)
+    for cell in range(topology.num_cells):
+        for dir in range(4):
+            wall = cell * 4 + dir
+            opposite = topology.opposite_walls[cell, dir]
+            sides = topology.wall_sides[cell][dir]
+            if topology.neighbours[cell, dir] == -1:
+                assert opposite == -1 and sides is None
+                assert topology.wall_ids[cell, dir] == wall
+                continue
+            # Both sides of a wall point at each other and share an id
+            assert topology.opposite_walls.reshape(-1)[opposite] == wall
+            assert (
+                topology.wall_ids.reshape(-1)[opposite] == topology.wall_ids[cell, dir]
+            )
+            assert sides[0] == topology.position(cell) + (dir,)
+            assert sides[1] == topology.position(opposite // 4) + (opposite % 4,)
+
+
+def test_components(world_init):
+    world = world_init
+    world.p0_pos, world.p1_pos = np.asarray([2, 3]), np.asarray([4, 4])
+    topology = get_topology(world.board_size)
+    roots = topology.components(world.chess_board)
+    assert len(set(roots)) == 1
+    # Wall off the top left cell
+    world.set_barrier(0, 0, 1)
+    world.set_barrier(0, 0, 2)
+    roots = topology.components(world.chess_board)
+    assert roots.count(roots[0]) == 1
+    assert world.check_endgame() == (False, 24, 24)
+    # Wall off the bottom right cell with player 2 in it
+    world.set_barrier(4, 4, 0)
+    world.set_barrier(4, 4, 3)
+    assert world.check_endgame() == (True, 23, 1)
+
+
+def test_lattice_union_find(world_init):
+    world = world_init
+    lattice = LatticeUnionFind(world.chess_board)
+    # A single wall cannot split the empty board, even at the border
+    assert not lattice.can_split(0, 0, 1)
+    assert not lattice.can_split(2, 2, 1)
+    world.set_barrier(0, 0, 1)
+    assert lattice.update(world.chess_board)
+    # Only the wall closing the corner cell splits a region
+    assert lattice.can_split(0, 0, 2)
+    assert not lattice.can_split(0, 1, 2)
+    assert not lattice.can_split(1, 1, 1)
+    # The board of another game is refused
+    assert not lattice.update(np.zeros_like(world.chess_board))
+    assert lattice.can_split(0, 0, 2)
+
+
+def test_equivalent_moves(world_init):
+    board = world_init.chess_board
+    topology = get_topology(world_init.board_size)
+    # The diagonal through both players is the only symmetry of the position
+    moves = [((1, 2), 1), ((2, 1), 2), ((1, 1), 0), ((1, 1), 3), ((2, 2), 1)]
+    groups = topology.equivalent_moves(board, (1, 1), (3, 3), moves)
+    assert groups == [
+        [((1, 2), 1), ((2, 1), 2)],
+        [((1, 1), 0), ((1, 1), 3)],
+        [((2, 2), 1)],
+    ]
+    # A wall off the diagonal breaks the symmetry
+    world_init.set_barrier(0, 1, 1)
+    groups = topology.equivalent_moves(board, (1, 1), (3, 3), moves)
+    assert groups == [[move] for move in moves]
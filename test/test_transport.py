@@ -0,0 +1,19 @@
+from transport import BoardRing
+
+
+def test_ring_round_trip(world_1):
+    # Attaching by name is covered by the match server, whose agent processes
+    # read their states from the ring
+    ring = BoardRing(slots=2, max_board_size=world_1.board_size)
+    try:
+        state = world_1.state
+        next_state = state.step((2, 2), 0)
+        assert ring.put(state) == 0
+        assert ring.put(next_state) == 1
+        assert ring.get(0) == state and ring.get(1) == next_state
+        # The ring wraps around, overwriting the oldest slot
+        assert ring.put(next_state) == 0
+        assert ring.get(0) == next_state
+    finally:
+        ring.close()
+        ring.unlink()
@@ -0,0 +1,40 @@
+import numpy as np
+from tune import play_match, spsa
+
+
+class QuadraticEvaluator:
+    # Score peaking at `target`, with noise drawn from the seed of the games
+    def __init__(self, target, noise=0.0):
+        self.target = np.asarray(target)
+        self.noise = noise
+        self.seeds = []
+
+    def evaluate(self, weights_list, seed):
+        self.seeds.append(seed)
+        noise = np.random.default_rng(seed).normal(0, self.noise)
+        return [-float(np.sum((w - self.target) ** 2)) + noise for w in weights_list]
+
+
+def test_spsa_improves_score():
+    evaluator = QuadraticEvaluator([2.0, 0.5, 1.0, -1.0, 3.0])
+    start = (1.0,) * 5
+    start_score = evaluator.evaluate([np.asarray(start)], 0)[0]
+    weights, score = spsa(evaluator, start, iterations=100, a=0.2, c=0.1)
+    assert score > start_score / 4
+    assert len(weights) == 5
+
+
+def test_spsa_scores_tuned_weights_on_held_out_games():
+    evaluator = QuadraticEvaluator([0.0] * 5, noise=1.0)
+    weights, score = spsa(evaluator, (0.0,) * 5, iterations=20, seed=3)
+    # The returned score is a fresh evaluation of the returned weights
+    held_out_seed = evaluator.seeds[-1]
+    assert held_out_seed not in evaluator.seeds[:-1]
+    fresh = QuadraticEvaluator([0.0] * 5, noise=1.0)
+    assert fresh.evaluate([np.asarray(weights)], held_out_seed) == [score]
+
+
+def test_play_match_is_reproducible():
+    weights = (1.0, 1.0, 1.0, 1.0, 1.0)
+    first = play_match(7, weights, "random_agent", 6, False)
+    assert play_match(7, weights, "random_agent", 6, False) == first
@@ -0,0 +1,30 @@
+import numpy as np
+from utils import LRUCache, decode_board, encode_board
+
+
+def test_board_encoding(world_1):
+    board = world_1.chess_board
+    assert np.array_equal(decode_board(encode_board(board), world_1.board_size), board)
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.get("b", -1) == -1
+    assert len(cache) == 2
+
+
+def test_lru_cache_counts_hits_and_misses():
+    cache = LRUCache(maxsize=2)
+    assert cache.hit_rate == 0.0
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("b")
+    assert (cache.hits, cache.misses, cache.hit_rate) == (1, 1, 0.5)
+    cache.clear()
+    assert (cache.hits, cache.misses, len(cache)) == (0, 0, 0)
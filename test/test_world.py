@@ -1,4 +1,6 @@
 import pytest
+import numpy as np
+from time import sleep
 
 
 @pytest.mark.parametrize("end_pos", [(0, 4), (0, 0), (2, 3), (3, 0), (4, 4)])
@@ -40,3 +42,102 @@ def test_check_endgame_world_2(world_2):
     assert is_end
     assert p0_score == 15
     assert p1_score == 10
+
+
+def test_agent_lifecycle():
+    from agents.random_agent import RandomAgent
+    from world import World
+
+    class RecordingAgent(RandomAgent):
+        def __init__(self):
+            super().__init__()
+            self.events = []
+
+        def on_game_start(self, board_size, max_step, player):
+            self.events.append(("start", board_size, max_step, player))
+
+        def on_game_end(self, result):
+            self.events.append(("end", result))
+
+    agent = RecordingAgent()
+    for game in range(2):
+        world = World(player_1="random_agent", player_2=agent, board_size=6)
+        while world.initial_end:
+            world = World(player_1="random_agent", player_2=agent, board_size=6)
+        assert world.p1 is agent
+        is_end = False
+        while not is_end:
+            is_end, p0_score, p1_score = world.step()
+        assert agent.events[-2:] == [("start", 6, 3, 1), ("end", (p1_score, p0_score))]
+    assert len(agent.events) == 4
+
+
+def test_clock():
+    from agents.random_agent import RandomAgent
+    from world import World
+
+    class ClockAgent(RandomAgent):
+        def __init__(self):
+            super().__init__()
+            self.clocks = []
+
+        def set_clock(self, remaining, increment, move_number):
+            self.clocks.append((remaining, increment, move_number))
+
+    np.random.seed(0)
+    agent = ClockAgent()
+    world = World(agent, "random_agent", board_size=6, time_control=10.0, increment=1)
+    while world.initial_end:
+        world = World(
+            agent, "random_agent", board_size=6, time_control=10.0, increment=1
+        )
+    world.step()
+    first_step_time = world.p0_time
+    world.step()
+    world.step()
+    assert [clock[1:] for clock in agent.clocks] == [(1, 1), (1, 2)]
+    assert agent.clocks[0][0] == 10.0
+    # The time taken is charged and the increment added after each step
+    assert agent.clocks[1][0] == pytest.approx(10.0 - first_step_time + 1)
+    assert world.move_numbers == [2, 1]
+
+
+def test_pondering_errors_are_caught():
+    from agents.random_agent import RandomAgent
+    from world import World
+
+    class BrokenPonderAgent(RandomAgent):
+        def start_pondering(self, chess_board, my_pos, adv_pos, max_step):
+            raise RuntimeError("start_pondering failed")
+
+        def stop_pondering(self, adv_move):
+            raise RuntimeError("stop_pondering failed")
+
+    np.random.seed(0)
+    world = World("random_agent", BrokenPonderAgent(), board_size=6)
+    while world.initial_end:
+        world = World("random_agent", BrokenPonderAgent(), board_size=6)
+    is_end = False
+    while not is_end:
+        is_end, _, _ = world.step()
+    # The steps themselves were not replaced
+    assert world.random_walks == [0, 0]
+
+
+def test_failed_step_is_charged():
+    from agents.random_agent import RandomAgent
+    from world import World
+
+    class CrashingAgent(RandomAgent):
+        def step(self, chess_board, my_pos, adv_pos, max_step):
+            sleep(0.05)
+            raise RuntimeError("step failed")
+
+    np.random.seed(0)
+    world = World(CrashingAgent(), "random_agent", board_size=6, time_control=10.0)
+    while world.initial_end:
+        world = World(CrashingAgent(), "random_agent", board_size=6, time_control=10.0)
+    world.step()
+    assert world.random_walks == [1, 0]
+    assert world.p0_time >= 0.05
+    assert world.clocks[0] == pytest.approx(10.0 - world.p0_time)
@@ -0,0 +1,107 @@
+from topology import get_topology
+
+
+class TimeManager:
+    """
+    Share out the time left on a game clock (see `Agent.set_clock`) between the
+    steps of an agent.
+
+    The steps left are estimated from the open area, the cells of the region the
+    agent is in, as games end once the regions are closed. The time left is split
+    evenly between them, then weighted by the phase of the game, from the share of
+    the inner walls already placed: the first steps and the late steps, where few
+    choices matter, get less than the middle game, where the regions are decided.
+
+    Parameters
+    ----------
+    moves_per_cell : float
+        The expected number of steps of the agent left per open cell.
+    min_moves : int
+        The fewest steps expected to be left.
+    opening_moves : int
+        The number of first steps that get `opening_factor` of their share.
+    opening_factor : float
+        The share given to each opening step.
+    midgame_factor : float
+        The share given to the steps when half of the inner walls are placed,
+        varying smoothly down to 1 at the start and at the end.
+    reserve : float
+        The fraction of the time left that is never allocated, as a margin for
+        the time spent outside of the search.
+    max_fraction : float
+        The largest fraction of the time left given to one step.
+    """
+
+    def __init__(
+        self,
+        moves_per_cell=0.25,
+        min_moves=3,
+        opening_moves=2,
+        opening_factor=0.5,
+        midgame_factor=1.5,
+        reserve=0.05,
+        max_fraction=0.3,
+    ):
+        self.moves_per_cell = moves_per_cell
+        self.min_moves = min_moves
+        self.opening_moves = opening_moves
+        self.opening_factor = opening_factor
+        self.midgame_factor = midgame_factor
+        self.reserve = reserve
+        self.max_fraction = max_fraction
+
+    @staticmethod
+    def open_cells(chess_board, my_pos):
+        """
+        Count the cells of the region of the player at `my_pos`.
+        """
+        topology = get_topology(chess_board.shape[0])
+        roots = topology.components(chess_board)
+        return roots.count(roots[topology.index(my_pos)])
+
+    @staticmethod
+    def wall_fill(chess_board):
+        """
+        Get the fraction of the inner walls of the board that are placed.
+        """
+        board_size = chess_board.shape[0]
+        # Each inner wall is seen from both of its sides
+        inner_walls = 2 * board_size * (board_size - 1)
+        placed = (int(chess_board.sum()) - 4 * board_size) // 2
+        return placed / inner_walls if inner_walls else 1.0
+
+    def allocate(self, remaining, increment, move_number, chess_board, my_pos):
+        """
+        Get the time to spend on the next step.
+
+        Parameters
+        ----------
+        remaining : float
+            The seconds left on the clock.
+        increment : float
+            The seconds added to the clock after each step.
+        move_number : int
+            The number of the step, from 1.
+        chess_board : numpy.ndarray of shape (board_size, board_size, 4)
+            The chess board.
+        my_pos : tuple of int
+            The position of the agent.
+
+        Returns
+        -------
+        float
+            The seconds to spend, 0 once the clock has run out.
+        """
+        available = remaining * (1 - self.reserve)
+        if available <= 0:
+            return 0.0
+        moves_left = max(
+            self.min_moves,
+            self.moves_per_cell * self.open_cells(chess_board, my_pos),
+        )
+        fill = self.wall_fill(chess_board)
+        weight = 1 + (self.midgame_factor - 1) * 4 * fill * (1 - fill)
+        if move_number <= self.opening_moves:
+            weight *= self.opening_factor
+        budget = available / moves_left * weight + increment
+        return min(budget, available * self.max_fraction + increment, available)
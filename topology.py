@@ -0,0 +1,355 @@
+from functools import lru_cache
+import numpy as np
+
+# Moves (Up, Right, Down, Left)
+MOVES = ((-1, 0), (0, 1), (1, 0), (0, -1))
+
+# Opposite Directions
+OPPOSITES = (2, 3, 0, 1)
+
+# Directions after a left-right flip and after a counter-clockwise quarter turn
+FLIP_DIRS = (0, 3, 2, 1)
+ROT_DIRS = (3, 0, 1, 2)
+
+# Offsets of the lattice points at both ends of the wall of a cell in each direction
+WALL_CORNERS = ((0, 0, 0, 1), (0, 1, 1, 1), (1, 0, 1, 1), (0, 0, 1, 0))
+
+
+class Topology:
+    """
+    Precomputed neighbour and wall tables of a board size, on flat cell indices.
+
+    The cell (r, c) has the flat index r * board_size + c, which is also its index
+    in `chess_board.reshape(-1, 4)`. The wall (r, c, dir) has the flat index
+    cell * 4 + dir in `chess_board.reshape(-1)`.
+
+    Topologies are shared by the world and the agents through `get_topology`, so
+    that hot loops index these tables instead of doing tuple arithmetic and bounds
+    checks.
+
+    Parameters
+    ----------
+    board_size : int
+        The size of the board.
+    """
+
+    def __init__(self, board_size):
+        self.board_size = board_size
+        self.num_cells = board_size * board_size
+        rows, cols = np.divmod(np.arange(self.num_cells), board_size)
+        # Neighbour of each cell in each direction, -1 outside of the board
+        self.neighbours = np.full((self.num_cells, 4), -1, dtype=np.intp)
+        for dir, (m_r, m_c) in enumerate(MOVES):
+            r, c = rows + m_r, cols + m_c
+            inside = (0 <= r) & (r < board_size) & (0 <= c) & (c < board_size)
+            self.neighbours[inside, dir] = r[inside] * board_size + c[inside]
+        self.neighbours.setflags(write=False)
+        # Same table as nested lists, faster to index from Python loops
+        self.neighbour_list = self.neighbours.tolist()
+        self.positions = [divmod(cell, board_size) for cell in range(self.num_cells)]
+
+        # Flat index of the same wall seen from the neighbour, -1 for the border
+        walls = np.arange(self.num_cells * 4).reshape(-1, 4)
+        self.opposite_walls = np.where(
+            self.neighbours >= 0, self.neighbours * 4 + OPPOSITES, -1
+        )
+        self.opposite_walls.setflags(write=False)
+        # Walls seen from both sides share the smaller of their flat indices
+        self.wall_ids = np.where(
+            self.opposite_walls >= 0, np.minimum(walls, self.opposite_walls), walls
+        )
+        self.wall_ids.setflags(write=False)
+        # (r, c, dir) indices of both sides of each wall, None for the border
+        self.wall_sides = [
+            [
+                (
+                    (
+                        (r, c, dir),
+                        self.positions[self.neighbour_list[cell][dir]]
+                        + (OPPOSITES[dir],),
+                    )
+                    if self.neighbour_list[cell][dir] >= 0
+                    else None
+                )
+                for dir in range(4)
+            ]
+            for cell, (r, c) in enumerate(self.positions)
+        ]
+
+        # Lattice points at both ends of each wall, by flat wall index. The lattice
+        # point (i, j) is the top left corner of the cell (i, j), with the flat index
+        # i * (board_size + 1) + j
+        side = board_size + 1
+        self.num_corners = side * side
+        self.wall_corners = [
+            ((r + r_a) * side + c + c_a, (r + r_b) * side + c + c_b)
+            for r, c in self.positions
+            for r_a, c_a, r_b, c_b in WALL_CORNERS
+        ]
+
+        # Flat wall index of the image of each flat wall index under the 8 symmetries
+        # of the square, as in `opening_book.transform_board`: an optional
+        # left-right flip (t >= 4) followed by t % 4 counter-clockwise quarter turns
+        images = []
+        for t in range(8):
+            image = []
+            for r, c in self.positions:
+                for dir in range(4):
+                    s_r, s_c, s_dir = r, c, dir
+                    if t >= 4:
+                        s_c, s_dir = board_size - 1 - s_c, FLIP_DIRS[s_dir]
+                    for _ in range(t % 4):
+                        s_r, s_c, s_dir = board_size - 1 - s_c, s_r, ROT_DIRS[s_dir]
+                    image.append((s_r * board_size + s_c) * 4 + s_dir)
+            images.append(image)
+        self.symmetries = np.array(images, dtype=np.intp)
+        self.symmetries.setflags(write=False)
+        self.symmetry_list = images
+
+    def index(self, pos):
+        """
+        Get the flat index of a (row, col) position
+        """
+        return int(pos[0]) * self.board_size + int(pos[1])
+
+    def position(self, index):
+        """
+        Get the (row, col) position of a flat index
+        """
+        return self.positions[index]
+
+    def components(self, chess_board):
+        """
+        Label the regions of the board with a union-find.
+
+        Parameters
+        ----------
+        chess_board : numpy.ndarray of shape (board_size, board_size, 4)
+            The chess board.
+
+        Returns
+        -------
+        roots : list of int
+            For each flat cell index, the flat index of the root of its region.
+        """
+        walls = chess_board.reshape(-1, 4).tolist()
+        father = list(range(self.num_cells))
+
+        def find(cell):
+            root = cell
+            while father[root] != root:
+                root = father[root]
+            while father[cell] != root:
+                father[cell], cell = root, father[cell]
+            return root
+
+        for cell, cell_walls in enumerate(walls):
+            # Only check right and down
+            for dir in (1, 2):
+                if cell_walls[dir]:
+                    continue
+                root_a = find(cell)
+                root_b = find(self.neighbour_list[cell][dir])
+                if root_a != root_b:
+                    father[root_a] = root_b
+        return [find(cell) for cell in range(self.num_cells)]
+
+    def equivalent_moves(self, chess_board, my_pos, adv_pos, moves):
+        """
+        Group the moves whose successor positions are the same up to a symmetry of
+        the square that leaves the current position unchanged.
+
+        Such moves are worth the same to any evaluation that is itself unchanged by
+        the symmetries, so only one move of each group needs to be searched. Most
+        positions have no symmetry, in which case every move is a group of its own.
+
+        Parameters
+        ----------
+        chess_board : numpy.ndarray of shape (board_size, board_size, 4)
+            The chess board.
+        my_pos : tuple of int
+            The position of the player to move.
+        adv_pos : tuple of int
+            The position of the adversary.
+        moves : list of ((int, int), int)
+            The valid moves of the player to move.
+
+        Returns
+        -------
+        list of list of ((int, int), int)
+            The groups of moves, in the order of their first move in `moves`.
+        """
+        my_wall, adv_wall = self.index(my_pos) * 4, self.index(adv_pos) * 4
+        walls = None
+        stabilizer = []
+        for t in range(1, 8):
+            image = self.symmetry_list[t]
+            # The players stay in place, checked first as it rarely holds
+            if (
+                image[my_wall] // 4 != my_wall // 4
+                or image[adv_wall] // 4 != adv_wall // 4
+            ):
+                continue
+            if walls is None:
+                walls = chess_board.reshape(-1)
+            if np.array_equal(walls[self.symmetries[t]], walls):
+                stabilizer.append(image)
+        if not stabilizer:
+            return [[move] for move in moves]
+
+        groups = {}
+        for move in moves:
+            (r, c), dir = move
+            wall = (r * self.board_size + c) * 4 + dir
+            key = min([wall] + [image[wall] for image in stabilizer])
+            groups.setdefault(key, []).append(move)
+        return list(groups.values())
+
+    def bridges(self, chess_board):
+        """
+        Find the bridges of the regions of the board, the open walls whose placement
+        splits a region in two, with one iterative depth first search per region
+        (Tarjan's bridge-finding algorithm).
+
+        The cells are numbered in the order the search visits them, so the cells
+        cut off by a bridge, the subtree of the search below it, have consecutive
+        numbers: `cell` is cut off by the bridge below `child` if
+        `order[child] <= order[cell] < order[child] + sizes[child]`.
+
+        Parameters
+        ----------
+        chess_board : numpy.ndarray of shape (board_size, board_size, 4)
+            The chess board.
+
+        Returns
+        -------
+        roots : list of int
+            For each flat cell index, the flat index of the cell the search of its
+            region started from.
+        order : list of int
+            For each flat cell index, its rank in the order of the search.
+        sizes : list of int
+            For each flat cell index, the number of cells in its subtree, which is
+            the size of the region for the roots.
+        bridges : dict of int to int
+            For the flat wall index of each side of a bridge, the flat index of the
+            cell below the bridge in the search.
+        """
+        walls = chess_board.reshape(-1, 4).tolist()
+        neighbours = self.neighbour_list
+        roots = [-1] * self.num_cells
+        order = [-1] * self.num_cells
+        low = [0] * self.num_cells
+        sizes = [1] * self.num_cells
+        bridges = {}
+        rank = 0
+        for root in range(self.num_cells):
+            if order[root] >= 0:
+                continue
+            roots[root], order[root], low[root] = root, rank, rank
+            rank += 1
+            # (cell, parent, direction from the parent, next direction to explore)
+            stack = [[root, -1, -1, 0]]
+            while stack:
+                frame = stack[-1]
+                cell, parent, parent_dir, dir = frame
+                if dir < 4:
+                    frame[3] = dir + 1
+                    next_cell = neighbours[cell][dir]
+                    if walls[cell][dir] or next_cell < 0 or next_cell == parent:
+                        continue
+                    if order[next_cell] < 0:
+                        roots[next_cell] = root
+                        order[next_cell], low[next_cell] = rank, rank
+                        rank += 1
+                        stack.append([next_cell, cell, dir, 0])
+                    elif order[next_cell] < low[cell]:
+                        low[cell] = order[next_cell]
+                    continue
+                stack.pop()
+                if parent < 0:
+                    continue
+                sizes[parent] += sizes[cell]
+                if low[cell] < low[parent]:
+                    low[parent] = low[cell]
+                if low[cell] > order[parent]:
+                    bridges[parent * 4 + parent_dir] = cell
+                    bridges[cell * 4 + OPPOSITES[parent_dir]] = cell
+        return roots, order, sizes, bridges
+
+
+class LatticeUnionFind:
+    """
+    Union-find over the lattice points at the corners of the cells, joined by the
+    walls of a board.
+
+    A new wall can only split a region if the lattice points at both of its ends
+    are already joined by walls (the border joins all of its lattice points), so
+    that it closes a cycle of walls. Any other wall leaves the regions as they
+    are, which `can_split` tells in near constant time instead of labelling the
+    regions again.
+
+    Walls are never removed during a game, so the structure only grows: `update`
+    adds the walls placed since the last update.
+
+    Parameters
+    ----------
+    chess_board : numpy.ndarray of shape (board_size, board_size, 4)
+        The chess board.
+    """
+
+    def __init__(self, chess_board):
+        self.topology = get_topology(chess_board.shape[0])
+        self.father = list(range(self.topology.num_corners))
+        self.walls = np.zeros(chess_board.size, dtype=bool)
+        self.update(chess_board)
+
+    def find(self, corner):
+        father = self.father
+        root = corner
+        while father[root] != root:
+            root = father[root]
+        while father[corner] != root:
+            father[corner], corner = root, father[corner]
+        return root
+
+    def update(self, chess_board):
+        """
+        Add the walls of `chess_board` that are not added yet.
+
+        Returns
+        -------
+        bool
+            False, leaving the structure unchanged, if `chess_board` is not of the
+            same size or lacks some of the walls already added, as for the board of
+            another game.
+        """
+        walls = chess_board.reshape(-1)
+        if walls.size != self.walls.size or np.any(self.walls & ~walls):
+            return False
+        wall_corners = self.topology.wall_corners
+        for wall in np.flatnonzero(walls & ~self.walls).tolist():
+            corner_a, corner_b = wall_corners[wall]
+            root_a, root_b = self.find(corner_a), self.find(corner_b)
+            if root_a != root_b:
+                self.father[root_a] = root_b
+        self.walls |= walls
+        return True
+
+    def can_split(self, x, y, direction):
+        """
+        Check whether the wall (x, y, direction) closes a cycle of walls, which is
+        needed for placing it to split a region.
+        """
+        corner_a, corner_b = self.topology.wall_corners[
+            (x * self.topology.board_size + y) * 4 + direction
+        ]
+        return self.find(corner_a) == self.find(corner_b)
+
+
+@lru_cache(maxsize=None)
+def get_topology(board_size):
+    """
+    Get the shared `Topology` of a board size, built on first use.
+    """
+    return Topology(board_size)
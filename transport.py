@@ -0,0 +1,96 @@
+import struct
+from multiprocessing import resource_tracker, shared_memory
+from gamestate import HEADER, GameState, packed_size
+
+# Largest board the slots are sized for by default
+MAX_BOARD_SIZE = 12
+
+# Number of slots and slot size, before the slots
+RING_HEADER = struct.Struct("<II")
+
+
+class BoardRing:
+    """
+    A ring of fixed-size slots in shared memory, each holding a `GameState` as
+    serialised by `GameState.to_bytes`.
+
+    The writer puts a state in the next slot and sends only the slot index to the
+    reader, which loads the state from the same memory. A slot is overwritten after
+    `slots` more states have been put, so the writer must not run further ahead of
+    the reader than that.
+
+    Parameters
+    ----------
+    name : str
+        The name of an existing ring to attach to, None to create a new one.
+    slots : int
+        The number of slots of a new ring. Attached rings read it from the memory.
+    max_board_size : int
+        The largest board size a new ring can hold.
+    untrack : bool
+        Whether attaching stops the resource tracker of this process from unlinking
+        the ring when the process exits. Pass False in processes started with
+        `multiprocessing` by the creator, which share its resource tracker.
+    """
+
+    def __init__(self, name=None, slots=4, max_board_size=MAX_BOARD_SIZE, untrack=True):
+        if name is None:
+            slot_size = HEADER.size + packed_size(max_board_size)
+            self.memory = shared_memory.SharedMemory(
+                create=True, size=RING_HEADER.size + slots * slot_size
+            )
+            RING_HEADER.pack_into(self.memory.buf, 0, slots, slot_size)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+            if untrack:
+                # Only the creator unlinks the memory. Without this, the resource
+                # tracker of an attached process unlinks it when that process exits.
+                resource_tracker.unregister(self.memory._name, "shared_memory")
+            slots, slot_size = RING_HEADER.unpack_from(self.memory.buf)
+        self.slots = slots
+        self.slot_size = slot_size
+        self.next_slot = 0
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def put(self, state):
+        """
+        Write a state in the next slot.
+
+        Returns
+        -------
+        int
+            The index of the slot.
+        """
+        data = state.to_bytes()
+        if len(data) > self.slot_size:
+            raise ValueError(
+                f"Board of size {state.board_size} does not fit in the slots"
+            )
+        slot = self.next_slot
+        start = RING_HEADER.size + slot * self.slot_size
+        self.memory.buf[start : start + len(data)] = data
+        self.next_slot = (slot + 1) % self.slots
+        return slot
+
+    def get(self, slot):
+        """
+        Read the state in a slot.
+
+        Returns
+        -------
+        GameState
+        """
+        start = RING_HEADER.size + slot * self.slot_size
+        return GameState.from_bytes(self.memory.buf[start : start + self.slot_size])
+
+    def close(self):
+        """
+        Detach from the ring. The creator should also `unlink` it.
+        """
+        self.memory.close()
+
+    def unlink(self):
+        self.memory.unlink()
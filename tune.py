@@ -0,0 +1,269 @@
+import argparse
+import json
+import logging
+from multiprocessing import Pool
+import numpy as np
+from agents.student_agent import StudentAgent
+from utils import all_logging_disabled
+
+logging.basicConfig(format="%(levelname)s:%(message)s", level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+
+def play_match(seed, weights, opponent, board_size, swap_players):
+    """
+    Play one game of `StudentAgent` with the given weights against `opponent`.
+
+    Parameters
+    ----------
+    seed : int
+        The seed of the board and of the agents. Candidates evaluated with the same
+        seeds play the same boards (common random numbers).
+    weights : tuple of float
+        The weights of the student agent, see `StudentAgent.HEURISTICS`.
+    opponent : str
+        The registered name of the opponent. With `student_agent`, the opponent
+        keeps the default weights.
+    board_size : int
+        The size of the board.
+    swap_players : bool
+        if True, the opponent moves first
+
+    Returns
+    -------
+    margin : int
+        The score of the student agent minus the score of the opponent.
+    """
+    # Imported here so that the world (and its UI) is only loaded by workers
+    from world import World
+
+    np.random.seed(seed)
+    players = ("student_agent", opponent)
+    if swap_players:
+        players = players[::-1]
+    with all_logging_disabled():
+        world = World(player_1=players[0], player_2=players[1], board_size=board_size)
+        while world.initial_end:
+            world = World(
+                player_1=players[0], player_2=players[1], board_size=board_size
+            )
+        agent = world.p1 if swap_players else world.p0
+        agent.weights = tuple(weights)
+        is_end = False
+        while not is_end:
+            is_end, p0_score, p1_score = world.step()
+    margin = p0_score - p1_score
+    return -margin if swap_players else margin
+
+
+def _play_match(job):
+    return play_match(*job)
+
+
+class Evaluator:
+    """
+    Score weight vectors by playing batches of games in a process pool.
+
+    Parameters
+    ----------
+    pool : multiprocessing.Pool
+        The pool running the games.
+    opponent : str
+        The registered name of the opponent.
+    games : int
+        The number of games per evaluation, played from both sides.
+    board_size_min : int
+        The minimum board size.
+    board_size_max : int
+        The maximum board size, exclusive as in `Simulator.autoplay`.
+    objective : str
+        "wins" to score the mean of win (1), tie (0) and loss (-1), "margin" to
+        score the mean score margin as a fraction of the board.
+    """
+
+    def __init__(
+        self,
+        pool,
+        opponent="student_agent",
+        games=100,
+        board_size_min=6,
+        board_size_max=12,
+        objective="wins",
+    ):
+        self.pool = pool
+        self.opponent = opponent
+        self.games = games
+        self.board_size_min = board_size_min
+        self.board_size_max = board_size_max
+        self.objective = objective
+
+    def evaluate(self, weights_list, seed):
+        """
+        Score several weight vectors on the same games.
+
+        Parameters
+        ----------
+        weights_list : list of tuple of float
+            The weight vectors.
+        seed : int
+            The seed drawing the boards, shared by all the weight vectors.
+
+        Returns
+        -------
+        list of float
+            The score of each weight vector.
+        """
+        rng = np.random.default_rng(seed)
+        seeds = rng.integers(2**32, size=self.games)
+        board_sizes = rng.integers(
+            self.board_size_min, self.board_size_max, size=self.games
+        )
+        jobs = [
+            (int(s), tuple(weights), self.opponent, int(size), i % 2 == 0)
+            for weights in weights_list
+            for i, (s, size) in enumerate(zip(seeds, board_sizes))
+        ]
+        margins = np.array(self.pool.map(_play_match, jobs)).reshape(
+            len(weights_list), self.games
+        )
+        if self.objective == "margin":
+            return list(np.mean(margins / board_sizes**2, axis=1))
+        return list(np.mean(np.sign(margins), axis=1))
+
+
+def spsa(
+    evaluator,
+    weights,
+    iterations=50,
+    a=0.5,
+    c=0.2,
+    alpha=0.602,
+    gamma=0.101,
+    average=10,
+    seed=None,
+):
+    """
+    Maximize the score of the weights with simultaneous perturbation stochastic
+    approximation (SPSA).
+
+    Each iteration plays the same games with the weights perturbed in a random
+    direction both ways, and moves the weights along the estimated gradient. The
+    scores of the perturbed weights are noisy, so the best of them overestimates
+    its own score: the result is instead the mean of the last iterates, scored on
+    games that were not used for tuning.
+
+    Parameters
+    ----------
+    evaluator : Evaluator
+        Scores weight vectors.
+    weights : tuple of float
+        The starting weights.
+    iterations : int
+        The number of iterations.
+    a : float
+        The step size of the first iteration.
+    c : float
+        The perturbation size of the first iteration.
+    alpha : float
+        The decay exponent of the step size.
+    gamma : float
+        The decay exponent of the perturbation size.
+    average : int
+        The number of last iterates averaged into the tuned weights.
+    seed : int
+        The seed of the perturbations and of the games, random if None.
+
+    Returns
+    -------
+    weights : tuple of float
+        The tuned weights.
+    score : float
+        Their score on held-out games.
+    """
+    rng = np.random.default_rng(seed)
+    theta = np.asarray(weights, dtype=float)
+    iterates = [theta]
+    game_seeds = set()
+    for k in range(iterations):
+        a_k = a / (k + 1) ** alpha
+        c_k = c / (k + 1) ** gamma
+        delta = rng.choice((-1.0, 1.0), size=theta.size)
+        plus, minus = theta + c_k * delta, theta - c_k * delta
+        game_seed = int(rng.integers(2**32))
+        game_seeds.add(game_seed)
+        score_plus, score_minus = evaluator.evaluate([plus, minus], game_seed)
+        theta = theta + a_k * (score_plus - score_minus) / (2 * c_k * delta)
+        iterates.append(theta)
+        logger.info(
+            f"Iteration {k}: scores {score_plus:.3f} / {score_minus:.3f}, weights {np.round(theta, 3).tolist()}"
+        )
+
+    theta = np.mean(iterates[-max(average, 1) :], axis=0)
+    held_out_seed = int(rng.integers(2**32))
+    while held_out_seed in game_seeds:
+        held_out_seed = int(rng.integers(2**32))
+    (score,) = evaluator.evaluate([theta], held_out_seed)
+    return tuple(float(w) for w in theta), float(score)
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--opponent", type=str, default="student_agent")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument(
+        "--games", type=int, default=100, help="Games per evaluated weight vector"
+    )
+    parser.add_argument("--board_size_min", type=int, default=6)
+    parser.add_argument("--board_size_max", type=int, default=12)
+    parser.add_argument(
+        "--objective", type=str, default="wins", choices=["wins", "margin"]
+    )
+    parser.add_argument("--a", type=float, default=0.5, help="SPSA step size")
+    parser.add_argument("--c", type=float, default=0.2, help="SPSA perturbation size")
+    parser.add_argument(
+        "--average",
+        type=int,
+        default=10,
+        help="Number of last SPSA iterates averaged into the tuned weights",
+    )
+    parser.add_argument(
+        "--weights",
+        type=float,
+        nargs=len(StudentAgent.HEURISTICS),
+        default=None,
+        help=f"Starting weights of {', '.join(StudentAgent.HEURISTICS)}",
+    )
+    parser.add_argument("--output", type=str, default="weights.json")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    return args
+
+
+if __name__ == "__main__":
+    args = get_args()
+    weights = args.weights or (1.0,) * len(StudentAgent.HEURISTICS)
+    with Pool(args.workers) as pool:
+        evaluator = Evaluator(
+            pool,
+            opponent=args.opponent,
+            games=args.games,
+            board_size_min=args.board_size_min,
+            board_size_max=args.board_size_max,
+            objective=args.objective,
+        )
+        tuned_weights, score = spsa(
+            evaluator,
+            weights,
+            iterations=args.iterations,
+            a=args.a,
+            c=args.c,
+            average=args.average,
+        )
+    result = {
+        "weights": dict(zip(StudentAgent.HEURISTICS, tuned_weights)),
+        "score": score,
+    }
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    logger.info(f"Tuned weights {result['weights']} with held-out score {score:.3f}")
@@ -1,100 +1,159 @@
 ## UI Placeholder
+import queue
+import threading
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba
+import numpy as np
 from constants import *
 from pathlib import Path
 
+WALL_COLOR = "red"
+GRID_COLOR = "silver"
+
+
+class FrameWriter:
+    """
+    Write rendered frames from a background thread.
+
+    Parameters
+    ----------
+    path : str
+        The directory to write to.
+    prefix : str
+        The prefix of the written file names.
+    save_format : str
+        "png" to write one image per frame, "gif" to write a single animated image
+        when the writer is closed.
+    frame_duration : float
+        The duration of each frame of a GIF, in seconds.
+    """
+
+    def __init__(self, path, prefix, save_format="png", frame_duration=0.4):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.save_format = save_format
+        self.frame_duration = frame_duration
+        self.frames = []
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def write(self, frame, step_number):
+        """
+        Queue a frame for writing.
+
+        Parameters
+        ----------
+        frame : np.ndarray of shape (height, width, 4)
+            The RGBA pixels of the frame. The writer takes ownership of the array.
+        step_number : int
+            The number of the frame in the game.
+        """
+        self.queue.put((frame, step_number))
+
+    def run(self):
+        from PIL import Image
+
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            frame, step_number = item
+            if self.save_format == "gif":
+                # Palette images take a quarter of the memory of RGBA frames
+                self.frames.append(Image.fromarray(frame).convert("RGB").quantize())
+            else:
+                Image.fromarray(frame).save(
+                    self.path / f"{self.prefix}_{step_number}.{self.save_format}"
+                )
+        if self.frames:
+            self.frames[0].save(
+                self.path / f"{self.prefix}.gif",
+                save_all=True,
+                append_images=self.frames[1:],
+                duration=int(self.frame_duration * 1000),
+                loop=0,
+            )
+            self.frames = []
+
+    def close(self):
+        """
+        Wait for all queued frames to be written.
+        """
+        self.queue.put(None)
+        self.thread.join()
+
 
 class UIEngine:
-    def __init__(self, grid_width=5, world=None) -> None:
+    """
+    Draw the game board with matplotlib.
+
+    The grid, the walls and the player markers are created once. Each render only
+    updates the walls that changed and the player markers, and redraws them over a
+    cached background (blitting) when the canvas supports it.
+
+    Parameters
+    ----------
+    grid_width : int
+        The size of the board.
+    world : World
+        The world being displayed. The players, turn, scores and save options are
+        read from it.
+    figure : matplotlib.figure.Figure
+        The figure to draw on. If None, a new interactive pyplot figure is created.
+    save_prefix : str
+        The prefix of the saved file names. Defaults to the names of both players.
+    """
+
+    def __init__(self, grid_width=5, world=None, figure=None, save_prefix=None) -> None:
         self.grid_size = (grid_width, grid_width)
         self.world = world
+        self.save_prefix = save_prefix
         self.step_number = 0
-        plt.figure()
-        # plt.axis([0, 0, 0, 10])
-        plt.ion()
+        self.interactive = figure is None
+        if self.interactive:
+            figure = plt.figure()
+            # plt.axis([0, 0, 0, 10])
+            plt.ion()
+        self.fig = figure
+        self.canvas = self.fig.canvas
+        self.ax = self.fig.gca()
+        self.board = None
+        self.dynamic_artists = []
+        self.background = None
+        self.writer = None
+        self.fig.canvas.mpl_connect("draw_event", self.on_draw)
 
-    # [x1,x2] -> [y1,y2]
-    def plot_box(
-        self,
-        x,
-        y,
-        w,
-        text="",
-        set_left_wall=False,
-        set_right_wall=False,
-        set_top_wall=False,
-        set_bottom_wall=False,
-        color="silver",
-    ):
+    def cell_origin(self, row, col):
+        """
+        Get the plot coordinates of the bottom left corner of a cell
         """
-        Plot a box with configurable walls
+        return 1 + 2 * col, self.grid_size[1] * 2 + 1 - 2 * row
 
-        Parameters
-        ----------
-        x : int
-            x position of the box
-        y : int
-            y position of the box
-        w : int
-            width of the box
-        text : str
-            text to display in the box
-        set_left_wall : bool
-            set left wall
-        set_right_wall : bool
-            set right wall
-        set_top_wall : bool
-            set top wall
-        set_bottom_wall : bool
-            set bottom wall
-        color : str
-            color of the wall
-        """
-        # left wall
-        plt.plot([x, x], [y, y + w], "-", lw=2, color="red" if set_left_wall else color)
-        # top wall
-        plt.plot(
-            [x + w, x],
-            [y + w, y + w],
-            "-",
-            lw=2,
-            color="red" if set_top_wall else color,
-        )
-        # right wall
-        plt.plot(
-            [x + w, x + w],
-            [y, y + w],
-            "-",
-            lw=2,
-            color="red" if set_right_wall else color,
-        )
-        # bottom wall
-        plt.plot(
-            [x, x + w], [y, y], "-", lw=2, color="red" if set_bottom_wall else color
-        )
-        if len(text) > 0:
-            color = "black"
-            if text == PLAYER_1_NAME:
-                color = PLAYER_1_COLOR
-            elif text == PLAYER_2_NAME:
-                color = PLAYER_2_COLOR
-            plt.text(
-                x + w / 2,
-                y + w / 2,
-                text,
-                ha="center",
-                va="center",
-                color="white",
-                bbox=dict(facecolor=color, edgecolor=color, boxstyle="round"),
-            )
+    def wall_segments(self):
+        """
+        Get the segment of every (row, col, dir) wall, in the order of np.ravel
+        """
+        segments = []
+        for row in range(self.grid_size[0]):
+            for col in range(self.grid_size[1]):
+                x, y = self.cell_origin(row, col)
+                segments.append(((x + 2, y + 2), (x, y + 2)))  # top wall
+                segments.append(((x + 2, y), (x + 2, y + 2)))  # right wall
+                segments.append(((x, y), (x + 2, y)))  # bottom wall
+                segments.append(((x, y), (x, y + 2)))  # left wall
+        return segments
 
     def plot_grid(self):
         """
-        Plot the grid of the game
+        Plot the grid of the game, coloring the walls as they are put
         """
-        for x in range(1, self.grid_size[0] * 2 + 1, 2):
-            for y in range(1, self.grid_size[1] * 2 + 1, 2):
-                self.plot_box(x, y, 2)
+        self.walls = LineCollection(
+            self.wall_segments(), colors=GRID_COLOR, linewidths=2, zorder=1
+        )
+        self.ax.add_collection(self.walls)
 
     def plot_game_boundary(
         self,
@@ -103,58 +162,50 @@ class UIEngine:
         Plot the boundary of the game
         """
         # start y=3 as the y in the range ends in 3
-        self.plot_box(1, 3, self.grid_size[0] + self.grid_size[1], color="black")
+        w = self.grid_size[0] + self.grid_size[1]
+        x, y = 1, 3
+        (self.boundary,) = self.ax.plot(
+            [x, x, x + w, x + w, x], [y, y + w, y + w, y, y], "-", lw=2, color="black"
+        )
 
-    def plot_grid_with_board(
-        self, chess_board, player_1_pos=None, player_2_pos=None, debug=False
-    ):
+    def plot_players(self):
         """
-        Main function to plot the grid of the game
+        Plot the markers of both players, moved on each render
+        """
+        self.player_texts = []
+        for name, color in (
+            (PLAYER_1_NAME, PLAYER_1_COLOR),
+            (PLAYER_2_NAME, PLAYER_2_COLOR),
+        ):
+            text = self.ax.text(
+                0,
+                0,
+                name,
+                ha="center",
+                va="center",
+                color="white",
+                bbox=dict(facecolor=color, edgecolor=color, boxstyle="round"),
+                zorder=3,
+            )
+            text.set_visible(False)
+            self.player_texts.append(text)
 
-        Parameters
-        ----------
-        chess_board : np.array of size (grid_size[0], grid_size[1], 4)
-            chess board
-        player_1_pos : tuple of int
-            position of player 1
-        player_2_pos : tuple of int
-            position of player 2
-        debug : bool
-            if True, plot the position of the players
-        """
-        x_pos = 0
-        for y in range(self.grid_size[1] * 2 + 1, 1, -2):
-            y_pos = 0
-            for x in range(1, self.grid_size[0] * 2 + 1, 2):
-                up_wall = chess_board[x_pos, y_pos, 0]
-                right_wall = chess_board[x_pos, y_pos, 1]
-                down_wall = chess_board[x_pos, y_pos, 2]
-                left_wall = chess_board[x_pos, y_pos, 3]
-
-                # Display text
-                text = ""
-                if player_1_pos is not None:
-                    if player_1_pos[0] == x_pos and player_1_pos[1] == y_pos:
-                        text += "A"
-                if player_2_pos is not None:
-                    if player_2_pos[0] == x_pos and player_2_pos[1] == y_pos:
-                        text += "B"
-
-                if debug:
-                    text += " " + str(x_pos) + "," + str(y_pos)
-
-                self.plot_box(
-                    x,
-                    y,
-                    2,
-                    set_left_wall=left_wall,
-                    set_right_wall=right_wall,
-                    set_top_wall=up_wall,
-                    set_bottom_wall=down_wall,
-                    text=text,
+    def plot_positions(self):
+        """
+        Plot the position of each cell, in debug mode
+        """
+        for row in range(self.grid_size[0]):
+            for col in range(self.grid_size[1]):
+                x, y = self.cell_origin(row, col)
+                self.ax.text(
+                    x + 1,
+                    y + 0.4,
+                    f"{row},{col}",
+                    ha="center",
+                    va="center",
+                    fontsize="x-small",
+                    color="gray",
                 )
-                y_pos += 1
-            x_pos += 1
 
     def fix_axis(self):
         """
@@ -165,50 +216,62 @@ class UIEngine:
         labels = [x // 2 for x in ticks]
         ticks = [x + 2 for i, x in enumerate(ticks) if i % 2 == 0]
         labels = [x for i, x in enumerate(labels) if i % 2 == 0]
-        plt.xticks(ticks, labels)
+        self.ax.set_xticks(ticks, labels)
         # Set Y labels
         ticks = list(range(0, self.grid_size[1] * 2))
         labels = [x // 2 for x in ticks]
         ticks = [x + 3 for i, x in enumerate(ticks) if i % 2 == 1]
         labels = [x for i, x in enumerate(reversed(labels)) if i % 2 == 1]
-        plt.yticks(ticks, labels)
+        self.ax.set_yticks(ticks, labels)
         # move x axis to top
-        plt.tick_params(bottom=False, labelbottom=False, top=True, labeltop=True)
-        plt.xlabel("Y Position")
-        plt.ylabel("X Position", position="top")
+        self.ax.tick_params(bottom=False, labelbottom=False, top=True, labeltop=True)
+        self.ax.set_xlabel("Y Position")
+        self.ax.set_ylabel("X Position", position="top")
+        w = self.grid_size[0] + self.grid_size[1]
+        self.ax.set_xlim(0.5, 1.5 + w)
+        self.ax.set_ylim(2.5, 3.5 + w)
 
     def plot_text_info(self):
         """
-        Plot game textual information in the bottom
+        Plot game textual information in the bottom, updated on each render
         """
-        turn = 1 - self.world.turn
-        agent_0 = f"{PLAYER_1_NAME}: {self.world.p0}"
-        agent_1 = f"{PLAYER_2_NAME}: {self.world.p1}"
-        plt.figtext(
-            0.15,
-            0.1,
-            agent_0,
-            wrap=True,
-            horizontalalignment="left",
-            color=PLAYER_1_COLOR,
-            fontweight="bold" if turn == 0 else "normal",
+        self.agent_texts = [
+            self.fig.text(
+                0.15,
+                0.1,
+                f"{PLAYER_1_NAME}: {self.world.p0}",
+                wrap=True,
+                horizontalalignment="left",
+                color=PLAYER_1_COLOR,
+            ),
+            self.fig.text(
+                0.15,
+                0.05,
+                f"{PLAYER_2_NAME}: {self.world.p1}",
+                wrap=True,
+                horizontalalignment="left",
+                color=PLAYER_2_COLOR,
+            ),
+        ]
+        self.score_text = self.fig.text(0.4, 0.1, "", horizontalalignment="left")
+        self.win_text = self.fig.text(
+            0.4, 0.05, "", horizontalalignment="left", fontweight="bold", color="green"
         )
-        plt.figtext(
-            0.15,
-            0.05,
-            agent_1,
-            wrap=True,
-            horizontalalignment="left",
-            color=PLAYER_2_COLOR,
-            fontweight="bold" if turn == 1 else "normal",
+        self.fig.text(
+            0.7, 0.1, f"Max steps: {self.world.max_step}", horizontalalignment="left"
         )
 
+    def update_text_info(self):
+        """
+        Update the turn, the scores and the winner
+        """
+        turn = 1 - self.world.turn
+        for i, text in enumerate(self.agent_texts):
+            text.set_fontweight("bold" if turn == i else "normal")
+
         if len(self.world.results_cache) > 0:
-            plt.figtext(
-                0.4,
-                0.1,
-                f"Scores: A: [{self.world.results_cache[1]}], B: [{self.world.results_cache[2]}]",
-                horizontalalignment="left",
+            self.score_text.set_text(
+                f"Scores: A: [{self.world.results_cache[1]}], B: [{self.world.results_cache[2]}]"
             )
             if self.world.results_cache[0]:
                 # Handle Tie condition
@@ -218,19 +281,76 @@ class UIEngine:
                     win_player = "Player B wins!"
                 else:
                     win_player = "It is a Tie!"
+                self.win_text.set_text(win_player)
 
-                plt.figtext(
-                    0.4,
-                    0.05,
-                    win_player,
-                    horizontalalignment="left",
-                    fontweight="bold",
-                    color="green",
-                )
+    def build(self, debug=False):
+        """
+        Create all the artists of the board
+        """
+        self.plot_grid()
+        self.plot_game_boundary()
+        self.plot_players()
+        if debug:
+            self.plot_positions()
+        self.fix_axis()
+        self.plot_text_info()
+        self.fig.subplots_adjust(bottom=0.2)
 
-        plt.figtext(
-            0.7, 0.1, f"Max steps: {self.world.max_step}", horizontalalignment="left"
-        )
+        self.blit = self.fig.canvas.supports_blit
+        self.dynamic_artists = [
+            self.walls,
+            # Redrawn after the walls so that it stays on top of them
+            self.boundary,
+            *self.player_texts,
+            *self.agent_texts,
+            self.score_text,
+            self.win_text,
+        ]
+        for artist in self.dynamic_artists:
+            artist.set_animated(self.blit)
+        self.fig.canvas.draw()
+        if self.interactive:
+            plt.show(block=False)
+
+    def on_draw(self, event):
+        """
+        Cache the background whenever the whole figure is redrawn (e.g. on resize)
+        """
+        # Figures saved to other formats are drawn by another canvas
+        if not self.dynamic_artists or not self.blit or event.canvas is not self.canvas:
+            return
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        for artist in self.dynamic_artists:
+            self.fig.draw_artist(artist)
+
+    def update_board(self, chess_board, p1_pos, p2_pos):
+        """
+        Update the colors of the walls that changed and move the players
+        """
+        walls = np.ravel(chess_board)
+        if self.board is None:
+            changed = np.arange(walls.size)
+        else:
+            changed = np.flatnonzero(walls != self.board)
+        if changed.size > 0:
+            colors = self.walls.get_colors()
+            if len(colors) != walls.size:
+                colors = np.repeat(colors[:1], walls.size, axis=0)
+            colors[changed] = np.where(
+                walls[changed, None],
+                to_rgba(WALL_COLOR),
+                to_rgba(GRID_COLOR),
+            )
+            self.walls.set_colors(colors)
+        self.board = walls.copy()
+
+        for text, pos in zip(self.player_texts, (p1_pos, p2_pos)):
+            if pos is None:
+                text.set_visible(False)
+                continue
+            x, y = self.cell_origin(pos[0], pos[1])
+            text.set_position((x + 1, y + 1))
+            text.set_visible(True)
 
     def render(self, chess_board, p1_pos, p2_pos, debug=False):
         """
@@ -248,22 +368,67 @@ class UIEngine:
             if True, display the position of each piece
 
         """
-        plt.clf()
-        self.plot_grid_with_board(chess_board, p1_pos, p2_pos, debug=debug)
-        self.plot_game_boundary()
-        self.fix_axis()
-        self.plot_text_info()
-        plt.subplots_adjust(bottom=0.2)
-        plt.pause(0.1)
+        if not self.dynamic_artists:
+            self.build(debug=debug)
+        self.update_board(chess_board, p1_pos, p2_pos)
+        self.update_text_info()
+
+        canvas = self.fig.canvas
+        if self.blit and self.background is not None:
+            canvas.restore_region(self.background)
+            for artist in self.dynamic_artists:
+                self.fig.draw_artist(artist)
+            canvas.blit(self.fig.bbox)
+        else:
+            canvas.draw()
+        if self.interactive:
+            canvas.flush_events()
+
         if self.world.display_save:
+            self.save_frame()
+        self.step_number += 1
+
+    def save_frame(self):
+        """
+        Save the current frame in the format set by `world.display_save_format`
+        """
+        save_format = getattr(self.world, "display_save_format", "pdf")
+        prefix = self.save_prefix
+        if prefix is None:
+            prefix = f"{self.world.player_1_name}_{self.world.player_2_name}"
+        if save_format == "pdf":
+            # Vector output needs a full draw, including the animated artists
             Path(self.world.display_save_path).mkdir(parents=True, exist_ok=True)
-            plt.savefig(
-                f"{self.world.display_save_path}/{self.world.player_1_name}_{self.world.player_2_name}_{self.step_number}.pdf"
+            for artist in self.dynamic_artists:
+                artist.set_animated(False)
+            self.fig.savefig(
+                f"{self.world.display_save_path}/{prefix}_{self.step_number}.pdf"
             )
-        self.step_number += 1
+            for artist in self.dynamic_artists:
+                artist.set_animated(self.blit)
+            return
+        if self.writer is None:
+            self.writer = FrameWriter(
+                self.world.display_save_path,
+                prefix,
+                save_format=save_format,
+                frame_duration=max(self.world.display_delay, 0.1),
+            )
+        self.writer.write(
+            np.array(self.fig.canvas.buffer_rgba(), copy=True), self.step_number
+        )
+
+    def close(self):
+        """
+        Wait for the saved frames to be written
+        """
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
 
 
 if __name__ == "__main__":
-    engine = UIEngine((5, 5))
-    engine.render()
+    from world import World
+
+    world = World(display_ui=True, display_delay=0)
     plt.show()
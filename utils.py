@@ -1,5 +1,8 @@
 from contextlib import contextmanager
+from collections import OrderedDict
 import logging
+import threading
+import numpy as np
 
 
 @contextmanager
@@ -24,3 +27,85 @@ def all_logging_disabled(highest_level=logging.CRITICAL):
         yield
     finally:
         logging.disable(previous_level)
+
+
+def encode_board(chess_board):
+    """
+    Encode a chess board as a hex string of its packed bits.
+    """
+    return np.packbits(chess_board).tobytes().hex()
+
+
+def decode_board(data, board_size):
+    """
+    Decode a chess board encoded by `encode_board`.
+    """
+    bits = np.unpackbits(np.frombuffer(bytes.fromhex(data), dtype=np.uint8))
+    return bits[: board_size * board_size * 4].reshape(board_size, board_size, 4) != 0
+
+
+class LRUCache:
+    """
+    A dictionary holding at most `maxsize` entries, evicting the least recently used.
+
+    Lookups with `get` are counted in `hits` and `misses`. Accesses are guarded by a
+    lock, so agents pondering in a background thread can share a cache.
+
+    Parameters
+    ----------
+    maxsize : int
+        The maximum number of entries kept.
+    """
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        """
+        Return the value of `key` and mark it as recently used, or `default`.
+        """
+        with self.lock:
+            try:
+                self.data.move_to_end(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return self.data[key]
+
+    def put(self, key, value):
+        """
+        Store `value` under `key`, evicting the least recently used entry if full.
+        """
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            if len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    @property
+    def hit_rate(self):
+        """
+        The fraction of lookups that were hits, 0 before any lookup.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        """
+        Remove all entries and reset the counters.
+        """
+        with self.lock:
+            self.data.clear()
+            self.hits = 0
+            self.misses = 0
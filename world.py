@@ -1,13 +1,16 @@
 import numpy as np
 from copy import deepcopy
 import traceback
-from agents import *
 from ui import UIEngine
 from time import sleep, time
 import click
 import logging
 from store import AGENT_REGISTRY
 from constants import *
+from endgame import score_regions
+from gamestate import GameState
+from topology import get_topology
+from collections import deque
 import sys
 
 logging.basicConfig(format="%(levelname)s:%(message)s", level=logging.INFO)
@@ -25,17 +28,20 @@ class World:
         display_delay=2,
         display_save=False,
         display_save_path=None,
+        display_save_format="pdf",
         autoplay=False,
+        time_control=None,
+        increment=0.0,
     ):
         """
         Initialize the game world
 
         Parameters
         ----------
-        player_1: str
-            The registered class of the first player
-        player_2: str
-            The registered class of the second player
+        player_1: str or agents.Agent
+            The registered class of the first player, or an instance to reuse
+        player_2: str or agents.Agent
+            The registered class of the second player, or an instance to reuse
         board_size: int
             The size of the board. If None, board_size = a number between MIN_BOARD_SIZE and MAX_BOARD_SIZE
         display_ui : bool
@@ -46,29 +52,25 @@ class World:
             Whether to save an image of the game board
         display_save_path : str
             The path to save the image
+        display_save_format : str
+            "pdf" to save a vector image per step, as by default, "png" to save an
+            image per step or "gif" to save an animation of the game
         autoplay : bool
             Whether the game is played in autoplay mode
+        time_control : float
+            The seconds on each player's clock for the whole game, None for no clock.
+            Players are told their time left before each step, and a warning is
+            logged when a clock runs out, but the game goes on.
+        increment : float
+            The seconds added to a player's clock after each of its steps
         """
         # Two players
         logger.info("Initialize the game world")
         # Load agents as defined in decorators
-        self.player_1_name = player_1
-        self.player_2_name = player_2
-        if player_1 not in AGENT_REGISTRY:
-            raise ValueError(
-                f"Agent '{player_1}' is not registered. {AGENT_NOT_FOUND_MSG}"
-            )
-        if player_2 not in AGENT_REGISTRY:
-            raise ValueError(
-                f"Agent '{player_2}' is not registered. {AGENT_NOT_FOUND_MSG}"
-            )
-
-        p0_agent = AGENT_REGISTRY[player_1]
-        p1_agent = AGENT_REGISTRY[player_2]
         logger.info(f"Registering p0 agent : {player_1}")
-        self.p0 = p0_agent()
+        self.player_1_name, self.p0 = self.load_agent(player_1)
         logger.info(f"Registering p1 agent : {player_2}")
-        self.p1 = p1_agent()
+        self.player_2_name, self.p1 = self.load_agent(player_2)
 
         # check autoplay
         if autoplay:
@@ -140,11 +142,27 @@ class World:
 
         # Check initialization
         self.initial_end, _, _ = self.check_endgame()
+        if not self.initial_end:
+            self.p0.on_game_start(self.board_size, self.max_step, 0)
+            self.p1.on_game_start(self.board_size, self.max_step, 1)
 
         # Time taken by each player
         self.p0_time = 0
         self.p1_time = 0
 
+        # Time left on the clock of each player and the number of steps they took
+        self.time_control = time_control
+        self.increment = increment
+        self.clocks = [time_control, time_control]
+        self.move_numbers = [0, 0]
+
+        # Steps of each player replaced by a Random Walk
+        self.random_walks = [0, 0]
+
+        # Starting position and steps, to replay the game offline
+        self.initial_state = self.state
+        self.history = []
+
         # Cache to store and use the data
         self.results_cache = ()
         # UI Engine
@@ -152,6 +170,7 @@ class World:
         self.display_delay = display_delay
         self.display_save = display_save
         self.display_save_path = display_save_path
+        self.display_save_format = display_save_format
         if display_ui:
             # Initialize UI Engine
             logger.info(
@@ -160,6 +179,28 @@ class World:
             self.ui_engine = UIEngine(self.board_size, self)
             self.render()
 
+    @staticmethod
+    def load_agent(player):
+        """
+        Instantiate a registered agent, or take an agent instance as is.
+
+        Returns
+        -------
+        tuple of (registered_name, agent)
+        """
+        if not isinstance(player, str):
+            names = [
+                name
+                for name, cls in AGENT_REGISTRY.loaded.items()
+                if type(player) is cls
+            ]
+            return (names[0] if names else str(player)), player
+        if player not in AGENT_REGISTRY:
+            raise ValueError(
+                f"Agent '{player}' is not registered. {AGENT_NOT_FOUND_MSG}"
+            )
+        return player, AGENT_REGISTRY[player]()
+
     def get_current_player(self):
         """
         Get the positions of the current player
@@ -186,6 +227,13 @@ class World:
             self.p0_time += time_taken
         else:
             self.p1_time += time_taken
+        if self.clocks[self.turn] is not None:
+            self.clocks[self.turn] -= time_taken
+            if self.clocks[self.turn] < 0:
+                logger.warning(
+                    f"Player {self.player_names[self.turn]} ran out of time, {-self.clocks[self.turn]:.3f} seconds over"
+                )
+            self.clocks[self.turn] += self.increment
 
     def step(self):
         """
@@ -199,48 +247,132 @@ class World:
             The results of the step containing (is_endgame, player_1_score, player_2_score)
         """
         cur_player, cur_pos, adv_pos = self.get_current_player()
+        waiting_player = self.p0 if self.turn else self.p1
+        # Positions are handed to the agents as int tuples, the boards as copies
+        my_pos = (int(cur_pos[0]), int(cur_pos[1]))
+        adv_pos = (int(adv_pos[0]), int(adv_pos[1]))
+        # Let the waiting player think about its next step during this one
+        try:
+            waiting_player.start_pondering(
+                self.chess_board.copy(), adv_pos, my_pos, self.max_step
+            )
+        except BaseException as e:
+            self.report_agent_exception(e, waiting_player)
+            print("Continue without pondering!")
 
+        self.move_numbers[self.turn] += 1
         try:
+            cur_player.set_clock(
+                self.clocks[self.turn], self.increment, self.move_numbers[self.turn]
+            )
             # Run the agents step function
             start_time = time()
-            next_pos, dir = cur_player.step(
-                deepcopy(self.chess_board),
-                tuple(cur_pos),
-                tuple(adv_pos),
-                self.max_step,
-            )
-            self.update_player_time(time() - start_time)
+            try:
+                next_pos, dir = cur_player.step(
+                    self.chess_board.copy(), my_pos, adv_pos, self.max_step
+                )
+            finally:
+                # Charged even if the step fails, as the time was spent all the same
+                self.update_player_time(time() - start_time)
 
+            next_pos = self.check_step(next_pos, dir)
+        except BaseException as e:
+            self.report_agent_exception(e, cur_player)
+            print("Execute Random Walk!")
+            self.random_walks[self.turn] += 1
+            next_pos, dir = self.random_walk(my_pos, adv_pos)
             next_pos = np.asarray(next_pos, dtype=cur_pos.dtype)
-            if not self.check_boundary(next_pos):
-                raise ValueError("End position {} is out of boundary".format(next_pos))
-            if not 0 <= dir <= 3:
-                raise ValueError(
-                    "Barrier dir should reside in [0, 3], but your dir is {}".format(
-                        dir
-                    )
-                )
-            if not self.check_valid_step(cur_pos, next_pos, dir):
-                raise ValueError(
-                    "Not a valid step from {} to {} and put barrier at {}, with max steps = {}".format(
-                        cur_pos, next_pos, dir, self.max_step
-                    )
-                )
+
+        try:
+            waiting_player.stop_pondering(
+                ((int(next_pos[0]), int(next_pos[1])), int(dir))
+            )
         except BaseException as e:
-            ex_type = type(e).__name__
-            if (
-                "SystemExit" in ex_type and isinstance(cur_player, HumanAgent)
-            ) or "KeyboardInterrupt" in ex_type:
-                sys.exit(0)
-            print(
-                "An exception raised. The traceback is as follows:\n{}".format(
-                    traceback.format_exc()
+            self.report_agent_exception(e, waiting_player)
+        return self.apply_step(next_pos, dir)
+
+    @staticmethod
+    def report_agent_exception(e, agent):
+        """
+        Print the traceback of an exception raised by an agent, or exit if it was
+        raised to quit the game.
+
+        Parameters
+        ----------
+        e : BaseException
+            The exception, being handled.
+        agent : agents.Agent
+            The agent that raised it.
+        """
+        ex_type = type(e).__name__
+        # Only loaded if one of the players is human
+        human_agent = AGENT_REGISTRY.loaded.get("human_agent")
+        if (
+            "SystemExit" in ex_type
+            and human_agent is not None
+            and isinstance(agent, human_agent)
+        ) or "KeyboardInterrupt" in ex_type:
+            sys.exit(0)
+        print(
+            "An exception raised. The traceback is as follows:\n{}".format(
+                traceback.format_exc()
+            )
+        )
+
+    def check_step(self, next_pos, dir):
+        """
+        Check that a step returned by the current player is valid.
+
+        Parameters
+        ----------
+        next_pos : tuple of int
+            The end position of the current player.
+        dir : int
+            The direction of the barrier.
+
+        Returns
+        -------
+        next_pos : np.ndarray
+            The end position, converted to the dtype of the player positions.
+
+        Raises
+        ------
+        ValueError
+            If the step is out of the board, the direction is invalid or the end
+            position is not reachable.
+        """
+        _, cur_pos, _ = self.get_current_player()
+        next_pos = np.asarray(next_pos, dtype=cur_pos.dtype)
+        if not self.check_boundary(next_pos):
+            raise ValueError("End position {} is out of boundary".format(next_pos))
+        if not 0 <= dir <= 3:
+            raise ValueError(
+                "Barrier dir should reside in [0, 3], but your dir is {}".format(dir)
+            )
+        if not self.check_valid_step(cur_pos, next_pos, dir):
+            raise ValueError(
+                "Not a valid step from {} to {} and put barrier at {}, with max steps = {}".format(
+                    cur_pos, next_pos, dir, self.max_step
                 )
             )
-            print("Execute Random Walk!")
-            next_pos, dir = self.random_walk(tuple(cur_pos), tuple(adv_pos))
-            next_pos = np.asarray(next_pos, dtype=cur_pos.dtype)
+        return next_pos
 
+    def apply_step(self, next_pos, dir):
+        """
+        Move the current player, put its barrier and hand the turn to the adversary.
+
+        Parameters
+        ----------
+        next_pos : np.ndarray
+            The end position of the current player, already checked by `check_step`.
+        dir : int
+            The direction of the barrier.
+
+        Returns
+        -------
+        results: tuple
+            The results of the step containing (is_endgame, player_1_score, player_2_score)
+        """
         # Print out each step
         # print(self.turn, next_pos, dir)
         logger.info(
@@ -253,6 +385,7 @@ class World:
         # Set the barrier to True
         r, c = next_pos
         self.set_barrier(r, c, dir)
+        self.history.append((int(r), int(c), int(dir)))
 
         # Change turn
         self.turn = 1 - self.turn
@@ -260,10 +393,16 @@ class World:
         results = self.check_endgame()
         self.results_cache = results
 
+        if results[0]:
+            self.p0.on_game_end((results[1], results[2]))
+            self.p1.on_game_end((results[2], results[1]))
+
         # Print out Chessboard for visualization
         if self.display_ui:
             self.render()
             if results[0]:
+                # Flush the saved frames before waiting
+                self.ui_engine.close()
                 # If game ends and displaying the ui, wait for user input
                 click.echo("Press a button to exit the game.")
                 try:
@@ -272,6 +411,40 @@ class World:
                     _ = input()
         return results
 
+    def get_record(self):
+        """
+        Get a record of the game, from which it can be replayed.
+
+        Returns
+        -------
+        record : dict
+            The board size, max steps, player names, starting board (see
+            `utils.encode_board`) and positions, the `[row, col, dir]` of each step
+            in order, starting with player 1, and the latest results.
+        """
+        initial_state = self.initial_state
+        return {
+            "board_size": initial_state.board_size,
+            "max_step": initial_state.max_step,
+            "player_1": self.player_1_name,
+            "player_2": self.player_2_name,
+            "agent_1": str(self.p0),
+            "agent_2": str(self.p1),
+            "chess_board": initial_state.walls.hex(),
+            "p0_pos": list(initial_state.p0_pos),
+            "p1_pos": list(initial_state.p1_pos),
+            "moves": [list(move) for move in self.history],
+            "results": (
+                [
+                    bool(self.results_cache[0]),
+                    int(self.results_cache[1]),
+                    int(self.results_cache[2]),
+                ]
+                if self.results_cache
+                else []
+            ),
+        }
+
     def check_valid_step(self, start_pos, end_pos, barrier_dir):
         """
         Check if the step the agent takes is valid (reachable and within max steps).
@@ -289,36 +462,38 @@ class World:
         r, c = end_pos
         if self.chess_board[r, c, barrier_dir]:
             return False
-        if np.array_equal(start_pos, end_pos):
+        topology = self.topology
+        start = topology.index(start_pos)
+        end = topology.index(end_pos)
+        if start == end:
             return True
 
         # Get position of the adversary
-        adv_pos = self.p0_pos if self.turn else self.p1_pos
+        adv = topology.index(self.p0_pos if self.turn else self.p1_pos)
 
         # BFS
-        state_queue = [(start_pos, 0)]
-        visited = {tuple(start_pos)}
-        is_reached = False
-        while state_queue and not is_reached:
-            cur_pos, cur_step = state_queue.pop(0)
-            r, c = cur_pos
+        walls = self.chess_board.reshape(-1, 4).tolist()
+        state_queue = deque([(start, 0)])
+        visited = {start}
+        while state_queue:
+            cur, cur_step = state_queue.popleft()
             if cur_step == self.max_step:
                 break
-            for dir, move in enumerate(self.moves):
-                if self.chess_board[r, c, dir]:
+            cur_walls, neighbours = walls[cur], topology.neighbour_list[cur]
+            for dir in range(4):
+                if cur_walls[dir]:
                     continue
 
-                next_pos = cur_pos + move
-                if np.array_equal(next_pos, adv_pos) or tuple(next_pos) in visited:
+                next_cell = neighbours[dir]
+                if next_cell == adv or next_cell in visited:
                     continue
-                if np.array_equal(next_pos, end_pos):
-                    is_reached = True
-                    break
+                if next_cell == end:
+                    return True
 
-                visited.add(tuple(next_pos))
-                state_queue.append((next_pos, cur_step + 1))
+                visited.add(next_cell)
+                state_queue.append((next_cell, cur_step + 1))
 
-        return is_reached
+        return False
 
     def check_endgame(self):
         """
@@ -333,40 +508,10 @@ class World:
         player_2_score : int
             The score of player 2.
         """
-        # Union-Find
-        father = dict()
-        for r in range(self.board_size):
-            for c in range(self.board_size):
-                father[(r, c)] = (r, c)
-
-        def find(pos):
-            if father[pos] != pos:
-                father[pos] = find(father[pos])
-            return father[pos]
-
-        def union(pos1, pos2):
-            father[pos1] = pos2
-
-        for r in range(self.board_size):
-            for c in range(self.board_size):
-                for dir, move in enumerate(
-                    self.moves[1:3]
-                ):  # Only check down and right
-                    if self.chess_board[r, c, dir + 1]:
-                        continue
-                    pos_a = find((r, c))
-                    pos_b = find((r + move[0], c + move[1]))
-                    if pos_a != pos_b:
-                        union(pos_a, pos_b)
-
-        for r in range(self.board_size):
-            for c in range(self.board_size):
-                find((r, c))
-        p0_r = find(tuple(self.p0_pos))
-        p1_r = find(tuple(self.p1_pos))
-        p0_score = list(father.values()).count(p0_r)
-        p1_score = list(father.values()).count(p1_r)
-        if p0_r == p1_r:
+        is_endgame, p0_score, p1_score = score_regions(
+            self.chess_board, self.p0_pos, self.p1_pos
+        )
+        if not is_endgame:
             return False, p0_score, p1_score
         player_win = None
         win_blocks = -1
@@ -390,12 +535,30 @@ class World:
         r, c = pos
         return 0 <= r < self.board_size and 0 <= c < self.board_size
 
+    @property
+    def state(self):
+        """
+        An immutable snapshot of the current board, positions and turn.
+
+        Returns
+        -------
+        GameState
+        """
+        return GameState.from_board(
+            self.chess_board, self.p0_pos, self.p1_pos, self.turn, self.max_step
+        )
+
+    @property
+    def topology(self):
+        """
+        The shared neighbour and wall tables of the board size
+        """
+        return get_topology(self.board_size)
+
     def set_barrier(self, r, c, dir):
-        # Set the barrier to True
-        self.chess_board[r, c, dir] = True
-        # Set the opposite barrier to True
-        move = self.moves[dir]
-        self.chess_board[r + move[0], c + move[1], self.opposites[dir]] = True
+        # Set the barrier and the opposite barrier to True
+        for side in self.topology.wall_sides[r * self.board_size + c][dir]:
+            self.chess_board[side] = True
 
     def random_walk(self, my_pos, adv_pos):
         """
@@ -443,8 +606,10 @@ class World:
         """
         Render the game board using the UI Engine
         """
+        start_time = time()
         self.ui_engine.render(self.chess_board, self.p0_pos, self.p1_pos, debug=debug)
-        sleep(self.display_delay)
+        # The time spent rendering counts towards the delay
+        sleep(max(0, self.display_delay - (time() - start_time)))
 
 
 if __name__ == "__main__":